@@ -1,10 +1,151 @@
 import os
+import re
 import time
 
-import openai
 from tqdm import tqdm
 
 import helper as utl
+import lookup
+
+# The OpenAI API is only needed for affiliations the local rules cannot resolve
+try:
+    import openai
+except ImportError:
+    openai = None
+
+# Seconds waited after each call to the OpenAI API, to stay under its rate limit
+PAUSE = 20
+
+# Job titles and roles, which may follow a rank or the name of a chair ("Regents' Professor")
+ROLES = (r'(?:professor|prof|lecturer|instructor|teacher|scientist|engineer|developer|designer|researcher|staff'
+         r'|analyst|consultant|architect|scholar|student|candidate|postdoc|intern|assistant|associate|director'
+         r'|manager|president|vp|founder|cofounder|partner|officer|ceo|cto|cfo|coo|cio|chair|chairman|dean|provost'
+         r'|editor|member|affiliate|investigator|specialist|technologist|fellow|faculty|head|lead|librarian|docent'
+         r'|phd|msc|m sc|mba)')
+
+# Academic fields, which often stand on their own between a title and an institution
+FIELDS = (r'(?:computer|computing|computational|science|sciences|engineering|informatics|information|interactive'
+          r'|interaction|human|centered|design|data|media|communication|communications|studies|psychology'
+          r'|linguistics|education|management|statistics|biostatistics|mathematics|economics|sociology|policy|research'
+          r'|health|medicine|medical|biomedical|library|learning|electrical|mechanical|civil|environmental'
+          r'|industrial|social|digital|systems|eecs|cse|cs|hci|ece|it|and|of|in)')
+
+# Words that make a part of an affiliation the name of an organization: "Boston University", "HRL Laboratories"
+ORGANIZATION_WORDS = (r'(?:university|universite|universita|universitat|universidad|universidade|college|institute'
+                      r'|institut|polytechnic|academy|laboratory|laboratories|labs|hospital|clinic|foundation'
+                      r'|corporation|inc|llc|ltd|gmbh)')
+
+# Normalized parts of an affiliation that name a person's position instead of an organization
+TITLE_PATTERNS = [
+    # Titles, with a field or another title after them: "Assistant Professor of Information",
+    # "Professor and Chair of Linguistics", "Associate Dean for Research". Otherwise "at" and "for"
+    # only end a title ("Research Scientist at the" before a known institution), since what follows
+    # them names the employer
+    re.compile(rf'^(?:\S+\s+){{0,4}}{ROLES}(?:\s+(?:emeritus|emerita|and\s.+|(?:for|at)(?:\s+the)?'
+               rf'|for\s+{FIELDS}(?:\s+{FIELDS})*|(?:of|in)\s(?!.*\b{ORGANIZATION_WORDS}\b).+))?$'),
+    # Degrees: "PhD", "PhD student", "PhD in Computer Science"
+    re.compile(r'^(?:phd|ph d|doctoral|graduate|undergraduate|masters|master s|msc|ms|ma|mba|bs|ba)'
+               r'(?:\s+(?:student|candidate|in\s.+))?$'),
+    # Academic units: "School of Information", "Khoury College of Computer Sciences"
+    re.compile(r'^(?:\S+\s+){0,3}(?:dept|department|school|college|faculty|division|program)\s+(?:of|in|for)\s.+$'),
+    re.compile(r'^(?:\S+\s+){0,4}(?:dept|department)$'),
+    # Legal forms split off by a comma: "HRL Laboratories, LLC"
+    re.compile(r'^(?:inc|llc|ltd|gmbh|corp|co)$'),
+    # Fields: "Computer Science", "Human Centered Design and Engineering"
+    re.compile(rf'^{FIELDS}(?:\s+{FIELDS})*$'),
+]
+
+# Title followed by the organization the person works for: "Applied Scientist at Amazon"
+EMPLOYED = re.compile(rf'^(?:\S+\s+){{0,4}}{ROLES}\s+(?:at|for)\s')
+
+# Part of an affiliation naming an organization, when it is not a known institution and does not
+# name a position
+ORGANIZATION = re.compile(rf'\b{ORGANIZATION_WORDS}\b')
+# Words in a part of an affiliation that may join several organizations or a past one
+UNCERTAIN = re.compile(rf'\b(?:{ROLES}|and|formerly|previously|was)\b')
+
+# Separators between the parts of an affiliation
+SEPARATORS = re.compile(r'[,;|]|\s[-\u2013\u2014]\s')
+
+
+def is_title(text):
+    """
+    Checks whether a normalized part of an affiliation is a job title, degree, academic unit, or
+    field rather than an organization.
+    :param text: (str) normalized text.
+    :return: (bool) True if one of TITLE_PATTERNS matches the whole text.
+    """
+    return any(pattern.match(text) for pattern in TITLE_PATTERNS)
+
+
+def known_institutions(data):
+    """
+    Builds a dictionary of the institutions found by earlier runs, from the organizations looked up
+    for endowments and the organizations extracted from affiliations. Entries that are themselves
+    job titles or fields, or a title with an organization (earlier errors of the model), are left out.
+    :param data: (dict) faculty and institution data.
+    :return: (dict) normalized institution name mapped to the institution name.
+    """
+    names = [org.get('org') for org in data.get('enrich_institutions') or []] + list(data.get('institutions') or [])
+    known = {}
+    for name in names:
+        key = lookup.normalize_name(name or '')
+        if key and not is_title(key) and not EMPLOYED.match(key):
+            known.setdefault(key, name)
+    return known
+
+
+class AffiliationClassifier:
+    """
+    This class defines a rule-based classifier that extracts the institutions in co-author
+    affiliations such as "Professor, Stanford University" or "PhD student at MIT" without the
+    OpenAI API. An affiliation is split at commas, semicolons, and dashes. Known institutions are
+    found in each part, and the rest of the part must be a job title, degree, academic unit, or
+    field; a part without a known institution is taken as a new organization when its name has
+    a word such as "University" or "Institute" and no job title. Affiliations with any other text
+    are left for the model.
+
+    Attributes:
+        known (dict): normalized institution name mapped to the institution name.
+        pattern (Pattern): compiled pattern matching the normalized name of any known institution,
+            trying longer names first so that "Google Research" is not read as "Google".
+    Methods:
+        classify: returns the institutions in an affiliation, or None if it cannot be resolved.
+        split: separates affiliations into institutions found locally and affiliations left for
+            the model.
+    """
+
+    def __init__(self, known):
+        self.known = known
+        names = '|'.join(map(re.escape, sorted(known, key=len, reverse=True)))
+        self.pattern = re.compile(rf'\b(?:{names or "(?!)"})\b')
+
+    def classify(self, affil):
+        if not affil:
+            return []
+        orgs = []
+        for part in SEPARATORS.split(affil):
+            key = lookup.normalize_name(part)
+            found = [self.known[match.group()] for match in self.pattern.finditer(key)]
+            if not found and key and not is_title(key):
+                # An unknown organization, unless the part is cut short or names a position
+                if '\u2026' in part or not ORGANIZATION.search(key) or UNCERTAIN.search(key):
+                    return None
+                found = [' '.join(part.split())]
+            elif any(rest.strip() and not is_title(rest.strip()) for rest in self.pattern.split(key)):
+                return None
+            orgs.extend(found)
+        return orgs or None
+
+    def split(self, affils):
+        orgs, unresolved = {}, []
+        for affil in dict.fromkeys(affils):
+            found = self.classify(affil)
+            if found is None:
+                unresolved.append(affil)
+            else:
+                orgs.update(dict.fromkeys(found))
+        return list(orgs), unresolved
 
 
 def call_openai(model, data, limit=1, count=1):
@@ -24,7 +165,10 @@ def call_openai(model, data, limit=1, count=1):
     :param limit: (int) maximum number of iterations.
     :param count: (int) counter that updates with each iteration and terminates recursion when it equals limit.
     :return: (list) list of companies, organizations, and institutions.
+    :raises ImportError: if openai is not installed.
     """
+    if openai is None:
+        raise ImportError('openai is needed to extract organizations the local rules cannot resolve')
     orgs = set()
     for chunk in tqdm(data):
         try:
@@ -43,7 +187,7 @@ def call_openai(model, data, limit=1, count=1):
             for entity in response.split(', '):
                 entity = entity.replace('.', '')
                 orgs.add(entity)
-            time.sleep(20)
+            time.sleep(PAUSE)
         except openai.error.APIError as e:
             print(f"API error: {e}")
         except openai.error.APIConnectionError as e:
@@ -73,6 +217,45 @@ def chunk_data(data, size):
     return chunks
 
 
+def extract_organizations(model, affils, classifier, size=300, limit=2):
+    """
+    Extracts the organization names in co-author affiliations, resolving the ones it can with a
+    rule-based classifier and passing only the remaining distinct affiliations to the OpenAI API.
+    :param model: (str) OpenAI chat model to use for the remaining affiliations.
+    :param affils: (list) affiliations to parse.
+    :param classifier: object of the AffiliationClassifier class.
+    :param size: (int) number of affiliations sent in each call to the API.
+    :param limit: (int) number of passes through the API, see call_openai.
+    :return: (list) organization names, the ones found locally first.
+    """
+    orgs, unresolved = classifier.split(affils)
+    if unresolved:
+        orgs.extend(org for org in call_openai(model, data=chunk_data(unresolved, size), limit=limit)
+                    if org not in orgs)
+    return orgs
+
+
+def estimate_savings(affils, classifier, size=300):
+    """
+    Counts the affiliations a classifier resolves without the OpenAI API and the calls and seconds
+    of waiting saved on the first pass through the API, compared to sending every affiliation.
+    Calls saved on later passes, and the time the API takes to answer, come on top of these.
+    :param affils: (list) affiliations to parse.
+    :param classifier: object of the AffiliationClassifier class.
+    :param size: (int) number of affiliations sent in each call to the API.
+    :return: (dict) numbers of affiliations, of affiliations and distinct affiliations resolved
+        locally, of organizations found, of calls with and without the classifier, and seconds of
+        waiting saved.
+    """
+    orgs, unresolved = classifier.split(affils)
+    resolved = sum(classifier.classify(affil) is not None for affil in affils)
+    calls = len(chunk_data(affils, size))
+    remaining = len(chunk_data(unresolved, size))
+    return {'affiliations': len(affils), 'resolved': resolved, 'resolved_share': round(resolved / len(affils), 3),
+            'distinct': len(set(affils)), 'distinct_unresolved': len(unresolved), 'organizations': len(orgs),
+            'calls_before': calls, 'calls_after': remaining, 'seconds_saved': (calls - remaining) * PAUSE}
+
+
 def main():
     """
     Entry point for program.
@@ -81,7 +264,8 @@ def main():
     """
 
     # Load data from cache
-    auths_coauths = utl.read_json('cache.json').get('auths-coauths')
+    data = utl.read_json('cache.json')
+    auths_coauths = data.get('auths-coauths')
 
     # Get institutional affiliations data from cache
     affils = []
@@ -94,9 +278,10 @@ def main():
         except TypeError:
             continue
 
-    # Use OpenAI API to parse institutions
-    chunked = chunk_data(affils, 300)
-    entities = call_openai(model='gpt-3.5-turbo', data=chunked, limit=2)
+    # Resolve what the local rules can and use OpenAI API to parse the rest
+    classifier = AffiliationClassifier(known_institutions(data))
+    utl.print_pretty(estimate_savings(affils, classifier))
+    entities = extract_organizations('gpt-3.5-turbo', affils, classifier, limit=2)
     # utl.update_cache('cache.json', entities, key='institutions')
 
 
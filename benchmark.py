@@ -0,0 +1,1445 @@
+import contextlib
+import copy
+import csv
+import functools
+import html
+import io
+import itertools
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot
+import numpy as np
+
+import affiliations
+import clustering
+import collaboration
+import communities
+import diskgraph
+import graph
+import graphdiff
+import helper as utl
+import identity
+import lookup
+import main as cli
+import oracle
+import pathstats
+import pipeline
+import scrape
+
+
+def scale_cache(data, factor):
+    """
+    Builds a larger copy of the cache by repeating the faculty records factor times. Names and
+    Google Scholar ids of faculty and co-authors in each repetition are suffixed with its number so
+    the copies become distinct vertices, while affiliations and institutions are kept as-is.
+    :param data: (dict) faculty and institution data.
+    :param factor: (int) number of repetitions of the faculty records.
+    :return: (dict) scaled faculty and institution data.
+    """
+    scaled = copy.deepcopy(data)
+    scaled['auths-coauths'] = []
+    for rep in range(factor):
+        suffix = f' ({rep})' if rep else ''
+        for faculty in data.get('auths-coauths'):
+            record = copy.deepcopy(faculty)
+            record['name'] = faculty.get('name') + suffix
+            for person in record.get('coauthors') or []:
+                person['name'] = person.get('name') + suffix
+                if person.get('scholar_id'):
+                    person['scholar_id'] = person.get('scholar_id') + suffix
+            scaled['auths-coauths'].append(record)
+    return scaled
+
+
+def synthetic_graph(num_people, num_institutions, coauthors=2, affiliated=0.6, seed=0):
+    """
+    Builds a random graph shaped like the UMSI graph directly, without the quadratic step in
+    build_graph, for benchmarks that need graphs much larger than the cache. Each person is
+    connected to about coauthors other people, and a share of people is connected to one
+    institution, with affiliation and endowment set as build_graph would.
+    :param num_people: (int) number of person vertices.
+    :param num_institutions: (int) number of institution vertices.
+    :param coauthors: (int) number of co-authorships started by each person.
+    :param affiliated: (float) share of people connected to an institution.
+    :param seed: (int) seed for the random number generator.
+    :return: object of the Graph class.
+    """
+    rng = random.Random(seed)
+    net = graph.Graph()
+    for i in range(num_institutions):
+        inst = net.add_vertex(f'Institution {i}')
+        inst.set_type('institution')
+        inst.set_affil_endow(f'${rng.randint(1, 999)} {rng.choice(["million", "billion"])} (2022)')
+    for i in range(num_people):
+        person = net.add_vertex(f'Person {i}')
+        person.set_type('person')
+        if rng.random() < affiliated:
+            inst = f'Institution {rng.randrange(num_institutions)}'
+            person.set_affiliation(f'Professor, {inst}')
+            person.set_affil_endow(net.get_vertex(inst).get_affil_endow())
+            net.add_edge(person.get_id(), inst)
+            net.add_edge(inst, person.get_id())
+    for i in range(num_people):
+        for _ in range(coauthors):
+            other = f'Person {rng.randrange(num_people)}'
+            net.add_edge(f'Person {i}', other)
+            net.add_edge(other, f'Person {i}')
+    return net
+
+
+def timed(func, *args, **kwargs):
+    """
+    Calls func with the given arguments and measures its wall-clock time.
+    :param func: function to call.
+    :return: (tuple) seconds elapsed and the value returned by func.
+    """
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def add_faculty(data, count):
+    """
+    Adds count new faculty members to a copy of the cache, each listing a handful of new
+    co-authors affiliated with institutions that are already in the graph.
+    :param data: (dict) faculty and institution data.
+    :param count: (int) number of faculty members to add.
+    :return: (dict) updated faculty and institution data.
+    """
+    updated = copy.deepcopy(data)
+    for i in range(count):
+        updated['auths-coauths'].append({
+            'name': f'Benchmark Faculty {i}',
+            'coauthors': [{'name': f'Benchmark Coauthor {i}-{j}',
+                           'affiliation': 'Associate Professor, Stanford University'} for j in range(10)]})
+    return updated
+
+
+def edit_cache(data, count, seed=0):
+    """
+    Makes count random edits to a copy of the cache, of the kinds a new harvest brings: a faculty
+    member removed, a co-author's affiliation changed, a co-author dropped, a faculty or
+    institution record moved, or an institution's endowment changed or removed.
+    :param data: (dict) faculty and institution data.
+    :param count: (int) number of edits.
+    :param seed: (int) seed for the random number generator.
+    :return: (dict) updated faculty and institution data.
+    """
+    rng = random.Random(seed)
+    updated = copy.deepcopy(data)
+    faculty = updated['auths-coauths']
+    orgs = updated['enrich_institutions']
+    for _ in range(count):
+        kind = rng.randrange(5)
+        with_coauthors = [record for record in faculty if record.get('coauthors')]
+        if kind == 0 and len(faculty) > 1:
+            faculty.pop(rng.randrange(len(faculty)))
+        elif kind == 1 and with_coauthors:
+            person = rng.choice(rng.choice(with_coauthors)['coauthors'])
+            person['affiliation'] = f"Professor, {rng.choice(orgs)['org']}"
+        elif kind == 2 and with_coauthors:
+            coauthors = rng.choice(with_coauthors)['coauthors']
+            coauthors.pop(rng.randrange(len(coauthors)))
+        elif kind == 3:
+            records = rng.choice((faculty, orgs))
+            records.insert(rng.randrange(len(records)), records.pop(rng.randrange(len(records))))
+        else:
+            org = rng.choice(orgs)
+            org['endowment'] = None if org.get('endowment') and rng.random() < 0.5 \
+                else f'${rng.randint(1, 999)} million (2023)'
+    return updated
+
+
+def graph_state(umsi_net):
+    """
+    Reads the vertices of a graph with their attributes and sorted neighbor keys, to compare two
+    graphs for equality. The vertices of a graph keyed by integer ids are read under their
+    identity, which does not depend on the order they were built in.
+    :param umsi_net: object of the Graph class.
+    :return: (dict) vertex key mapped to its type, affiliation, endowment, and neighbor keys.
+    """
+    identities = umsi_net.identities
+    label = (lambda vert: vert.get_id()) if identities is None else (lambda vert: identities.keys[vert.get_id()])
+    return {label(vert): (vert.get_type(), vert.get_affiliation(), vert.get_affil_endow(),
+                          sorted(label(nbr) for nbr in vert.get_connections()))
+            for vert in umsi_net}
+
+
+def check_incremental_update(data, steps=5, edits=4, seed=0):
+    """
+    Applies several rounds of random edits to the cache, bringing one graph up to date with
+    update_graph after each round, and checks that it matches a graph built from scratch.
+    :param data: (dict) faculty and institution data.
+    :param steps: (int) number of rounds of edits.
+    :param edits: (int) number of edits in each round.
+    :param seed: (int) seed for the random number generator.
+    :return: (int) number of rounds whose updated graph differs from the rebuilt one.
+    """
+    umsi_net = graph.build_graph(data)
+    mismatches = 0
+    for step in range(steps):
+        data = edit_cache(add_faculty(data, 1) if step % 2 else data, edits, seed=seed + step)
+        graph.update_graph(umsi_net, data)
+        mismatches += graph_state(umsi_net) != graph_state(graph.build_graph(data))
+    return mismatches
+
+
+def check_reordered_update(data, rounds=6, seed=0):
+    """
+    Shuffles the faculty records, the institution records, or both, brings a graph built from the
+    cache up to date with update_graph, and checks that it matches a graph built from scratch.
+    Only the order of the records changes, which decides whose listing of a co-author is used.
+    :param data: (dict) faculty and institution data.
+    :param rounds: (int) number of shuffles.
+    :param seed: (int) seed for the random number generator.
+    :return: (int) number of shuffles whose updated graph differs from the rebuilt one.
+    """
+    rng = random.Random(seed)
+    kinds = (('auths-coauths',), ('enrich_institutions',), ('auths-coauths', 'enrich_institutions'))
+    mismatches = 0
+    for step in range(rounds):
+        shuffled = copy.deepcopy(data)
+        for cache_key in kinds[step % len(kinds)]:
+            rng.shuffle(shuffled[cache_key])
+        umsi_net = graph.build_graph(data)
+        graph.update_graph(umsi_net, shuffled)
+        mismatches += graph_state(umsi_net) != graph_state(graph.build_graph(shuffled))
+    return mismatches
+
+
+def bench_incremental_update(factors=(1, 2, 4), delta_sizes=(1, 4, 16)):
+    """
+    Compares a from-scratch build_graph with update_graph for caches of increasing size and
+    deltas of increasing size, printing the time taken by each and checking that the updated
+    graph has the same vertices, attributes, and edges as the rebuilt one.
+    :param factors: (tuple) scale factors applied to the cache with scale_cache.
+    :param delta_sizes: (tuple) numbers of faculty members added to the cache.
+    :return: (list) rows of scale factor, vertices, delta size, rebuild and update seconds, and
+        whether the updated graph matches the rebuilt one.
+    """
+    data = utl.read_json('cache.json')
+    rows = []
+    for factor in factors:
+        scaled = scale_cache(data, factor)
+        for size in delta_sizes:
+            updated = add_faculty(scaled, size)
+            umsi_net = graph.build_graph(scaled)
+            num_vertices = umsi_net.num_vertices
+            update_secs = timed(graph.update_graph, umsi_net, updated)[0]
+            rebuild_secs, rebuilt = timed(graph.build_graph, updated)
+            rows.append((factor, num_vertices, size, round(rebuild_secs, 4), round(update_secs, 4),
+                         graph_state(umsi_net) == graph_state(rebuilt)))
+    print('factor, vertices, faculty added, rebuild (s), update (s), matches rebuild')
+    utl.print_pretty(rows)
+    mismatches = sum(check_incremental_update(data, seed=seed) for seed in range(0, 25, 5))
+    print(f'Random multi-step edits: {mismatches} of 25 updated graphs differ from a rebuild')
+    mismatches = check_reordered_update(data)
+    print(f'Shuffled records: {mismatches} of 6 updated graphs differ from a rebuild')
+    return rows
+
+
+def bench_vertex_memory(factor=8):
+    """
+    Measures the memory held by a graph built from a scaled-up cache with tracemalloc, separating
+    the vertices and edges from the BuildIndex kept for incremental updates. The cache is loaded
+    inside the traced region and released after the build, so strings the graph keeps from the
+    cache are counted.
+    :param factor: (int) scale factor applied to the cache with scale_cache.
+    :return: (dict) vertices, traced bytes held by the graph and by its build index, peak bytes,
+        and graph bytes per vertex.
+    """
+    tracemalloc.start()
+    scaled = scale_cache(utl.read_json('cache.json'), factor)
+    umsi_net = graph.build_graph(scaled)
+    del scaled
+    total, peak = tracemalloc.get_traced_memory()
+    umsi_net.build_index = None
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    stats = {'vertices': umsi_net.num_vertices, 'graph_bytes': current, 'index_bytes': total - current,
+             'peak_bytes': peak, 'graph_bytes_per_vertex': round(current / umsi_net.num_vertices)}
+    utl.print_pretty(stats)
+    return stats
+
+
+def bench_collaboration_matrix(factors=(1, 10, 100)):
+    """
+    Measures the time and memory taken to build the institution collaboration matrix for
+    synthetic graphs at multiples of the size of the current graph (about 1,300 people,
+    130 institutions, and 2,700 co-authorships). Memory is measured in a second, traced run so
+    tracing does not slow the timed one.
+    :param factors: (tuple) multiples of the current graph size.
+    :return: (list) rows of factor, vertices, seconds, and peak bytes allocated.
+    """
+    rows = []
+    for factor in factors:
+        net = synthetic_graph(1313 * factor, 129 * factor)
+        secs = timed(collaboration.build_collaboration_matrix, net)[0]
+        tracemalloc.start()
+        collaboration.build_collaboration_matrix(net)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        rows.append((factor, net.num_vertices, round(secs, 4), peak))
+    print('factor, vertices, build (s), peak bytes')
+    utl.print_pretty(rows)
+    return rows
+
+
+def bench_endowment_render(sizes=(250, 10_000, 100_000, 1_000_000)):
+    """
+    Compares writing the endowment plots with the seaborn path in main.visualize_endows against
+    the pre-binned main.render_endows for growing numbers of institutions, using log-normally
+    distributed endowments. Both run on the non-interactive Agg backend and write a PNG. Also checks
+    that an empty list of endowments is refused with a ValueError instead of failing while plotting.
+    :param sizes: (tuple) numbers of endowments to plot.
+    :return: (list) rows of size, seaborn seconds, and pre-binned seconds.
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'endowments.png')
+        try:
+            cli.render_endows([], path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('render_endows accepted an empty list of endowments')
+        assert not os.path.exists(path)
+        for size in sizes:
+            endows = list(rng.lognormal(mean=21, sigma=1.5, size=size))
+            start = time.perf_counter()
+            cli.visualize_endows(endows)
+            pyplot.gcf().savefig(path)
+            pyplot.close('all')
+            seaborn_secs = time.perf_counter() - start
+            binned_secs = timed(cli.render_endows, endows, path)[0]
+            rows.append((size, round(seaborn_secs, 4), round(binned_secs, 4)))
+    print('endowments, seaborn (s), pre-binned (s)')
+    utl.print_pretty(rows)
+    return rows
+
+
+def synthetic_names(count, seed=0):
+    """
+    Generates distinct person names from random syllables, some with middle initials.
+    :param count: (int) number of names.
+    :param seed: (int) seed for the random number generator.
+    :return: (list) names.
+    """
+    rng = random.Random(seed)
+    syllables = ['an', 'be', 'ca', 'do', 'el', 'fa', 'gi', 'ho', 'ka', 'li', 'ma', 'ne', 'or', 'pa', 'ri',
+                 'sa', 'ta', 'vi', 'wu', 'ya', 'zo', 'chi', 'mar', 'son', 'ber', 'ton', 'lin', 'sky']
+    names = set()
+    while len(names) < count:
+        first = ''.join(rng.choice(syllables) for _ in range(2)).title()
+        last = ''.join(rng.choice(syllables) for _ in range(3)).title()
+        middle = f' {rng.choice("ABCDEFGHJKLMNPRST")}.' if rng.random() < 0.3 else ''
+        names.add(f'{first}{middle} {last}')
+    return sorted(names)
+
+
+def add_typo(name, rng):
+    """
+    Changes one letter of a name to a random letter.
+    :param name: (str) name to change.
+    :param rng: (Random) random number generator.
+    :return: (str) misspelled name.
+    """
+    pos = rng.randrange(len(name))
+    return name[:pos] + rng.choice('abcdefghijklmnopqrstuvwxyz') + name[pos + 1:]
+
+
+def bench_name_lookup(size=1_000_000, queries=200):
+    """
+    Measures the build time of a NameIndex over synthetic names and the average latency of
+    normalized, prefix, and typo-tolerant lookups, comparing the latter with an edit-distance
+    scan over every name.
+    :param size: (int) number of names indexed.
+    :param queries: (int) number of queries timed for each kind of lookup.
+    :return: (dict) build seconds and average milliseconds per query.
+    """
+    rng = random.Random(1)
+    names = synthetic_names(size)
+    build_secs, index = timed(lookup.NameIndex, names)
+    samples = rng.sample(names, queries)
+    typos = [add_typo(name, rng) for name in samples]
+    results = {'names': size, 'build_s': round(build_secs, 2)}
+    for label, func, args in (('lookup_ms', index.lookup, [name.lower() for name in samples]),
+                              ('complete_ms', index.complete, [name[:5] for name in samples]),
+                              ('suggest_ms', index.suggest, typos)):
+        secs = timed(lambda: [func(arg) for arg in args])[0]
+        results[label] = round(secs / queries * 1000, 3)
+    query = lookup.normalize_name(typos[0])
+    scan_secs = timed(lambda: [name for name in names
+                               if lookup.edit_distance(query, lookup.normalize_name(name), 2) <= 2])[0]
+    results['scan_ms'] = round(scan_secs * 1000, 3)
+    results['suggest_hit_rate'] = sum(name in [match for match, distance in index.suggest(typo)]
+                                      for name, typo in zip(samples, typos)) / queries
+    utl.print_pretty(results)
+    return results
+
+
+def check_oracle_files(data, pairs=200, seed=0):
+    """
+    Saves landmark oracles built from the cached data and loads them back: one from a graph keyed
+    by name, and one from a graph keyed by identity, both into the same build and, saved under
+    identities, into a build that numbers the vertices in a different order. Checks that the
+    loaded oracles give the same bounds as the saved ones.
+    :param data: (dict) faculty and institution data.
+    :param pairs: (int) number of random vertex pairs compared.
+    :param seed: (int) seed for the random number generator.
+    :return: (int) number of oracles loaded.
+    """
+    rng = random.Random(seed)
+    by_id = identity.build_identity_graph(data)
+    reordered = identity.build_identity_graph(dict(data, **{'auths-coauths': data['auths-coauths'][::-1]}))
+    cases = [(graph.build_graph(data), None), (by_id, None), (by_id, reordered)]
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'landmarks.npz')
+        for net, other in cases:
+            saved = oracle.build_landmark_oracle(net)
+            oracle.save_oracle(saved, path, umsi_net=net if other is not None else None)
+            loaded = oracle.load_oracle(other or net, path)
+            verts = list(net)
+            for _ in range(pairs):
+                start, end = rng.choice(verts), rng.choice(verts)
+                if other is not None:
+                    ids = other.identities.ids
+                    same = [other.get_vertex(ids[net.identities.keys[vert.get_id()]]) for vert in (start, end)]
+                else:
+                    same = [start, end]
+                assert loaded.bounds(*same) == saved.bounds(start, end), 'loaded oracle gives other bounds'
+    return len(cases)
+
+
+def bench_landmark_oracle(pairs=200, count=16):
+    """
+    Compares landmark oracle estimates with exact graph.bfs distances for random connected pairs,
+    on the cached graph and on a synthetic graph 50 times its size, reporting build time, query
+    times, the share of estimates that are exact, and the mean error of the upper bound.
+    :param pairs: (int) number of random vertex pairs queried on each graph.
+    :param count: (int) number of landmarks.
+    :return: (list) one dictionary of results for each graph.
+    """
+    rng = random.Random(0)
+    results = []
+    for label, net in (('cache', graph.build_graph(utl.read_json('cache.json'))),
+                       ('synthetic x50', synthetic_graph(1313 * 50, 129 * 50))):
+        build_secs, landmarks = timed(oracle.build_landmark_oracle, net, count)
+        verts = list(net)
+        queries, bfs_secs = [], 0
+        while len(queries) < pairs:
+            start, end = rng.choice(verts), rng.choice(verts)
+            secs, path = timed(graph.bfs, net, start, end)
+            if path is not None:
+                queries.append((start, end, path[0]))
+                bfs_secs += secs
+        oracle_secs, estimates = timed(lambda: [landmarks.bounds(start, end) for start, end, dist in queries])
+        errors = [upper - dist for (lower, upper), (start, end, dist) in zip(estimates, queries)]
+        exact = sum(error == 0 for error in errors)
+        within = sum(lower <= dist <= upper for (lower, upper), (start, end, dist) in zip(estimates, queries))
+        results.append({'graph': label, 'vertices': net.num_vertices, 'build_s': round(build_secs, 3),
+                        'oracle_us': round(oracle_secs / pairs * 1e6, 1), 'bfs_ms': round(bfs_secs / pairs * 1e3, 3),
+                        'exact_share': exact / pairs, 'mean_upper_error': sum(errors) / pairs,
+                        'within_bounds': within / pairs})
+    print(f'Saved and loaded {check_oracle_files(utl.read_json("cache.json"))} oracles with the same bounds.')
+    utl.print_pretty(results)
+    return results
+
+
+def planted_partition_arrays(num_edges, avg_degree=10, community_size=50, mixing=0.2, seed=0):
+    """
+    Generates a graph with planted communities directly in the compressed sparse row form of
+    graph.adjacency_arrays. Each edge joins two vertices of the same community, except for a
+    share of edges (mixing) that join random vertices.
+    :param num_edges: (int) number of undirected edges.
+    :param avg_degree: (int) average number of neighbors per vertex.
+    :param community_size: (int) number of vertices in each planted community.
+    :param mixing: (float) share of edges placed between random vertices.
+    :param seed: (int) seed for the random number generator.
+    :return: (tuple) indptr array, indices array, and planted community of each vertex.
+    """
+    rng = np.random.default_rng(seed)
+    num_vertices = max(community_size, 2 * num_edges // avg_degree)
+    planted = np.arange(num_vertices) // community_size
+    sources = rng.integers(num_vertices, size=num_edges)
+    inside = planted[sources] * community_size + rng.integers(community_size, size=num_edges)
+    targets = np.where(rng.random(num_edges) < mixing, rng.integers(num_vertices, size=num_edges),
+                       np.minimum(inside, num_vertices - 1))
+    indptr, indices = edges_to_arrays(sources, targets, num_vertices)
+    return indptr, indices, planted
+
+
+def edges_to_arrays(sources, targets, num_vertices):
+    """
+    Converts undirected edges into the compressed sparse row form of graph.adjacency_arrays,
+    listing each edge in both directions and dropping self-loops.
+    :param sources: (ndarray) first vertex of each edge.
+    :param targets: (ndarray) second vertex of each edge.
+    :param num_vertices: (int) number of vertices.
+    :return: (tuple) indptr array and indices array.
+    """
+    keep = sources != targets
+    rows = np.concatenate([sources[keep], targets[keep]])
+    cols = np.concatenate([targets[keep], sources[keep]])
+    order = np.argsort(rows, kind='stable')
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum(np.bincount(rows, minlength=num_vertices))
+    return indptr, cols[order]
+
+
+def power_law_arrays(num_edges, num_vertices, exponent=0.8, seed=0):
+    """
+    Generates a graph whose degrees follow a power law, so a few hub vertices have very many
+    neighbors, in the compressed sparse row form of graph.adjacency_arrays. Edge ends are drawn
+    with probability proportional to rank ** -exponent; repeated edges are removed.
+    :param num_edges: (int) number of edges drawn.
+    :param num_vertices: (int) number of vertices.
+    :param exponent: (float) larger values give more dominant hubs.
+    :param seed: (int) seed for the random number generator.
+    :return: (tuple) indptr array and indices array.
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.arange(1, num_vertices + 1, dtype=float) ** -exponent
+    ends = rng.choice(num_vertices, size=(num_edges, 2), p=weights / weights.sum())
+    ends = np.unique(np.sort(ends, axis=1), axis=0)
+    return edges_to_arrays(ends[:, 0], ends[:, 1], num_vertices)
+
+
+def check_identity_communities(data):
+    """
+    Detects communities in a graph keyed by identity from the cached data, and checks that the
+    community summary and the CSV file list vertices by name instead of by integer id.
+    :param data: (dict) faculty and institution data.
+    :return: (int) number of communities.
+    """
+    net = identity.build_identity_graph(data)
+    members = communities.detect_communities(net)
+    institutions = {vert.get_id() for vert in net if vert.get_type() == 'institution'}
+    names = {graph.vertex_name(net, key) for key in institutions}
+    summary = communities.summarize_communities(net, members)
+    assert all(name in names for row in summary for name in row[3]), 'summary lists institution ids'
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'communities.csv')
+        communities.communities_to_csv(net, path)
+        with open(path, encoding='utf-8', newline='') as file_obj:
+            rows = list(csv.reader(file_obj))
+    assert [row[0] for row in rows[1:]] == [graph.vertex_name(net, vert.get_id()) for vert in net], \
+        'CSV lists vertex ids'
+    return len(members)
+
+
+def bench_communities(edge_counts=(10_000, 100_000, 1_000_000)):
+    """
+    Measures the runtime and modularity of label propagation and the Louvain method on graphs
+    with planted communities, alongside the modularity of the planted communities.
+    :param edge_counts: (tuple) numbers of undirected edges in the generated graphs.
+    :return: (list) rows of edges, method, seconds, communities found, and modularity.
+    """
+    rows = []
+    for num_edges in edge_counts:
+        indptr, indices, planted = planted_partition_arrays(num_edges)
+        rows.append((num_edges, 'planted', 0, len(set(planted.tolist())),
+                     round(communities.modularity(indptr, indices, planted), 4)))
+        for method in (communities.label_propagation, communities.louvain):
+            secs, labels = timed(method, indptr, indices)
+            rows.append((num_edges, method.__name__, round(secs, 2), int(labels.max()) + 1,
+                         round(communities.modularity(indptr, indices, labels), 4)))
+    print(f'Identity graph: {check_identity_communities(utl.read_json("cache.json"))} communities listed by name.')
+    print('edges, method, seconds, communities, modularity')
+    utl.print_pretty(rows)
+    return rows
+
+
+def python_triangles(indptr, indices):
+    """
+    Counts the triangles of each vertex in pure Python by intersecting neighbor sets, the way
+    it would be done over the connected_to dictionaries of Vertex objects.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :return: (list) number of triangles containing each vertex.
+    """
+    ptr, nbrs = indptr.tolist(), indices.tolist()
+    sets = [set(nbrs[ptr[i]:ptr[i + 1]]) - {i} for i in range(len(ptr) - 1)]
+    return [sum(len(sets[i] & sets[j]) for j in sets[i]) // 2 for i in range(len(sets))]
+
+
+def bench_triangles(sizes=((100_000, 20_000), (500_000, 100_000), (2_000_000, 400_000))):
+    """
+    Compares pure Python triangle counting with the plain and degree-ordered sparse matrix
+    variants in clustering.count_triangles on the cached graph and on power-law graphs with hubs.
+    :param sizes: (tuple) pairs of edges drawn and vertices for the power-law graphs.
+    :return: (list) rows of graph, edges, largest degree, and seconds for each method.
+    """
+    keys, indptr, indices = graph.adjacency_arrays(graph.build_graph(utl.read_json('cache.json')))
+    graphs = [('cache', indptr, indices)]
+    graphs.extend((f'power law {edges:,}', *power_law_arrays(edges, verts)) for edges, verts in sizes)
+    rows = []
+    for label, indptr, indices in graphs:
+        python_secs, expected = timed(python_triangles, indptr, indices)
+        ordered_secs, ordered = timed(clustering.count_triangles, indptr, indices)
+        try:
+            plain_secs, plain = timed(clustering.count_triangles, indptr, indices, ordered=False)
+            assert plain.tolist() == expected
+            plain_secs = round(plain_secs, 3)
+        except MemoryError:
+            plain_secs = 'out of memory'
+        assert ordered.tolist() == expected
+        rows.append((label, len(indices) // 2, int(np.diff(indptr).max()), round(python_secs, 3),
+                     plain_secs, round(ordered_secs, 3)))
+    print('graph, edges, max degree, python (s), plain sparse (s), degree-ordered sparse (s)')
+    utl.print_pretty(rows)
+    return rows
+
+
+def bench_path_stats(samples=200, worker_counts=(1, 2, 4, 8)):
+    """
+    Times pathstats.distance_histograms with different numbers of worker processes on a synthetic
+    graph 50 times the size of the cached graph, and checks that every run gives the same
+    estimates. Speed-up is bounded by the number of CPUs on the machine.
+    :param samples: (int) number of source vertices.
+    :param worker_counts: (tuple) numbers of worker processes to try.
+    :return: (list) rows of workers, seconds, speed-up over one worker, and average path length.
+    """
+    net = synthetic_graph(1313 * 50, 129 * 50)
+    keys, indptr, indices = graph.adjacency_arrays(net)
+    connected = np.flatnonzero(np.diff(indptr) > 0)
+    sources = np.random.default_rng(0).choice(connected, size=samples, replace=False).tolist()
+    rows, baseline, expected = [], None, None
+    for workers in worker_counts:
+        secs, hists = timed(pathstats.distance_histograms, indptr, indices, sources, workers=workers)
+        stats = pathstats.summarize_distances(hists)
+        baseline = baseline or secs
+        expected = expected or stats['avg_path_length']
+        assert stats['avg_path_length'] == expected
+        rows.append((workers, round(secs, 3), round(baseline / secs, 2), round(stats['avg_path_length'], 3)))
+    print(f'{net.num_vertices:,} vertices, {samples} sources, {os.cpu_count()} CPUs')
+    print('workers, seconds, speed-up, average path length')
+    utl.print_pretty(rows)
+    return rows
+
+
+def fake_clients(data, latency=None, fail=None):
+    """
+    Returns pipeline clients that answer from cached data after sleeping, in place of the faculty
+    directory, Google Scholar, OpenAI, and Wikipedia.
+    :param data: (dict) cache data to answer from.
+    :param latency: (dict) client name mapped to seconds slept per call.
+    :param fail: (function) called with the person searched on Google Scholar, raises an error
+        when it returns True.
+    :return: (tuple) client name mapped to its function, and client name mapped to its number of
+        calls.
+    """
+    latency = {'faculty': 0.2, 'scholar': 0.05, 'affiliations': 0.1, 'finances': 0.02, **(latency or {})}
+    calls = {name: 0 for name in latency}
+    pages = {url: data['umsi_faculty'][i::len(data['umsi_pages'])] for i, url in enumerate(data['umsi_pages'])}
+    profiles = {profile['name'].lower(): profile for profile in data['auths-coauths']}
+    enriched = {}
+    for org in data['enrich_institutions']:
+        enriched.setdefault(org['org'], []).append(org)
+
+    def client(name, func):
+        def call(item):
+            calls[name] += 1
+            time.sleep(latency[name])
+            return func(item)
+        return call
+
+    def scholar(person):
+        if fail is not None and fail(person):
+            raise ConnectionError(f'blocked while searching for {person}')
+        return profiles.get(person.lower(), {'name': person, 'profile': 'not found'})
+
+    clients = {'faculty': client('faculty', lambda url: pages[url]),
+               'scholar': client('scholar', scholar),
+               'affiliations': client('affiliations', lambda affils: [affil.split(', ')[-1] for affil in affils]),
+               'finances': client('finances', lambda org: enriched.get(org, [{'org': org, 'endowment': None}]))}
+    return clients, calls
+
+
+def bench_pipeline():
+    """
+    Runs the data pipeline with fake clients that sleep in place of network calls, comparing
+    stages run one after another with one thread each (as when running the scripts by hand)
+    with the streaming pipeline, then interrupts a run with failures and resumes it from its
+    checkpoints. Checks that every run gives the same outputs in the same order, and that the
+    failed run leaves the cache file unchanged.
+    :return: (dict) seconds for each mode, the per-stage report of the streaming run, and the
+        client calls made by the failed run and by the resumed run.
+    """
+    data = utl.read_json('cache.json')
+    urls = data['umsi_pages']
+    results = {}
+
+    clients, calls = fake_clients(data)
+    stages = pipeline.build_stages(clients, workers={name: 1 for name in clients}, checkpoint_dir=None)
+    start = time.perf_counter()
+    items = urls
+    for stage in stages:
+        pipeline.run_stages([stage], items)
+        items = stage.outputs
+    results['one_by_one_s'] = round(time.perf_counter() - start, 2)
+    expected = [stage.outputs for stage in stages]
+
+    clients, calls = fake_clients(data)
+    secs, (stages, report) = timed(pipeline.run_pipeline, urls, clients, checkpoint_dir=None, cache_path=None)
+    assert [stage.outputs for stage in stages] == expected
+    results['streaming_s'] = round(secs, 2)
+    results['streaming_report'] = report
+
+    with tempfile.TemporaryDirectory() as checkpoints:
+        cache_path = os.path.join(checkpoints, 'cache.json')
+        utl.write_json(cache_path, data)
+        clients, calls = fake_clients(data, fail=lambda person: len(person) % 3 == 0)
+        stages, report = pipeline.run_pipeline(urls, clients, checkpoint_dir=checkpoints, cache_path=cache_path)
+        results['failed_run'] = {'calls': dict(calls), 'failed': sum(len(stage.errors) for stage in stages),
+                                 'cache_unchanged': utl.read_json(cache_path) == data}
+        clients, calls = fake_clients(data)
+        secs, (stages, report) = timed(pipeline.run_pipeline, urls, clients, checkpoint_dir=checkpoints,
+                                       cache_path=cache_path)
+        assert [stage.outputs for stage in stages] == expected
+        assert utl.read_json(cache_path)['auths-coauths'] == expected[1]
+        results['resumed_run'] = {'calls': dict(calls), 'seconds': round(secs, 2),
+                                  'resumed': {stage.name: stage.resumed for stage in stages}}
+    results['worker_crash'] = check_worker_crash()
+    utl.print_pretty(results)
+    return results
+
+
+def check_worker_crash(items=1000, timeout=60):
+    """
+    Runs two pipeline stages whose first stage returns outputs that cannot be written to its
+    checkpoint, so its workers fail outside func, and checks that run_stages raises the failure
+    instead of leaving the stages blocked on their bounded queues.
+    :param items: (int) number of inputs, many more than fit in the queues.
+    :param timeout: (float) seconds allowed before the run counts as blocked.
+    :return: (str) the exception raised by run_stages.
+    """
+    raised = []
+
+    def run(checkpoints):
+        stages = [pipeline.Stage('unwritable', lambda item: [object()], workers=2, checkpoint_dir=checkpoints),
+                  pipeline.Stage('next', lambda item: [item], workers=2)]
+        try:
+            pipeline.run_stages(stages, range(items), queue_size=4)
+        except TypeError as e:
+            raised.append(e)
+
+    with tempfile.TemporaryDirectory() as checkpoints:
+        runner = threading.Thread(target=run, args=(checkpoints,), daemon=True)
+        runner.start()
+        runner.join(timeout)
+    assert not runner.is_alive(), 'run_stages blocked after a worker failed'
+    assert raised, 'run_stages did not raise the failure of its worker'
+    return repr(raised[0])
+
+
+def directory_page(names, num_pages):
+    """
+    Renders a page of the UMSI faculty directory with the markup of the live site.
+    :param names: (list) faculty names on the page.
+    :param num_pages: (int) number of pages linked from the pager.
+    :return: (str) page HTML.
+    """
+    profiles = ''.join(f'<div class="research-person-profile views-row"><div class="photo"></div>'
+                       f'<h2><a href="/people/{html.escape(name.lower().replace(" ", "-"))}" '
+                       f'title="{html.escape(name)}&#039;s profile">{html.escape(name)}</a></h2>'
+                       f'<p class="title">Professor of Information</p></div>' for name in names)
+    pager = ''.join(f'<li><a href="?page={page}">{page + 1}</a></li>' for page in range(num_pages))
+    return (f'<!DOCTYPE html><html><head><title>Faculty</title></head><body><main>'
+            f'<div class="view-content"><div class="directory-teaser-group">{profiles}</div></div>'
+            f'<nav class="pager"><ul>{pager}</ul></nav></main></body></html>')
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    """
+    This class defines a static file handler that waits before answering, standing in for the
+    network latency of a remote site.
+
+    Attributes:
+        delay (float): seconds to wait before each response.
+    Methods:
+        do_GET: answers a request for a file after the delay.
+        log_message: silences request logging.
+    """
+    delay = 0.1
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        self.path = self.path.replace('?page=', 'page-') + '.html' if '?page=' in self.path else self.path
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def check_directory_fixture(path='directory_page.html'):
+    """
+    Parses the saved first page of the UMSI faculty directory and checks that the names and
+    pager links match those in cache.json.
+    :param path: (str) path of the saved page.
+    :return: (int) number of names on the page.
+    """
+    cache = utl.read_json('cache.json')
+    with open(path, encoding='utf-8') as file_obj:
+        page = file_obj.read()
+    names = scrape.parse_faculty_names(page)
+    assert names == cache['umsi_faculty'][:len(names)], 'names on the saved page do not match cache.json'
+    assert scrape.parse_page_urls(page) == cache['umsi_pages'], 'pager links do not match cache.json'
+    return len(names)
+
+
+def check_missing_browser(path='directory_page.html'):
+    """
+    Serves the saved directory page and a page that lists no faculty, and checks that
+    scrape.scrape_directory still returns the names on the saved page when the browser fallback
+    cannot be started because selenium is missing.
+    :param path: (str) path of the saved page.
+    :return: (int) number of names returned.
+    """
+    with open(path, encoding='utf-8') as file_obj:
+        page = file_obj.read()
+    expected = scrape.parse_faculty_names(page)
+    with tempfile.TemporaryDirectory() as root:
+        for num, html_text in enumerate([page, directory_page([], 2)]):
+            with open(os.path.join(root, f'page-{num}.html'), 'w', encoding='utf-8') as file_obj:
+                file_obj.write(html_text)
+        SlowHandler.delay = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(SlowHandler, directory=root))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f'http://127.0.0.1:{server.server_address[1]}/'
+        webdriver = scrape.webdriver
+        scrape.webdriver = None
+        try:
+            found = scrape.scrape_directory([f'{base}?page={num}' for num in range(2)], workers=2)
+        finally:
+            scrape.webdriver = webdriver
+            server.shutdown()
+            server.server_close()
+    assert found == expected, 'names from the readable page were lost when the browser was unavailable'
+    return len(found)
+
+
+def bench_directory_scrape(pages=(10, 100), worker_counts=(1, 4, 16), delay=0.1):
+    """
+    Serves saved directory pages from a local HTTP server that waits delay seconds before each
+    response, and times scrape.scrape_directory with different numbers of pooled workers against
+    reading the same pages with the browser. Checks that the names match those written to the
+    pages.
+    :param pages: (tuple) numbers of directory pages to serve.
+    :param worker_counts: (tuple) numbers of pages downloaded at a time.
+    :param delay: (float) seconds the server waits before each response.
+    :return: (list) rows of pages, method, seconds, and pages per second.
+    """
+    faculty = utl.read_json('cache.json')['umsi_faculty']
+    rows = []
+    for num_pages in pages:
+        names = [f'{name} {i}' if i else name for i in range(num_pages // 10 or 1) for name in faculty]
+        per_page = -(-len(names) // num_pages)
+        with tempfile.TemporaryDirectory() as root:
+            for page in range(num_pages):
+                with open(os.path.join(root, f'page-{page}.html'), 'w', encoding='utf-8') as file_obj:
+                    file_obj.write(directory_page(names[page * per_page:(page + 1) * per_page], num_pages))
+            SlowHandler.delay = delay
+            server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(SlowHandler, directory=root))
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            base = f'http://127.0.0.1:{server.server_address[1]}/'
+            urls = scrape.parse_page_urls(directory_page([], num_pages), base=base)
+            for workers in worker_counts:
+                secs, found = timed(scrape.scrape_directory, urls, workers=workers, fallback=False)
+                assert found == names
+                rows.append((num_pages, f'pooled http x{workers}', round(secs, 3), round(num_pages / secs, 1)))
+            try:
+                driver = scrape.get_driver()
+                try:
+                    secs, found = timed(lambda: [name for url in urls for name in scrape.get_faculty_names(driver, url)])
+                    rows.append((num_pages, 'browser', round(secs, 3), round(num_pages / secs, 1)))
+                finally:
+                    driver.quit()
+            except Exception as e:
+                rows.append((num_pages, 'browser', f'unavailable ({type(e).__name__})', None))
+            server.shutdown()
+            server.server_close()
+    print(f'Saved directory page: {check_directory_fixture()} names and pager links match cache.json.')
+    print(f'Browser unavailable: {check_missing_browser()} names kept from the readable page.')
+    print(f'server delay {delay} s per page')
+    print('pages, method, seconds, pages per second')
+    utl.print_pretty(rows)
+    return rows
+
+
+def mutate_graph(net, changes, seed=0):
+    """
+    Makes random changes to a graph: edges removed, new people connected to existing vertices,
+    people removed, and affiliations changed.
+    :param net: object of the Graph class, changed in place.
+    :param changes: (int) number of changes of each kind.
+    :param seed: (int) seed for the random number generator.
+    :return: object of the Graph class.
+    """
+    rng = random.Random(seed)
+    changed = net
+    keys = list(changed.get_vertices())
+    for _ in range(changes):
+        vert = changed.get_vertex(rng.choice(keys))
+        if vert is not None and vert.connected_to:
+            nbr = rng.choice(list(vert.get_connections())).get_id()
+            changed.remove_edge(vert.get_id(), nbr)
+            changed.remove_edge(nbr, vert.get_id())
+        other = rng.choice(keys)
+        if changed.get_vertex(other) is not None:
+            changed.add_edge(f'New person {_}', other)
+            changed.add_edge(other, f'New person {_}')
+    for key in rng.sample(keys, changes):
+        if changed.get_vertex(key) is not None and changed.get_vertex(key).get_type() == 'person':
+            changed.remove_vertex(key)
+    for key in rng.sample(keys, changes):
+        if changed.get_vertex(key) is not None:
+            changed.get_vertex(key).set_affiliation('Professor, Institution 0')
+    return changed
+
+
+def python_diff(old_json, new_json):
+    """
+    Compares two exported graphs with Python sets of vertex keys and unordered pairs, as a
+    baseline for graphdiff.
+    :param old_json: (dict) earlier exported graph.
+    :param new_json: (dict) later exported graph.
+    :return: (tuple) numbers of added and removed vertices and edges, and of changed vertices.
+    """
+    old_edges = {frozenset((key, nbr)) for key, value in old_json.items() for nbr in value['connected_to']}
+    new_edges = {frozenset((key, nbr)) for key, value in new_json.items() for nbr in value['connected_to']}
+    changed = sum(1 for key, value in new_json.items() if key in old_json
+                  and any(value[attr] != old_json[key][attr] for attr in graphdiff.ATTRIBUTES))
+    return (len(new_json.keys() - old_json.keys()), len(old_json.keys() - new_json.keys()),
+            len(new_edges - old_edges), len(old_edges - new_edges), changed)
+
+
+def check_identity_diff(data, drop=0):
+    """
+    Builds graphs keyed by identity from the cached data with and without one faculty record, and
+    checks that graphdiff reports the same delta for the two builds as for their exported JSON
+    files, which are labeled by identity.
+    :param data: (dict) faculty and institution data.
+    :param drop: (int) position of the faculty record left out of the second build.
+    :return: (dict) counts in the delta.
+    """
+    old = identity.build_identity_graph(data)
+    new = identity.build_identity_graph(dict(data, **{'auths-coauths': [
+        faculty for i, faculty in enumerate(data['auths-coauths']) if i != drop]}))
+    delta = graphdiff.diff_graphs(old, new)
+    with tempfile.TemporaryDirectory() as root:
+        old_path, new_path = os.path.join(root, 'old.json'), os.path.join(root, 'new.json')
+        graph.graph_to_json(old, old_path)
+        graph.graph_to_json(new, new_path)
+        json_delta = graphdiff.diff_graphs(old_path, new_path)
+    assert delta == json_delta, 'diff of identity builds does not match the diff of their exports'
+    assert not delta['counts']['vertices_added'] and not delta['counts']['edges_added'], \
+        'leaving out a faculty record added vertices or edges'
+    return delta['counts']
+
+
+def bench_graph_diff(sizes=((20_000, 2_000), (200_000, 20_000)), changes=1000):
+    """
+    Times graphdiff on synthetic graphs and randomly changed copies, comparing the two builds
+    directly and through exported JSON files, against a baseline using Python sets of pairs.
+    :param sizes: (tuple) pairs of people and institutions in the synthetic graphs.
+    :param changes: (int) number of changes of each kind made by mutate_graph.
+    :return: (list) rows of vertices, edges, seconds for builds, seconds for JSON files including
+        reading them, seconds for the Python baseline, and the counts in the delta.
+    """
+    rows = []
+    for people, insts in sizes:
+        old = synthetic_graph(people, insts)
+        new = mutate_graph(synthetic_graph(people, insts), changes)
+        build_secs, delta = timed(graphdiff.diff_graphs, old, new)
+        with tempfile.TemporaryDirectory() as root:
+            old_path, new_path = os.path.join(root, 'old.json'), os.path.join(root, 'new.json')
+            graph.graph_to_json(old, old_path)
+            graph.graph_to_json(new, new_path)
+            json_secs, json_delta = timed(graphdiff.diff_graphs, old_path, new_path)
+            old_json, new_json = utl.read_json(old_path), utl.read_json(new_path)
+        python_secs, expected = timed(python_diff, old_json, new_json)
+        counts = delta['counts']
+        assert json_delta['counts'] == counts
+        assert tuple(counts.values()) == expected
+        rows.append((old.num_vertices, len(graph.adjacency_arrays(old)[2]) // 2, round(build_secs, 3),
+                     round(json_secs, 3), round(python_secs, 3), counts))
+    counts = check_identity_diff(utl.read_json('cache.json'))
+    print(f'Identity builds without one faculty record: {counts}')
+    print('vertices, edges, graphdiff on builds (s), graphdiff on JSON files (s), python sets (s), delta')
+    utl.print_pretty(rows)
+    return rows
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident memory of the current process so far.
+    :return: (float) megabytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def stream_synthetic_graph(writer, num_people, num_institutions, coauthors=3, affiliated=0.6, seed=0):
+    """
+    Adds a random graph shaped like the UMSI graph to a DiskGraphWriter one vertex and edge at a
+    time, without holding it in memory. People are affiliated with 'Professor, Institution i'.
+    :param writer: (DiskGraphWriter) writer to add to.
+    :param num_people: (int) number of person vertices.
+    :param num_institutions: (int) number of institution vertices.
+    :param coauthors: (int) number of co-authorships started by each person.
+    :param affiliated: (float) share of people with an affiliation.
+    :param seed: (int) seed for the random number generator.
+    :return: (function) affiliation matcher for DiskGraphWriter.finish.
+    """
+    rng = random.Random(seed)
+    for i in range(num_institutions):
+        writer.add_vertex(f'Institution {i}', 'institution', affil_endow=f'${rng.randint(1, 999)} million (2022)')
+    for i in range(num_people):
+        affil = f'Professor, Institution {rng.randrange(num_institutions)}' if rng.random() < affiliated else None
+        writer.add_vertex(f'Person {i}', 'person', affil)
+        for _ in range(coauthors):
+            other = f'Person {rng.randrange(num_people)}'
+            writer.add_edge(f'Person {i}', other)
+            writer.add_edge(other, f'Person {i}')
+    return lambda affil: [affil[len('Professor, '):]] if affil.startswith('Professor, ') else []
+
+
+def disk_graph_worker(num_people, num_institutions, budget_mb, queries, results):
+    """
+    Builds and queries a synthetic DiskGraph in a fresh process so its peak resident memory can
+    be measured, recording seconds and peak memory above the starting point after each step.
+    :param num_people: (int) number of person vertices.
+    :param num_institutions: (int) number of institution vertices.
+    :param budget_mb: (int) memory budget in megabytes.
+    :param queries: (int) number of breadth-first searches between random people.
+    :param results: (Queue) queue the results are put on.
+    :return: none.
+    """
+    start_mb = peak_rss_mb()
+    budget = budget_mb * diskgraph.MEGABYTE
+    row = {'people': num_people, 'budget_mb': budget_mb}
+    with tempfile.TemporaryDirectory() as root:
+        def build():
+            writer = diskgraph.DiskGraphWriter(os.path.join(root, 'graph'), budget)
+            return writer.finish(stream_synthetic_graph(writer, num_people, num_institutions))
+
+        secs, disk_net = timed(build)
+        row['build_s'] = round(secs, 2)
+        row['build_peak_mb'] = round(peak_rss_mb() - start_mb, 1)
+        row['edges'] = disk_net.num_edges
+        row['files_mb'] = round(sum(os.path.getsize(os.path.join(root, 'graph', name))
+                                    for name in os.listdir(os.path.join(root, 'graph'))) / diskgraph.MEGABYTE, 1)
+        rng = random.Random(1)
+        pairs = [(f'Person {rng.randrange(num_people)}', f'Person {rng.randrange(num_people)}') for _ in range(queries)]
+        secs, paths = timed(lambda: [diskgraph.bfs(disk_net, start, end) for start, end in pairs])
+        row['bfs_ms'] = round(secs / queries * 1e3, 1)
+        secs, top = timed(diskgraph.get_degrees, disk_net, 10)
+        row['top_degrees_ms'] = round(secs * 1e3, 1)
+        secs, _ = timed(diskgraph.orgs_to_csv, disk_net, os.path.join(root, 'institutions.csv'))
+        row['orgs_csv_s'] = round(secs, 2)
+        row['query_peak_mb'] = round(peak_rss_mb() - start_mb, 1)
+        disk_net.close()
+    results.put(row)
+
+
+def check_disk_build(data):
+    """
+    Builds the cached data, with a co-author whose affiliation names a faculty member added, both
+    with graph.build_graph and diskgraph.build_disk_graph, and checks that the exported vertices,
+    edges, and attributes are the same.
+    :param data: (dict) faculty and institution data.
+    :return: (int) number of edges.
+    """
+    faculty = [dict(record) for record in data['auths-coauths']]
+    mentor = faculty[0]['name']
+    faculty[1]['coauthors'] = (faculty[1].get('coauthors') or []) + [
+        {'name': 'Postdoc Fixture', 'affiliation': f'Postdoc with {mentor}, University of Michigan'}]
+    data = dict(data, **{'auths-coauths': faculty})
+    with contextlib.redirect_stderr(io.StringIO()):
+        net = graph.build_graph(data)
+    with tempfile.TemporaryDirectory() as root:
+        disk_net = diskgraph.build_disk_graph(data, os.path.join(root, 'disk'))
+        graph.graph_to_json(net, os.path.join(root, 'memory.json'))
+        diskgraph.graph_to_json(disk_net, os.path.join(root, 'disk.json'))
+        expected = utl.read_json(os.path.join(root, 'memory.json'))
+        found = utl.read_json(os.path.join(root, 'disk.json'))
+    assert expected.keys() == found.keys(), 'disk graph has other vertices'
+    for key, value in expected.items():
+        assert set(value['connected_to']) == set(found[key]['connected_to']), f'edges of {key} differ'
+        assert all(value[attr] == found[key][attr] for attr in graphdiff.ATTRIBUTES), f'attributes of {key} differ'
+    assert mentor in expected['Postdoc Fixture']['connected_to'], 'affiliation did not connect to the faculty member'
+    return disk_net.num_edges // 2
+
+
+def bench_disk_graph(sizes=((200_000, 20_000), (2_000_000, 200_000)), budget_mb=32, queries=20):
+    """
+    Builds synthetic graphs larger than a memory budget as DiskGraphs and queries them with
+    breadth-first searches, top degrees, and the institutions export, each in a fresh process,
+    reporting time and peak resident memory above the process's starting point. The smaller
+    graph is also built in memory as a Graph for comparison.
+    :param sizes: (tuple) pairs of people and institutions.
+    :param budget_mb: (int) memory budget in megabytes.
+    :param queries: (int) number of breadth-first searches.
+    :return: (list) one dictionary of results for each graph.
+    """
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    for people, insts in sizes:
+        results = context.Queue()
+        process = context.Process(target=disk_graph_worker, args=(people, insts, budget_mb, queries, results))
+        process.start()
+        rows.append(results.get())
+        process.join()
+    print(f'Cached data built on disk and in memory: {check_disk_build(utl.read_json("cache.json"))} edges match.')
+    start_mb = peak_rss_mb()
+    secs, net = timed(synthetic_graph, sizes[0][0], sizes[0][1], coauthors=3)
+    rows.append({'people': sizes[0][0], 'in_memory_graph_build_s': round(secs, 2),
+                 'in_memory_graph_peak_mb': round(peak_rss_mb() - start_mb, 1)})
+    utl.print_pretty(rows)
+    return rows
+
+
+def copy_subgraph(net, keep_vertex, keep_edge=None):
+    """
+    Copies the vertices and edges of a graph that pass a vertex and an edge filter into a new
+    Graph, as analyses did before subgraph views, as a baseline for graph.SubgraphView.
+    :param net: object of the Graph class.
+    :param keep_vertex: (function) called with a Vertex, returns True for vertices copied.
+    :param keep_edge: (function | None) called with both ends of an edge, returns True for edges
+        copied, None for all.
+    :return: object of the Graph class.
+    """
+    sub = graph.Graph()
+    for vert in net:
+        if keep_vertex(vert):
+            new_vert = sub.add_vertex(vert.get_id())
+            new_vert.set_type(vert.get_type())
+            new_vert.set_affiliation(vert.get_affiliation())
+            new_vert.set_affil_endow(vert.get_affil_endow())
+    for vert in net:
+        if keep_vertex(vert):
+            for nbr in vert.get_connections():
+                if keep_vertex(nbr) and (keep_edge is None or keep_edge(vert, nbr)):
+                    sub.add_edge(vert.get_id(), nbr.get_id(), vert.get_weight(nbr))
+    return sub
+
+
+def run_view_queries(net, pairs, root):
+    """
+    Runs the queries that accept a subgraph view on a graph or view: breadth-first searches,
+    degrees, average degree, and both exports.
+    :param net: object of the Graph class, or a SubgraphView of one.
+    :param pairs: (list) pairs of keys searched for with bfs.
+    :param root: (str) directory the exports are written to.
+    :return: (tuple) seconds for the searches, degrees, and exports, and their results.
+    """
+    bfs_secs, paths = timed(lambda: [graph.bfs(net, net.get_vertex(f), net.get_vertex(t)) for f, t in pairs])
+    degree_secs, degrees = timed(lambda: (graph.get_degrees(net), graph.get_avg_degree(net)))
+    export_secs, _ = timed(lambda: (graph.graph_to_json(net, os.path.join(root, 'graph.json')),
+                                    graph.orgs_to_csv(net, os.path.join(root, 'institutions.csv'))))
+    with open(os.path.join(root, 'graph.json'), 'rb') as json_file, \
+            open(os.path.join(root, 'institutions.csv'), 'rb') as csv_file:
+        exports = json_file.read(), csv_file.read()
+    return bfs_secs, degree_secs, export_secs, ([path and path[0] for path in paths], degrees, exports)
+
+
+def bench_ego_network(hops=(1, 2, 3), repeats=100):
+    """
+    Times ego networks around the most connected faculty member, computed from scratch and read
+    from the graph's neighborhoods cache, and checks that a cached ego network is recomputed once
+    the affiliation of one of its vertices changes.
+    :param hops: (tuple) values of k timed.
+    :param repeats: (int) number of cached reads timed for each k.
+    :return: (list) rows of k, vertices, seconds from scratch, microseconds from the cache, and
+        whether the ego network read after the change has the new affiliation.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    center = umsi_net.get_vertex(oracle.select_landmarks(umsi_net, 1)[0])
+    rows = []
+    for k in hops:
+        cold_secs, ego = timed(graph.ego_network, umsi_net, center, k=k)
+        warm_secs = timed(lambda: [graph.ego_network(umsi_net, center, k=k) for _ in range(repeats)])[0]
+        nbr = next(iter(center.get_connections()))
+        old_affil = nbr.get_affiliation()
+        nbr.set_affiliation(f'Changed for k={k}')
+        fresh = graph.ego_network(umsi_net, center, k=k).get_vertex(nbr.get_id()).get_affiliation()
+        nbr.set_affiliation(old_affil)
+        rows.append((k, ego.num_vertices, round(cold_secs, 4), round(warm_secs / repeats * 1e6, 1),
+                     fresh == f'Changed for k={k}'))
+    print('k, vertices, from scratch (s), from cache (us), sees changed attribute')
+    utl.print_pretty(rows)
+    return rows
+
+
+def bench_subgraph_views(size=(200_000, 20_000), queries=50):
+    """
+    Compares subgraph views of a synthetic graph with copies holding the same vertices and edges:
+    memory allocated and seconds taken to create each, and seconds taken by breadth-first
+    searches, degrees, and exports on each, checking that both give the same results.
+    :param size: (tuple) people and institutions in the synthetic graph.
+    :param queries: (int) number of breadth-first searches between random vertices of the view.
+    :return: (list) one dictionary of results for each view.
+    """
+    net = synthetic_graph(*size, coauthors=3)
+    people = lambda vert: vert.get_type() == 'person'
+    affiliations = lambda vert, nbr: graph.edge_type(vert, nbr) == 'institution-person'
+    views = {'people': (lambda: graph.people_view(net), lambda: copy_subgraph(net, people)),
+             'institutions': (lambda: graph.institutions_view(net),
+                              lambda: copy_subgraph(net, lambda vert: vert.get_type() == 'institution')),
+             'affiliation edges': (lambda: graph.typed_view(net, edge_types=['institution-person']),
+                                   lambda: copy_subgraph(net, lambda vert: True, affiliations))}
+    rows = []
+    for name, (make_view, make_copy) in views.items():
+        row = {'view': name}
+        for kind, make in (('view', make_view), ('copy', make_copy)):
+            tracemalloc.start()
+            secs, sub = timed(make)
+            row[f'{kind}_bytes'] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            row[f'{kind}_create_s'] = round(secs, 4)
+            if kind == 'view':
+                rng = random.Random(0)
+                keys = sub.get_vertices()
+                row['vertices'] = len(keys)
+                pairs = [(rng.choice(keys), rng.choice(keys)) for _ in range(queries)]
+            with tempfile.TemporaryDirectory() as root:
+                bfs_secs, degree_secs, export_secs, results = run_view_queries(sub, pairs, root)
+            row[f'{kind}_bfs_ms'] = round(bfs_secs / queries * 1e3, 2)
+            row[f'{kind}_degrees_s'] = round(degree_secs, 3)
+            row[f'{kind}_exports_s'] = round(export_secs, 3)
+            row[f'{kind}_results'] = results
+            del sub
+        row['same_results'] = row.pop('view_results') == row.pop('copy_results')
+        rows.append(row)
+    utl.print_pretty(rows)
+    return rows
+
+
+def bench_identity(factor=4, lookups=1_000_000, queries=200):
+    """
+    Compares the graph keyed by display name from build_graph with the graph keyed by identity
+    from identity.build_identity_graph, both built from a scaled-up cache: number of vertices,
+    homonyms and name variants, and seconds for key lookups, name lookups, breadth-first searches,
+    degrees, and the JSON export. Name keys are looked up as new string objects, as they arrive
+    from input or a file, so their hash is computed on each lookup. Also checks on the cache that
+    the functions of graph.py and the modules built on it accept the graph keyed by identity:
+    update_graph matches a rebuild, and names, faculty, and UMSI's collaborations are found.
+    :param factor: (int) scale factor applied to the cache with scale_cache.
+    :param lookups: (int) number of key lookups timed.
+    :param queries: (int) number of name lookups and breadth-first searches timed.
+    :return: (dict) counts from identity.summarize_identities and seconds for each graph.
+    """
+    data = scale_cache(utl.read_json('cache.json'), factor)
+    by_name_secs, by_name = timed(graph.build_graph, data)
+    by_id_secs, by_id = timed(identity.build_identity_graph, data)
+    stats = identity.summarize_identities(data, by_id)
+    stats.update({'build_by_name_s': round(by_name_secs, 2), 'build_by_identity_s': round(by_id_secs, 2)})
+
+    rng = random.Random(0)
+    names = [rng.choice(list(by_name.get_vertices())) for _ in range(lookups)]
+    fresh = [''.join(list(name)) for name in names]
+    ids = [rng.randrange(len(by_id.identities)) for _ in range(lookups)]
+    stats['key_lookup_by_name_ns'] = round(timed(lambda: [by_name.get_vertex(key) for key in fresh])[0] / lookups * 1e9)
+    stats['key_lookup_by_identity_ns'] = round(timed(lambda: [by_id.get_vertex(key) for key in ids])[0] / lookups * 1e9)
+    queried = [name.upper() for name in names[:queries]]
+    lookup.get_name_index(by_name)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats['name_lookup_by_name_us'] = round(
+            timed(lambda: [lookup.find_vertex(by_name, name) for name in queried])[0] / queries * 1e6, 1)
+    stats['name_lookup_by_identity_us'] = round(
+        timed(lambda: [identity.find_vertices(by_id, name) for name in queried])[0] / queries * 1e6, 1)
+    lookup.get_name_index(by_id)
+    with contextlib.redirect_stdout(io.StringIO()):
+        stats['find_vertex_by_identity_us'] = round(
+            timed(lambda: [lookup.find_vertex(by_id, name) for name in queried])[0] / queries * 1e6, 1)
+
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(queries)]
+    id_pairs = [(by_id.identities.find(f)[0], by_id.identities.find(t)[0]) for f, t in pairs]
+    for kind, net, keys in (('by_name', by_name, pairs), ('by_identity', by_id, id_pairs)):
+        secs = timed(lambda: [graph.bfs(net, net.get_vertex(f), net.get_vertex(t)) for f, t in keys])[0]
+        stats[f'bfs_{kind}_ms'] = round(secs / queries * 1e3, 3)
+        stats[f'degrees_{kind}_s'] = round(timed(graph.get_degrees, net)[0], 3)
+        with tempfile.TemporaryDirectory() as root:
+            stats[f'export_{kind}_s'] = round(timed(graph.graph_to_json, net, os.path.join(root, 'graph.json'))[0], 3)
+
+    base = utl.read_json('cache.json')
+    checked = identity.build_identity_graph(base)
+    updated = edit_cache(base, 4)
+    graph.update_graph(checked, updated)
+    assert graph_state(checked) == graph_state(identity.build_identity_graph(updated))
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert lookup.find_vertex(checked, 'ixchel faniel') is not None
+    assert all(isinstance(name, str) for name, _ in graph.get_degrees(checked))
+    assert len(graph.faculty_view(checked, coauthors=False)) == len(checked.identities.faculty)
+    stats['umsi_partners_by_identity'] = len(collaboration.build_collaboration_matrix(checked).top_partners('UMSI', k=None))
+    utl.print_pretty(stats)
+    return stats
+
+
+def layered_graph(width, depth):
+    """
+    Builds a graph of depth layers of width vertices between a start and an end vertex, each
+    vertex connected to every vertex of the next layer, so that width ** depth shortest paths
+    connect the start and end.
+    :param width: (int) number of vertices in each layer.
+    :param depth: (int) number of layers.
+    :return: object of the Graph class, with the vertices 'start' and 'end'.
+    """
+    net = graph.Graph()
+    previous = ['start']
+    for layer in range(depth):
+        current = [f'Person {layer}-{i}' for i in range(width)]
+        for f in previous:
+            for t in current:
+                net.add_edge(f, t)
+                net.add_edge(t, f)
+        previous = current
+    for f in previous:
+        net.add_edge(f, 'end')
+        net.add_edge('end', f)
+    return net
+
+
+def check_identity_paths(data):
+    """
+    Builds a graph keyed by identity from the cached data and checks that the shortest paths
+    between two faculty, and the summary main.get_links prints for them, name the vertices
+    instead of listing their integer ids.
+    :param data: (dict) faculty and institution data.
+    :return: (int) number of shortest paths between the two faculty.
+    """
+    net = identity.build_identity_graph(data)
+    faculty = [net.get_vertex(key) for key in sorted(graph.faculty_keys(net))]
+    dag = max((graph.shortest_paths(net, faculty[0], vert) for vert in faculty[1:]),
+              key=lambda found: (found.distance or 0, found.count()))
+    names = [graph.vertex_name(net, dag.start.get_id()), graph.vertex_name(net, dag.end.get_id())]
+    assert all(isinstance(name, str) for path in dag.paths() for name in path), 'paths list vertex ids'
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        cli.get_links(net, *names)
+    printed = out.getvalue()
+    assert f'connect {names[0]} and {names[1]}.' in printed and f'{names[0]} is {dag.distance} degrees' in printed
+    for vert, _, _ in dag.top_intermediates(5):
+        assert graph.vertex_name(net, vert.get_id()) in printed, 'summary lists vertex ids'
+    return dag.count()
+
+
+def bench_shortest_paths(size=(200_000, 20_000), queries=20, layers=((4, 50), (16, 500)), streamed=1000):
+    """
+    Compares graph.shortest_paths with graph.bfs: seconds and peak memory per query between random
+    vertices of a synthetic graph, with the number of shortest paths found, and, on layered graphs
+    with an exponential number of shortest paths, the seconds and peak memory to count them and to
+    stream the first paths.
+    :param size: (tuple) people and institutions in the synthetic graph.
+    :param queries: (int) number of pairs of random vertices searched.
+    :param layers: (tuple) width and depth of each layered graph.
+    :param streamed: (int) number of paths streamed from each layered graph.
+    :return: (dict) results for the synthetic graph and each layered graph.
+    """
+    def measure(func):
+        secs, result = timed(func)
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return secs, peak, result
+
+    net = synthetic_graph(*size, coauthors=3)
+    rng = random.Random(0)
+    keys = list(net.get_vertices())
+    pairs = [(net.get_vertex(rng.choice(keys)), net.get_vertex(rng.choice(keys))) for _ in range(queries)]
+    bfs_secs, bfs_peak, _ = measure(lambda: [graph.bfs(net, f, t) for f, t in pairs])
+    dag_secs, dag_peak, dags = measure(lambda: [graph.shortest_paths(net, f, t) for f, t in pairs])
+    counts = [dag.count() for dag in dags if dag.distance]
+    stats = {'synthetic': {'vertices': len(keys), 'bfs_ms': round(bfs_secs / queries * 1e3, 2),
+                           'shortest_paths_ms': round(dag_secs / queries * 1e3, 2),
+                           'bfs_peak_mb': round(bfs_peak / 2 ** 20, 1),
+                           'shortest_paths_peak_mb': round(dag_peak / 2 ** 20, 1),
+                           'median_paths': int(np.median(counts)), 'max_paths': max(counts),
+                           'same_distances': [dag.distance for dag in dags] == [
+                               path and path[0] for path in (graph.bfs(net, f, t) for f, t in pairs)]}}
+    del dags
+    for width, depth in layers:
+        net = layered_graph(width, depth)
+        start, end = net.get_vertex('start'), net.get_vertex('end')
+        count_secs, count_peak, dag = measure(lambda: graph.shortest_paths(net, start, end))
+        stream_secs, stream_peak, paths = measure(lambda: sum(1 for _ in itertools.islice(dag.paths(), streamed)))
+        stats[f'layered {width}x{depth}'] = {'edges': sum(len(vert.connected_to) for vert in net),
+                                             'path_count_digits': len(str(dag.count())), 'count_s': round(count_secs, 3),
+                                             'count_peak_mb': round(count_peak / 2 ** 20, 2),
+                                             'stream_ms': round(stream_secs * 1e3, 1), 'streamed': paths,
+                                             'stream_peak_kb': round(stream_peak / 2 ** 10, 1),
+                                             'top_share': dag.top_intermediates(1)[0][2]}
+    stats['identity paths'] = check_identity_paths(utl.read_json('cache.json'))
+    utl.print_pretty(stats)
+    return stats
+
+
+def bench_affiliations(repeats=20):
+    """
+    Measures the rule-based affiliation classifier on the co-author affiliations in the cache: the
+    share resolved without the OpenAI API, the API calls and seconds of waiting saved (see
+    affiliations.estimate_savings), and the time to build the classifier and classify each
+    affiliation. Affiliations with an unknown employer after "at", "for", or "of" must be left for the
+    model rather than resolved to the other institutions listed with them.
+    :param repeats: (int) number of times the affiliations are classified for timing.
+    :return: (dict) counts from affiliations.estimate_savings and timings.
+    """
+    data = utl.read_json('cache.json')
+    affils = [coauth.get('affiliation') for faculty in data.get('auths-coauths')
+              for coauth in faculty.get('coauthors') or []]
+    build_secs, classifier = timed(lambda: affiliations.AffiliationClassifier(affiliations.known_institutions(data)))
+    expected = {'Professor at ETH Zurich, Microsoft Research': None,
+                'Postdoc at Allen Institute for AI; Stanford University': None,
+                'PhD student at Fooville University, MIT': None,
+                'Professor of Fooville University, MIT': None,
+                'Associate Dean for Research, Indiana University': ['Indiana University'],
+                'Ph.D. Candidate at the University of Michigan': ['University of Michigan'],
+                'Assistant Professor of Information, University of Michigan': ['University of Michigan']}
+    for affil, orgs in expected.items():
+        assert classifier.classify(affil) == orgs, affil
+    stats = affiliations.estimate_savings(affils, classifier)
+    stats['known_institutions'] = len(classifier.known)
+    stats['build_ms'] = round(build_secs * 1e3, 1)
+    secs = timed(lambda: [classifier.classify(affil) for _ in range(repeats) for affil in affils])[0]
+    stats['classify_us'] = round(secs / (repeats * len(affils)) * 1e6, 1)
+    utl.print_pretty(stats)
+    return stats
+
+
+BENCHMARKS = {'incremental': bench_incremental_update, 'memory': bench_vertex_memory,
+              'collaboration': bench_collaboration_matrix, 'endowments': bench_endowment_render,
+              'lookup': bench_name_lookup, 'oracle': bench_landmark_oracle,
+              'communities': bench_communities, 'triangles': bench_triangles,
+              'paths': bench_path_stats, 'pipeline': bench_pipeline,
+              'scrape': bench_directory_scrape, 'diff': bench_graph_diff,
+              'disk': bench_disk_graph, 'views': bench_subgraph_views, 'ego': bench_ego_network, 'identity': bench_identity,
+              'affiliations': bench_affiliations, 'paths_dag': bench_shortest_paths}
+
+
+def main():
+    """
+    Entry point for program. Runs the benchmarks named on the command line, or all of them.
+
+    :params: none.
+    :return: none.
+    """
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+from scipy import sparse
+
+import graph
+import helper as utl
+
+
+def adjacency_matrix(indptr, indices):
+    """
+    Builds the 0/1 sparse adjacency matrix of a graph given in compressed sparse row form,
+    without self-loops or repeated edges.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :return: (csr_matrix) symmetric adjacency matrix.
+    """
+    size = len(indptr) - 1
+    matrix = sparse.csr_matrix((np.ones(len(indices), dtype=np.int64), indices, indptr), shape=(size, size))
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    matrix.data[:] = 1
+    return matrix
+
+
+def count_triangles(indptr, indices, ordered=True):
+    """
+    Counts the triangles each vertex belongs to with sparse matrix products.
+
+    The plain variant computes (A @ A) * A, which lists every pair of neighbors of every vertex,
+    so a vertex with d neighbors costs d ** 2. The degree-ordered variant keeps only edges
+    pointing from the lower-degree to the higher-degree end (U), so every triangle is found once
+    through vertices' out-neighbors, and hubs, which have few out-neighbors, stay cheap. A
+    triangle u -> v -> w with u -> w is credited to its source u and sink w through
+    (U @ U) * U, and to its middle vertex v through (U.T @ U) * U.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param ordered: (bool) if True, uses the degree-ordered variant.
+    :return: (ndarray) number of triangles containing each vertex.
+    """
+    adj = adjacency_matrix(indptr, indices)
+    if not ordered:
+        return np.asarray((adj @ adj).multiply(adj).sum(axis=1)).ravel() // 2
+    degrees = np.diff(adj.indptr)
+    rank = np.empty(len(degrees), dtype=np.int64)
+    rank[np.lexsort((np.arange(len(degrees)), degrees))] = np.arange(len(degrees))
+    coo = adj.tocoo()
+    forward = rank[coo.row] < rank[coo.col]
+    upper = sparse.csr_matrix((coo.data[forward], (coo.row[forward], coo.col[forward])), shape=adj.shape)
+    ends = (upper @ upper).multiply(upper)
+    middles = (upper.T @ upper).multiply(upper)
+    return (np.asarray(ends.sum(axis=1)).ravel() + np.asarray(ends.sum(axis=0)).ravel()
+            + np.asarray(middles.sum(axis=1)).ravel())
+
+
+def clustering_coefficients(indptr, indices, ordered=True):
+    """
+    Computes each vertex's local clustering coefficient, the share of pairs of its neighbors
+    that are connected to each other, and the global transitivity of the graph, the share of
+    connected triples of vertices that close into triangles.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param ordered: (bool) if True, counts triangles with the degree-ordered variant.
+    :return: (tuple) triangles per vertex, clustering coefficient per vertex, and transitivity.
+    """
+    triangles = count_triangles(indptr, indices, ordered=ordered)
+    degrees = np.diff(adjacency_matrix(indptr, indices).indptr)
+    pairs = degrees * (degrees - 1) / 2
+    coefficients = np.divide(triangles, pairs, out=np.zeros(len(pairs)), where=pairs > 0)
+    transitivity = triangles.sum() / pairs.sum() if pairs.sum() else 0.0
+    return triangles, coefficients, float(transitivity)
+
+
+def get_clustering(umsi_net):
+    """
+    Returns the triangle counts and clustering coefficients of the graph's vertices, computing
+    them only when the graph has changed since they were last computed.
+    :param umsi_net: object of the Graph class.
+    :return: (tuple) dictionary of vertex key mapped to its number of triangles and clustering
+        coefficient, and the global transitivity of the graph.
+    """
+    def compute(net):
+        keys, indptr, indices = graph.get_adjacency_arrays(net)
+        triangles, coefficients, transitivity = clustering_coefficients(indptr, indices)
+        return dict(zip(keys, zip(triangles.tolist(), coefficients.tolist()))), transitivity
+
+    return graph.cached_result(umsi_net, 'clustering', compute)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    clustering, transitivity = get_clustering(umsi_net)
+    print(transitivity)
+    utl.print_pretty([(key, degree, clustering[key]) for key, degree in graph.get_degrees(umsi_net)[:10]])
+
+
+if __name__ == '__main__':
+    main()
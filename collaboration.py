@@ -0,0 +1,146 @@
+import math
+
+import numpy as np
+from scipy import sparse
+
+import graph
+import helper as utl
+
+ENDOWMENT_BANDS = [(0, 100_000_000, 'Under $100 million'),
+                   (100_000_000, 1_000_000_000, '$100 million to $1 billion'),
+                   (1_000_000_000, 10_000_000_000, '$1 billion to $10 billion'),
+                   (10_000_000_000, math.inf, 'Over $10 billion')]
+
+
+class CollaborationMatrix:
+    """
+    This class defines the institution graph projected from the co-authorship graph: the number
+    of co-authorships between people affiliated with each pair of institutions.
+
+    Attributes:
+        institutions (list): names of the institutions, in matrix order.
+        index (dict): institution name mapped to its row and column in counts.
+        counts (csr_matrix): symmetric sparse matrix of collaboration counts between institutions,
+            with the diagonal (collaborations within an institution) removed.
+        endowments (ndarray): endowment of each institution in USD, NaN where it is unknown.
+    Methods:
+        get_count: returns the number of collaborations between two institutions.
+        top_partners: returns the institutions that collaborate most with an institution,
+            optionally restricted to an endowment band.
+        band_summary: totals an institution's partners and collaborations by endowment band.
+    """
+
+    def __init__(self, institutions, counts, endowments):
+        self.institutions = institutions
+        self.index = {name: i for i, name in enumerate(institutions)}
+        self.counts = counts
+        self.endowments = endowments
+
+    def get_count(self, a, b):
+        return int(self.counts[self.index[a], self.index[b]])
+
+    def top_partners(self, name, k=10, low=None, high=None):
+        row = self.counts.getrow(self.index[name])
+        partners, counts = row.indices, row.data
+        if low is not None or high is not None:
+            endows = self.endowments[partners]
+            keep = ~np.isnan(endows)
+            if low is not None:
+                keep &= endows >= low
+            if high is not None:
+                keep &= endows < high
+            partners, counts = partners[keep], counts[keep]
+        order = np.argsort(-counts, kind='stable')[:k]
+        return [(self.institutions[partners[i]], int(counts[i])) for i in order]
+
+    def band_summary(self, name, bands=None):
+        row = self.counts.getrow(self.index[name])
+        endows = self.endowments[row.indices]
+        summary = []
+        for low, high, label in bands or ENDOWMENT_BANDS:
+            in_band = (endows >= low) & (endows < high)
+            summary.append((label, int(in_band.sum()), int(row.data[in_band].sum())))
+        return summary
+
+
+def build_collaboration_matrix(umsi_net, home='UMSI'):
+    """
+    Projects the co-authorship graph onto institutions. With B the person-institution incidence
+    matrix and A the person-person co-authorship adjacency matrix, the collaboration counts are
+    the sparse product B.T @ A @ B, computed once rather than walking from faculty to co-authors
+    to institutions for every question.
+    :param umsi_net: object of the Graph class.
+    :param home: (str | None) name of an extra institution whose members are the UMSI faculty the
+        graph was built from, so UMSI itself appears in the matrix. None to leave it out.
+    :return: (CollaborationMatrix) institution collaboration counts.
+    """
+    people = {}
+    insts = {}
+    for vert in umsi_net:
+        if vert.get_type() == 'institution':
+            insts[vert] = len(insts)
+        else:
+            people[vert] = len(people)
+    names = [graph.vertex_name(umsi_net, vert.get_id()) for vert in insts]
+    faculty = graph.faculty_keys(umsi_net)
+    if home is not None:
+        names.append(home)
+
+    inc_rows, inc_cols, adj_rows, adj_cols = [], [], [], []
+    for person, row in people.items():
+        for nbr in person.get_connections():
+            if nbr in insts:
+                inc_rows.append(row)
+                inc_cols.append(insts[nbr])
+            else:
+                adj_rows.append(row)
+                adj_cols.append(people[nbr])
+        if home is not None and person.get_id() in faculty:
+            inc_rows.append(row)
+            inc_cols.append(len(names) - 1)
+    incidence = sparse.csr_matrix((np.ones(len(inc_rows), dtype=np.int64), (inc_rows, inc_cols)),
+                                  shape=(len(people), len(names)))
+    coauthors = sparse.csr_matrix((np.ones(len(adj_rows), dtype=np.int64), (adj_rows, adj_cols)),
+                                  shape=(len(people), len(people)))
+    counts = (incidence.T @ coauthors @ incidence).tocsr()
+    counts.setdiag(0)
+    counts.eliminate_zeros()
+
+    endowments = np.full(len(names), np.nan)
+    for vert, col in insts.items():
+        if vert.get_affil_endow() is not None:
+            try:
+                endowments[col] = graph.parse_endow(vert.get_affil_endow())
+            except ValueError:
+                continue
+    return CollaborationMatrix(names, counts, endowments)
+
+
+def get_collaboration_matrix(umsi_net, home='UMSI'):
+    """
+    Returns the institution collaboration matrix for the graph, building it only when the graph
+    has changed since it was last built.
+    :param umsi_net: object of the Graph class.
+    :param home: (str | None) name used for UMSI in the matrix, see build_collaboration_matrix.
+    :return: (CollaborationMatrix) institution collaboration counts.
+    """
+    return graph.cached_result(umsi_net, ('collaborations', home),
+                               lambda net: build_collaboration_matrix(net, home=home))
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    collabs = get_collaboration_matrix(umsi_net)
+    utl.print_pretty(collabs.top_partners('UMSI'))
+    utl.print_pretty(collabs.top_partners('UMSI', low=10_000_000_000))
+    utl.print_pretty(collabs.band_summary('UMSI'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+import random
+
+import numpy as np
+
+import graph
+import helper as utl
+
+
+def relabel(labels):
+    """
+    Renumbers community labels so the largest community is 0, the next largest 1, and so on.
+    :param labels: (list) community label of each vertex.
+    :return: (ndarray) renumbered labels.
+    """
+    labels = np.asarray(labels)
+    unique, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+    rank = np.empty(len(unique), dtype=np.int64)
+    rank[np.argsort(-counts, kind='stable')] = np.arange(len(unique))
+    return rank[inverse]
+
+
+def modularity(indptr, indices, labels):
+    """
+    Computes the modularity of a partition of a graph given in compressed sparse row form: the
+    share of edges inside communities minus the share expected if edges were placed at random
+    between vertices of the same degrees.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param labels: (ndarray) community label of each vertex.
+    :return: (float) modularity, between -0.5 and 1.
+    """
+    labels = np.asarray(labels)
+    total = len(indices)
+    if total == 0:
+        return 0.0
+    degrees = np.diff(indptr)
+    sources = np.repeat(np.arange(len(degrees)), degrees)
+    inside = np.count_nonzero(labels[sources] == labels[indices])
+    tot = np.bincount(labels, weights=degrees)
+    return float(inside / total - np.sum((tot / total) ** 2))
+
+
+def label_propagation(indptr, indices, seed=0, max_iter=20):
+    """
+    Detects communities by label propagation: every vertex starts in its own community and,
+    visiting vertices in random order, repeatedly adopts the label most common among its
+    neighbors until labels stop changing. Each pass is linear in the number of edges.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param seed: (int) seed for the random visiting order and tie-breaking.
+    :param max_iter: (int) maximum number of passes over the vertices.
+    :return: (ndarray) community label of each vertex.
+    """
+    rng = random.Random(seed)
+    ptr, nbrs = indptr.tolist(), indices.tolist()
+    labels = list(range(len(ptr) - 1))
+    order = list(range(len(ptr) - 1))
+    for _ in range(max_iter):
+        rng.shuffle(order)
+        changed = 0
+        for node in order:
+            counts = {}
+            for nbr in nbrs[ptr[node]:ptr[node + 1]]:
+                counts[labels[nbr]] = counts.get(labels[nbr], 0) + 1
+            if not counts:
+                continue
+            best = max(counts.values())
+            if counts.get(labels[node]) == best:
+                continue
+            labels[node] = rng.choice([label for label, count in counts.items() if count == best])
+            changed += 1
+        if not changed:
+            break
+    return relabel(labels)
+
+
+def louvain_level(adj, degrees, total, rng):
+    """
+    Runs the local moving phase of the Louvain method on one level of the graph: vertices are
+    moved to the neighboring community giving the largest modularity gain until no move helps.
+    :param adj: (list) dictionary of neighbor weights for each vertex, including self-loops.
+    :param degrees: (list) weighted degree of each vertex.
+    :param total: (float) sum of all edge weights in adj (twice the number of edges).
+    :param rng: (Random) random number generator for the visiting order.
+    :return: (tuple) community of each vertex and whether any vertex moved.
+    """
+    comm = list(range(len(adj)))
+    tot = list(degrees)
+    order = list(range(len(adj)))
+    rng.shuffle(order)
+    improved = False
+    moved = True
+    while moved:
+        moved = False
+        for node in order:
+            current, k_i = comm[node], degrees[node]
+            weights = {}
+            for nbr, weight in adj[node].items():
+                if nbr != node:
+                    weights[comm[nbr]] = weights.get(comm[nbr], 0) + weight
+            tot[current] -= k_i
+            best, best_gain = current, weights.get(current, 0) - tot[current] * k_i / total
+            for community, weight in weights.items():
+                gain = weight - tot[community] * k_i / total
+                if gain > best_gain + 1e-12:
+                    best, best_gain = community, gain
+            tot[best] += k_i
+            if best != current:
+                comm[node] = best
+                moved = improved = True
+    return comm, improved
+
+
+def louvain(indptr, indices, seed=0, max_levels=20):
+    """
+    Detects communities with the Louvain method: local moving of vertices between communities
+    to increase modularity, followed by merging each community into a single vertex, repeated
+    until modularity stops improving. Each level is close to linear in the number of edges.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param seed: (int) seed for the random visiting order.
+    :param max_levels: (int) maximum number of merge steps.
+    :return: (ndarray) community label of each vertex.
+    """
+    rng = random.Random(seed)
+    ptr, nbrs = indptr.tolist(), indices.tolist()
+    adj = []
+    for node in range(len(ptr) - 1):
+        weights = {}
+        for nbr in nbrs[ptr[node]:ptr[node + 1]]:
+            weights[nbr] = weights.get(nbr, 0) + 1
+        adj.append(weights)
+    labels = list(range(len(adj)))
+    total = float(len(nbrs))
+    if total == 0:
+        return relabel(labels)
+    for _ in range(max_levels):
+        degrees = [sum(weights.values()) for weights in adj]
+        comm, improved = louvain_level(adj, degrees, total, rng)
+        if not improved:
+            break
+        renumber = {}
+        for community in comm:
+            renumber.setdefault(community, len(renumber))
+        comm = [renumber[community] for community in comm]
+        labels = [comm[label] for label in labels]
+        merged = [{} for _ in renumber]
+        for node, weights in enumerate(adj):
+            target = merged[comm[node]]
+            for nbr, weight in weights.items():
+                target[comm[nbr]] = target.get(comm[nbr], 0) + weight
+        adj = merged
+    return relabel(labels)
+
+
+def detect_communities(umsi_net, method='louvain', seed=0):
+    """
+    Detects communities of collaborators in the graph and stores each vertex's community in its
+    community attribute. Results are cached until the graph changes.
+    :param umsi_net: object of the Graph class.
+    :param method: (str) 'louvain' or 'label_propagation'.
+    :param seed: (int) seed for the random number generator.
+    :return: (dict) community label mapped to the list of keys of its members, largest first.
+    """
+    methods = {'louvain': louvain, 'label_propagation': label_propagation}
+
+    def compute(net):
+        keys, indptr, indices = graph.get_adjacency_arrays(net)
+        return keys, methods[method](indptr, indices, seed=seed)
+
+    keys, labels = graph.cached_result(umsi_net, ('communities', method, seed), compute)
+    members = {}
+    for key, label in zip(keys, labels.tolist()):
+        umsi_net.get_vertex(key).set_community(label)
+        members.setdefault(label, []).append(key)
+    return dict(sorted(members.items()))
+
+
+def summarize_communities(umsi_net, members, top=3):
+    """
+    Describes each community by its size, its most connected member institutions, and the mean
+    endowment of its member institutions.
+    :param umsi_net: object of the Graph class.
+    :param members: (dict) community label mapped to member keys, from detect_communities.
+    :param top: (int) number of institutions listed for each community.
+    :return: (list) rows of community, number of people, number of institutions, top
+        institutions by name, and mean endowment in USD (NaN when no member institution has one).
+    """
+    summary = []
+    for label, keys in members.items():
+        verts = [umsi_net.get_vertex(key) for key in keys]
+        insts = sorted((vert for vert in verts if vert.get_type() == 'institution'),
+                       key=lambda vert: len(vert.connected_to), reverse=True)
+        endows = []
+        for inst in insts:
+            try:
+                endows.append(graph.parse_endow(inst.get_affil_endow()))
+            except (TypeError, ValueError):
+                continue
+        names = [graph.vertex_name(umsi_net, inst.get_id()) for inst in insts[:top]]
+        summary.append((label, len(verts) - len(insts), len(insts), names,
+                        float(np.mean(endows)) if endows else float('nan')))
+    return summary
+
+
+def communities_to_csv(umsi_net, filepath='communities.csv'):
+    """
+    Writes the community of every vertex to a CSV file, delegating creation of the file to the
+    write_csv function in the helper module. Vertices are listed by name, see graph.vertex_name.
+    Communities must have been detected first.
+    :param umsi_net: object of the Graph class.
+    :param filepath: (str) path to file.
+    :return: none.
+    """
+    headers = ['name', 'type', 'community']
+    rows = [[graph.vertex_name(umsi_net, vert.get_id()), vert.get_type(), vert.get_community()] for vert in umsi_net]
+    utl.write_csv(filepath, rows, headers=headers)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    keys, indptr, indices = graph.get_adjacency_arrays(umsi_net)
+    for method in ('louvain', 'label_propagation'):
+        members = detect_communities(umsi_net, method=method)
+        labels = [umsi_net.get_vertex(key).get_community() for key in keys]
+        print(method, len(members), modularity(indptr, indices, labels))
+        utl.print_pretty(summarize_communities(umsi_net, members)[:10])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,689 @@
+import argparse
+import csv
+import hashlib
+import json
+import mmap
+import os
+import zlib
+from array import array
+
+import numpy as np
+
+import graph
+import helper as utl
+
+# Vertex types, stored as their index
+TYPES = (None, 'person', 'institution')
+
+# Attributes of each vertex, in hash order. Strings are stored as an offset and length into
+# strings.bin, with offset -1 for None. check is a second hash of the key to detect collisions.
+VERTEX_DTYPE = np.dtype([('check', '<u4'), ('type', 'u1'), ('key_off', '<i8'), ('key_len', '<i4'),
+                         ('aff_off', '<i8'), ('aff_len', '<i4'), ('end_off', '<i8'), ('end_len', '<i4')])
+SPILL_DTYPE = np.dtype([('hash', '<u8'), ('seq', '<u8')] + VERTEX_DTYPE.descr)
+EDGE_DTYPE = np.dtype([('f', '<u8'), ('t', '<u8')])
+
+MEGABYTE = 2 ** 20
+
+# Sorting and searching a chunk of records needs several temporary copies of it, so chunks are
+# kept to this fraction of the memory budget
+WORKSPACE = 16
+
+# Reading a page of a mapped file maps the pages around it too (64 KB by default on Linux), so
+# scattered reads are counted at this many bytes each
+READ_BYTES = 64 * 1024
+
+
+def key_hash(key):
+    """
+    Hashes a vertex key to the 64-bit number that orders vertices on disk.
+    :param key: (str) vertex key.
+    :return: (int) hash of the key.
+    """
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def bucket_bounds(buckets):
+    """
+    Splits the range of 64-bit hashes into equal buckets. A hash h falls in bucket
+    ((h >> 32) * buckets) >> 32, which is the bucket whose bounds contain it.
+    :param buckets: (int) number of buckets.
+    :return: (list) lowest hash of each bucket, followed by 2 ** 64.
+    """
+    return [-(-b * 2 ** 32 // buckets) << 32 for b in range(buckets)] + [2 ** 64]
+
+
+def external_sort(spill_path, dtype, fields, count, budget):
+    """
+    Sorts records too large to fit in memory with a two-pass distribution sort: the spill file
+    is read in chunks and each record is appended to a bucket file chosen by the range of its
+    first field (a uniformly distributed hash), then each bucket, sized to fit in the budget, is
+    sorted in memory. The spill and bucket files are deleted as they are used.
+    :param spill_path: (str) path to the file of unsorted records.
+    :param dtype: (dtype) record type.
+    :param fields: (tuple) fields to sort by, most significant first; the first is a uint64 hash.
+    :param count: (int) number of records in the spill file.
+    :param budget: (int) bytes of memory the sort may use.
+    :return: (generator) lowest hash, highest hash (exclusive), and sorted records of each
+        bucket, in order.
+    """
+    chunk = max(1, budget // (WORKSPACE * dtype.itemsize))
+    buckets = max(1, -(-count * dtype.itemsize * WORKSPACE // budget))
+    paths = [f'{spill_path}.{b}' for b in range(buckets)]
+    files = [open(path, 'wb') for path in paths]
+    with open(spill_path, 'rb') as spill:
+        while True:
+            records = np.fromfile(spill, dtype=dtype, count=chunk)
+            if not len(records):
+                break
+            which = ((records[fields[0]] >> np.uint64(32)) * np.uint64(buckets)) >> np.uint64(32)
+            order = np.argsort(which, kind='stable')
+            records, which = records[order], which[order]
+            splits = np.searchsorted(which, np.arange(buckets + 1))
+            for b in np.flatnonzero(np.diff(splits)).tolist():
+                records[splits[b]:splits[b + 1]].tofile(files[b])
+    for file_obj in files:
+        file_obj.close()
+    os.remove(spill_path)
+    bounds = bucket_bounds(buckets)
+    for b, path in enumerate(paths):
+        records = np.fromfile(path, dtype=dtype)
+        os.remove(path)
+        records = records[np.lexsort([records[field] for field in reversed(fields)])]
+        yield bounds[b], bounds[b + 1], records
+
+
+def map_array(path, dtype):
+    """
+    Maps a file of fixed-size records into memory read-only, so its pages are read from disk
+    only when they are accessed.
+    :param path: (str) path to file.
+    :param dtype: (dtype) record type.
+    :return: (tuple) mmap object, or None for an empty file, and an array over it.
+    """
+    if os.path.getsize(path) == 0:
+        return None, np.empty(0, dtype=dtype)
+    with open(path, 'rb') as file_obj:
+        mm = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+    return mm, np.frombuffer(mm, dtype=dtype)
+
+
+def release(mm):
+    """
+    Drops the pages of a read-only mapping from the process's resident memory. They stay in the
+    operating system's file cache and are read back on the next access.
+    :param mm: (mmap | None) mapping from map_array.
+    :return: none.
+    """
+    if mm is not None and hasattr(mmap, 'MADV_DONTNEED'):
+        mm.madvise(mmap.MADV_DONTNEED)
+
+
+def locate_hashes(hashes, hashes_mm, values, budget):
+    """
+    Finds the positions of hashes in a sorted mapped array of hashes. The values are sorted and
+    searched for one slice of the array at a time, dropping the pages of each slice after it is
+    searched, so lookups scattered over the whole array never make it all resident at once.
+    :param hashes: (ndarray) sorted hashes, from map_array.
+    :param hashes_mm: (mmap | None) mapping of hashes.
+    :param values: (ndarray) hashes to find.
+    :param budget: (int) bytes of memory the search may use.
+    :return: (ndarray) position of each value in hashes, -1 where it is missing.
+    """
+    positions = np.full(len(values), -1, dtype=np.int64)
+    step = max(1, budget // (WORKSPACE * hashes.itemsize))
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    # Strided read of the first hash of each slice, one page per slice
+    splits = np.concatenate(([0], np.searchsorted(ordered, hashes[step::step]), [len(values)]))
+    for s, lo in enumerate(range(0, len(hashes), step)):
+        part = ordered[splits[s]:splits[s + 1]]
+        if not len(part):
+            continue
+        segment = hashes[lo:lo + step]
+        pos = np.minimum(np.searchsorted(segment, part), len(segment) - 1)
+        positions[order[splits[s]:splits[s + 1]]] = np.where(segment[pos] == part, pos + lo, -1)
+        release(hashes_mm)
+    return positions
+
+
+class DiskGraphWriter:
+    """
+    This class defines a writer that builds a DiskGraph from a stream of vertices and edges
+    without holding them in memory. Vertices and edges are appended to spill files in chunks
+    that fit in the memory budget, then put in hash order with external_sort when the writer is
+    finished. A key added more than once keeps its first affiliation, its first endowment, and
+    its last type, as in build_graph.
+
+    Attributes:
+        path (str): directory the graph files are written to.
+        budget (int): bytes of memory the writer may use.
+        strings (file): file of the UTF-8 encoded keys, affiliations, and endowments.
+        string_size (int): bytes written to strings.
+        vertex_spill, edge_spill (file): files of unsorted vertex and edge records.
+        vertex_buffer (dict): field name mapped to an array of the values of the vertex records
+            waiting to be written to vertex_spill.
+        edge_from, edge_to (array): hashes of the ends of edges waiting to be written.
+        num_vertex_records, num_edge_records (int): records written or buffered.
+    Methods:
+        add_vertex: adds a vertex, or another record for an existing key.
+        add_edge: adds an edge from vertex f to vertex t.
+        finish: sorts and assembles the graph files and returns the DiskGraph.
+    """
+
+    def __init__(self, path, budget=64 * MEGABYTE):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.budget = budget
+        self.strings = open(os.path.join(path, 'strings.bin'), 'wb')
+        self.string_size = 0
+        self.vertex_spill = open(os.path.join(path, 'vertices.spill'), 'wb')
+        self.edge_spill = open(os.path.join(path, 'edges.spill'), 'wb')
+        self.vertex_buffer = {name: array('Q' if name == 'hash' else 'q') for name in SPILL_DTYPE.names}
+        self.edge_from = array('Q')
+        self.edge_to = array('Q')
+        self.num_vertex_records = self.num_edge_records = 0
+
+    def write_string(self, text):
+        if text is None:
+            return -1, 0
+        data = text.encode('utf-8')
+        self.strings.write(data)
+        self.string_size += len(data)
+        return self.string_size - len(data), len(data)
+
+    def add_vertex(self, key, vtype=None, affiliation=None, affil_endow=None):
+        values = (key_hash(key), self.num_vertex_records, zlib.crc32(key.encode('utf-8')), TYPES.index(vtype),
+                  *self.write_string(key), *self.write_string(affiliation), *self.write_string(affil_endow))
+        for column, value in zip(self.vertex_buffer.values(), values):
+            column.append(value)
+        self.num_vertex_records += 1
+        # Each buffered record takes 8 bytes per field, plus its size in the array written out
+        if len(self.vertex_buffer['hash']) * (SPILL_DTYPE.itemsize + 8 * len(SPILL_DTYPE)) * WORKSPACE >= self.budget:
+            self.flush()
+
+    def add_edge(self, f, t):
+        self.edge_from.append(key_hash(f))
+        self.edge_to.append(key_hash(t))
+        self.num_edge_records += 1
+        if len(self.edge_from) * EDGE_DTYPE.itemsize * 2 * WORKSPACE >= self.budget:
+            self.flush()
+
+    def flush(self):
+        if self.vertex_buffer['hash']:
+            records = np.empty(len(self.vertex_buffer['hash']), dtype=SPILL_DTYPE)
+            for name, column in self.vertex_buffer.items():
+                records[name] = column
+            records.tofile(self.vertex_spill)
+        if self.edge_from:
+            edges = np.empty(len(self.edge_from), dtype=EDGE_DTYPE)
+            edges['f'], edges['t'] = self.edge_from, self.edge_to
+            edges.tofile(self.edge_spill)
+        for name in self.vertex_buffer:
+            del self.vertex_buffer[name][:]
+        del self.edge_from[:], self.edge_to[:]
+
+    def finish_vertices(self):
+        """
+        Sorts the vertex records by key hash and merges the records of each key into one row
+        of vertices.bin, writing the hashes in the same order to hashes.bin.
+        """
+        with open(os.path.join(self.path, 'hashes.bin'), 'wb') as hashes_file, \
+                open(os.path.join(self.path, 'vertices.bin'), 'wb') as vertices_file:
+            spill = os.path.join(self.path, 'vertices.spill')
+            for low, high, recs in external_sort(spill, SPILL_DTYPE, ('hash', 'seq'), self.num_vertex_records,
+                                                 self.budget):
+                if not len(recs):
+                    continue
+                new_key = np.concatenate(([True], recs['hash'][1:] != recs['hash'][:-1]))
+                if np.any(~new_key[1:] & (recs['check'][1:] != recs['check'][:-1])):
+                    raise ValueError('two vertex keys have the same hash')
+                starts = np.flatnonzero(new_key)
+                lasts = np.concatenate((starts[1:], [len(recs)])) - 1
+                table = np.empty(len(starts), dtype=VERTEX_DTYPE)
+                table['check'] = recs['check'][starts]
+                table['type'] = recs['type'][lasts]
+                table['key_off'], table['key_len'] = recs['key_off'][starts], recs['key_len'][starts]
+                for field in ('aff', 'end'):
+                    # Rows with a value sort before rows without, so each key's first value comes first
+                    first = np.lexsort((recs['seq'], recs[f'{field}_off'] < 0, recs['hash']))[starts]
+                    table[f'{field}_off'], table[f'{field}_len'] = recs[f'{field}_off'][first], recs[f'{field}_len'][first]
+                recs['hash'][starts].tofile(hashes_file)
+                table.tofile(vertices_file)
+
+    def link_affiliations(self, match):
+        """
+        Connects each vertex to the vertices that match its affiliation, in both directions, and
+        sets its endowment to that of the last match, as build_graph does.
+        :param match: (function) called with an affiliation, returns the matching keys in order.
+        """
+        self.strings.flush()
+        strings_mm, strings = map_array(os.path.join(self.path, 'strings.bin'), np.uint8)
+        hashes_mm, hashes = map_array(os.path.join(self.path, 'hashes.bin'), np.uint64)
+        vertices_path = os.path.join(self.path, 'vertices.bin')
+        vertices_mm, vertices = map_array(vertices_path, VERTEX_DTYPE)
+        chunk = max(1, self.budget // (WORKSPACE * VERTEX_DTYPE.itemsize))
+        # Vertices are in hash order, so each one reads a key, an affiliation, and the rows of its
+        # matches from pages scattered over the files; count them to drop pages in time
+        per_release = max(1, self.budget // (WORKSPACE * 4 * READ_BYTES))
+
+        def text(off, length):
+            return strings[off:off + length].tobytes().decode('utf-8') if off >= 0 else None
+
+        with open(vertices_path, 'r+b') as vertices_file:
+            for lo in range(0, len(vertices), chunk):
+                rows = np.array(vertices[lo:lo + chunk])
+                release(vertices_mm)
+                for n, i in enumerate(np.flatnonzero(rows['aff_off'] >= 0).tolist()):
+                    if n % per_release == per_release - 1:
+                        for mm in (strings_mm, hashes_mm, vertices_mm):
+                            release(mm)
+                    key = text(rows['key_off'][i], rows['key_len'][i])
+                    entities = match(text(rows['aff_off'][i], rows['aff_len'][i]))
+                    for entity in entities:
+                        self.add_edge(key, entity)
+                        self.add_edge(entity, key)
+                    if entities:
+                        pos = int(np.searchsorted(hashes, np.uint64(key_hash(entities[-1]))))
+                        rows['end_off'][i], rows['end_len'][i] = vertices['end_off'][pos], vertices['end_len'][pos]
+                vertices_file.seek(lo * VERTEX_DTYPE.itemsize)
+                vertices_file.write(rows.tobytes())
+                vertices_file.flush()
+                for mm in (strings_mm, hashes_mm, vertices_mm):
+                    release(mm)
+        del strings, hashes, vertices
+        for mm in (strings_mm, hashes_mm, vertices_mm):
+            if mm is not None:
+                mm.close()
+
+    def finish_edges(self):
+        """
+        Sorts the edges by the hashes of their ends, drops repeated edges, and writes the
+        neighbors of each vertex as positions to indices.bin, with row pointers in indptr.bin.
+        :return: (tuple) number of vertices, number of edges, and the type of indices.bin.
+        """
+        hashes_mm, hashes = map_array(os.path.join(self.path, 'hashes.bin'), np.uint64)
+        num_vertices = len(hashes)
+        index_dtype = np.int32 if num_vertices < 2 ** 31 else np.int64
+        running = 0
+        with open(os.path.join(self.path, 'indptr.bin'), 'wb') as indptr_file, \
+                open(os.path.join(self.path, 'indices.bin'), 'wb') as indices_file:
+            np.zeros(1, dtype=np.int64).tofile(indptr_file)
+            spill = os.path.join(self.path, 'edges.spill')
+            for low, high, edges in external_sort(spill, EDGE_DTYPE, ('f', 't'), self.num_edge_records, self.budget):
+                lo = int(np.searchsorted(hashes, np.uint64(low)))
+                hi = num_vertices if high >= 2 ** 64 else int(np.searchsorted(hashes, np.uint64(high)))
+                keep = np.concatenate(([True], (edges['f'][1:] != edges['f'][:-1]) | (edges['t'][1:] != edges['t'][:-1])))
+                edges = edges[keep[:len(edges)]]
+                ends = [locate_hashes(hashes, hashes_mm, edges[field], self.budget) for field in ('f', 't')]
+                if any(np.any(pos < 0) for pos in ends):
+                    raise ValueError('an edge connects a vertex that was never added')
+                counts = np.bincount(ends[0] - lo, minlength=hi - lo)
+                (running + np.cumsum(counts)).astype(np.int64).tofile(indptr_file)
+                running += int(counts.sum())
+                ends[1].astype(index_dtype).tofile(indices_file)
+                release(hashes_mm)
+        del hashes
+        if hashes_mm is not None:
+            hashes_mm.close()
+        return num_vertices, running, np.dtype(index_dtype).str
+
+    def finish(self, match=None):
+        self.flush()
+        self.vertex_spill.close()
+        self.finish_vertices()
+        if match is not None:
+            self.link_affiliations(match)
+            self.flush()
+        self.edge_spill.close()
+        self.strings.close()
+        num_vertices, num_edges, index_dtype = self.finish_edges()
+        utl.write_json(os.path.join(self.path, 'meta.json'),
+                       {'num_vertices': num_vertices, 'num_edges': num_edges, 'index_dtype': index_dtype})
+        return DiskGraph(self.path, self.budget)
+
+
+class DiskGraph:
+    """
+    This class defines a graph whose adjacency and attribute arrays stay in memory-mapped files
+    on disk, for graphs too large to hold as Graph and Vertex objects. Vertices are ordered by
+    the hash of their key, so a key is found by binary search. Pages of the files are read when
+    they are accessed, and dropped from resident memory whenever the bytes accessed since the
+    last drop, counting a page for each scattered read, reach half the memory budget.
+
+    Attributes:
+        path (str): directory of the graph files.
+        budget (int): bytes of resident memory the graph aims to stay under.
+        num_vertices, num_edges (int): size of the graph.
+        maps (dict): file name mapped to its mmap object.
+        hashes (ndarray): sorted key hash of each vertex.
+        vertices (ndarray): attributes of each vertex, see VERTEX_DTYPE.
+        indptr, indices (ndarray): neighbors of each vertex in compressed sparse row form, as
+            in graph.adjacency_arrays.
+        strings (ndarray): bytes of the keys, affiliations, and endowments.
+        touched (int): bytes accessed since pages were last dropped.
+    Methods:
+        get_position: returns the position of a vertex key, or None if it is not in the graph.
+        get_key: returns the key of the vertex at a position.
+        get_attributes: returns the type, affiliation, and endowment of the vertex at a position.
+        get_neighbors: returns the positions of the neighbors of the vertex at a position.
+        touch: records reads and drops pages when the budget calls for it.
+        trim: drops the pages of all files from resident memory.
+        close: unmaps the files.
+    """
+
+    def __init__(self, path, budget=64 * MEGABYTE):
+        meta = utl.read_json(os.path.join(path, 'meta.json'))
+        self.path = path
+        self.budget = budget
+        self.num_vertices = meta['num_vertices']
+        self.num_edges = meta['num_edges']
+        self.maps = {}
+        self.hashes = self.map('hashes.bin', np.uint64)
+        self.vertices = self.map('vertices.bin', VERTEX_DTYPE)
+        self.indptr = self.map('indptr.bin', np.int64)
+        self.indices = self.map('indices.bin', np.dtype(meta['index_dtype']))
+        self.strings = self.map('strings.bin', np.uint8)
+        self.touched = 0
+
+    def map(self, name, dtype):
+        self.maps[name], arr = map_array(os.path.join(self.path, name), dtype)
+        return arr
+
+    def __len__(self):
+        return self.num_vertices
+
+    def __contains__(self, key):
+        return self.get_position(key) is not None
+
+    def get_position(self, key):
+        if not self.num_vertices:
+            return None
+        pos = int(np.searchsorted(self.hashes, np.uint64(key_hash(key))))
+        if pos < self.num_vertices and self.hashes[pos] == key_hash(key) \
+                and self.vertices['check'][pos] == zlib.crc32(key.encode('utf-8')):
+            return pos
+        return None
+
+    def get_string(self, off, length):
+        if off < 0:
+            return None
+        self.touch(length)
+        return self.strings[off:off + length].tobytes().decode('utf-8')
+
+    def get_key(self, pos):
+        row = self.vertices[pos]
+        self.touch(row.nbytes)
+        return self.get_string(row['key_off'], row['key_len'])
+
+    def get_attributes(self, pos):
+        row = self.vertices[pos]
+        self.touch(row.nbytes)
+        return (TYPES[row['type']], self.get_string(row['aff_off'], row['aff_len']),
+                self.get_string(row['end_off'], row['end_len']))
+
+    def get_neighbors(self, pos):
+        nbrs = self.indices[self.indptr[pos]:self.indptr[pos + 1]]
+        self.touch(nbrs.nbytes, reads=2)
+        return nbrs
+
+    def touch(self, nbytes, reads=1):
+        self.touched += nbytes + reads * READ_BYTES
+        if self.touched >= self.budget // 2:
+            self.trim()
+
+    def trim(self):
+        for mm in self.maps.values():
+            release(mm)
+        self.touched = 0
+
+    def close(self):
+        self.hashes = self.vertices = self.indptr = self.indices = self.strings = None
+        for mm in self.maps.values():
+            if mm is not None:
+                mm.close()
+        self.maps = {}
+
+
+def build_disk_graph(data, path, budget=64 * MEGABYTE):
+    """
+    Constructs a DiskGraph of UMSI faculty and their co-authors and affiliations from cache data,
+    with the same vertices, edges, and attributes as graph.build_graph, streaming the records to
+    disk instead of holding the graph in memory. Affiliations are matched against the keys of all
+    vertices, people included, as in build_graph; the keys are kept in memory in the order
+    build_graph adds them, so each vertex takes the endowment of its last match.
+    :param data: (dict) faculty and institution data.
+    :param path: (str) directory the graph files are written to.
+    :param budget: (int) bytes of memory the build may use.
+    :return: (DiskGraph) graph.
+    """
+    writer = DiskGraphWriter(path, budget)
+    institutions = {org.get('org'): org.get('endowment') for org in data.get('enrich_institutions')
+                    if org.get('endowment') is not None}
+    keys = [faculty.get('name') for faculty in data.get('auths-coauths')] + list(institutions)
+    keys += [person.get('name') for faculty in data.get('auths-coauths') for person in faculty.get('coauthors') or []]
+    order = {key: i for i, key in enumerate(dict.fromkeys(keys))}
+
+    def match(affil):
+        found = {affil[start:end] for start in range(len(affil)) for end in range(start + 1, len(affil) + 1)
+                 if affil[start:end] in order}
+        return sorted(found, key=order.get)
+
+    for faculty in data.get('auths-coauths'):
+        writer.add_vertex(faculty.get('name'), 'person', 'University of Michigan')
+    for org, endowment in institutions.items():
+        writer.add_vertex(org, 'institution', affil_endow=endowment)
+    for faculty in data.get('auths-coauths'):
+        for person in faculty.get('coauthors') or []:
+            writer.add_vertex(person.get('name'), 'person', person.get('affiliation'))
+            writer.add_edge(faculty.get('name'), person.get('name'))
+            writer.add_edge(person.get('name'), faculty.get('name'))
+    return writer.finish(match)
+
+
+def graph_to_disk(umsi_net, path, budget=64 * MEGABYTE):
+    """
+    Writes a Graph to disk as a DiskGraph.
+    :param umsi_net: object of the Graph class.
+    :param path: (str) directory the graph files are written to.
+    :param budget: (int) bytes of memory the writer may use.
+    :return: (DiskGraph) graph.
+    """
+    writer = DiskGraphWriter(path, budget)
+    for vert in umsi_net:
+        writer.add_vertex(vert.get_id(), vert.get_type(), vert.get_affiliation(), vert.get_affil_endow())
+    for vert in umsi_net:
+        for nbr in vert.get_connections():
+            writer.add_edge(vert.get_id(), nbr.get_id())
+    return writer.finish()
+
+
+def gather_neighbors(disk_net, frontier):
+    """
+    Reads the neighbors of a set of vertices in pieces that keep the gathered arrays, and the
+    span of the row pointer and neighbor files each piece reads from, within a fraction of the
+    graph's memory budget set by WORKSPACE.
+    :param disk_net: (DiskGraph) graph.
+    :param frontier: (ndarray) sorted positions of the vertices.
+    :return: (generator) arrays of neighbor positions and of the vertex each was reached from.
+    """
+    window = max(1, disk_net.budget // WORKSPACE)
+    limit = max(1, disk_net.budget // (WORKSPACE * 24))
+    rows = max(1, window // disk_net.indptr.itemsize)
+    bounds = np.searchsorted(frontier, np.arange(0, disk_net.num_vertices + rows, rows))
+    for a, b in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        if a == b:
+            continue
+        front = frontier[a:b]
+        starts = disk_net.indptr[front]
+        counts = disk_net.indptr[front + 1] - starts
+        before = np.cumsum(counts) - counts
+        # Start a new piece where the neighbors move to another window of the neighbor file or
+        # the gathered neighbors reach the limit
+        piece = (starts // max(1, window // disk_net.indices.itemsize)) * len(front) + before // limit
+        splits = np.concatenate(([0], np.flatnonzero(np.diff(piece)) + 1, [len(front)]))
+        for lo, hi in zip(splits[:-1].tolist(), splits[1:].tolist()):
+            part = counts[lo:hi]
+            total = int(part.sum())
+            offsets = np.repeat(starts[lo:hi] - before[lo:hi] + before[lo], part) + np.arange(total)
+            nbrs = disk_net.indices[offsets]
+            span = (int(front[hi - 1]) - int(front[lo]) + 2) * disk_net.indptr.itemsize
+            if total:
+                span += (int(offsets[-1]) - int(offsets[0]) + 1) * nbrs.itemsize
+            disk_net.touch(span, reads=2)
+            yield nbrs, np.repeat(front[lo:hi], part)
+
+
+def bfs(disk_net, start, end):
+    """
+    Using breadth-first search one level at a time, finds the shortest path between the start
+    and end vertices of a DiskGraph. The predecessor of each vertex and the current frontier,
+    4 or 8 bytes per vertex each, are the only search state held in memory.
+    :param disk_net: (DiskGraph) graph.
+    :param start: (str) key of the vertex at which to begin the search.
+    :param end: (str) key of the vertex at which to end the search.
+    :return: (tuple) integer representing distance between start and end and a list of keys
+        traversed between start and end, from end to start, or None if either key is not in
+        the graph or there is no path.
+    """
+    source, target = disk_net.get_position(start), disk_net.get_position(end)
+    if source is None or target is None:
+        print(f"Entity not found: {start if source is None else end}")
+        return None
+    pred = np.full(disk_net.num_vertices, -1, dtype=disk_net.indices.dtype)
+    pred[source] = source
+    frontier = np.array([source], dtype=pred.dtype)
+    dist = 0
+    while pred[target] < 0 and len(frontier):
+        dist += 1
+        reached = []
+        for nbrs, parents in gather_neighbors(disk_net, frontier):
+            new = pred[nbrs] < 0
+            nbrs, first = np.unique(nbrs[new], return_index=True)
+            pred[nbrs] = parents[new][first]
+            reached.append(nbrs)
+        frontier = np.sort(np.concatenate(reached)) if reached else np.empty(0, dtype=pred.dtype)
+    if pred[target] < 0:
+        return None
+    path = [target]
+    while path[-1] != source:
+        path.append(int(pred[path[-1]]))
+    return dist, [disk_net.get_key(pos) for pos in path]
+
+
+def get_degrees(disk_net, top=None):
+    """
+    Assembles a list of the vertices in a DiskGraph with the number of vertices connected to
+    each, reading the row pointers in chunks.
+    :param disk_net: (DiskGraph) graph.
+    :param top: (int | None) number of most connected vertices to return, None for all.
+    :return: list of tuples of key and degree, most connected first.
+    """
+    chunk = max(1, disk_net.budget // (WORKSPACE * 8))
+    top = disk_net.num_vertices if top is None else top
+    if top <= 0:
+        return []
+    best_pos, best_deg = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    for lo in range(0, disk_net.num_vertices, chunk):
+        degrees = np.diff(disk_net.indptr[lo:min(lo + chunk, disk_net.num_vertices) + 1])
+        disk_net.touch(degrees.nbytes)
+        best_pos = np.concatenate((best_pos, np.arange(lo, lo + len(degrees))))
+        best_deg = np.concatenate((best_deg, degrees))
+        if len(best_deg) > top:
+            keep = np.argpartition(-best_deg, top - 1)[:top]
+            best_pos, best_deg = best_pos[keep], best_deg[keep]
+    order = np.lexsort((best_pos, -best_deg))
+    return [(disk_net.get_key(pos), int(degree)) for pos, degree in zip(best_pos[order].tolist(),
+                                                                         best_deg[order].tolist())]
+
+
+def get_avg_degree(disk_net):
+    """
+    For a DiskGraph, calculates the average number of connections each vertex has.
+    :param disk_net: (DiskGraph) graph.
+    :return: float
+    """
+    return disk_net.num_edges / disk_net.num_vertices
+
+
+def iter_vertices(disk_net, chunk=1000):
+    """
+    Yields the key, attributes, and neighbor positions of every vertex in a DiskGraph in hash
+    order.
+    :param disk_net: (DiskGraph) graph.
+    :param chunk: (int) number of vertices read at a time.
+    :return: (generator) tuples of position, key, type, affiliation, endowment, and neighbors.
+    """
+    for lo in range(0, disk_net.num_vertices, chunk):
+        for pos in range(lo, min(lo + chunk, disk_net.num_vertices)):
+            yield (pos, disk_net.get_key(pos), *disk_net.get_attributes(pos), disk_net.get_neighbors(pos))
+
+
+def graph_to_json(disk_net, filepath='graph_structure.json'):
+    """
+    Exports a DiskGraph to JSON in the format of graph.graph_to_json, writing one vertex at a
+    time instead of building the whole dictionary in memory.
+    :param disk_net: (DiskGraph) graph.
+    :param filepath: (str) path to file.
+    :return: none.
+    """
+    with open(filepath, 'w', encoding='utf-8') as file_obj:
+        file_obj.write('{')
+        for pos, key, vtype, affiliation, endowment, nbrs in iter_vertices(disk_net):
+            record = {'connected_to': [disk_net.get_key(nbr) for nbr in nbrs.tolist()], 'color': 'white',
+                      'dist': 'infinity', 'pred': None, 'affiliation': affiliation, 'affil_endow': endowment,
+                      'degree': len(nbrs), 'type': vtype, 'community': None}
+            file_obj.write(f"{',' if pos else ''}\n{json.dumps(key, ensure_ascii=False)}: "
+                           f"{json.dumps(record, ensure_ascii=False)}")
+        file_obj.write('\n}\n')
+
+
+def orgs_to_csv(disk_net, filepath='institutions.csv'):
+    """
+    Writes the institutions in a DiskGraph, the size of their endowments, and the number of
+    vertices each is connected to in the graph to a CSV file, one row at a time.
+    :param disk_net: (DiskGraph) graph.
+    :param filepath: (str) path to file.
+    :return: none.
+    """
+    chunk = max(1, disk_net.budget // (WORKSPACE * 8))
+    with open(filepath, 'w', encoding='utf-8', newline='') as file_obj:
+        writer = csv.writer(file_obj)
+        writer.writerow(['institution', 'endowment', 'num_connections'])
+        for lo in range(0, disk_net.num_vertices, chunk):
+            # Only institutions need their strings read
+            types = disk_net.vertices['type'][lo:lo + chunk]
+            disk_net.touch(len(types) * VERTEX_DTYPE.itemsize)
+            for pos in (np.flatnonzero(types == TYPES.index('institution')) + lo).tolist():
+                row = disk_net.vertices[pos]
+                writer.writerow([disk_net.get_key(pos), disk_net.get_string(row['end_off'], row['end_len']),
+                                 int(disk_net.indptr[pos + 1] - disk_net.indptr[pos])])
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options of the out-of-core graph.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Build the graph from cache.json on disk and query it.')
+    parser.add_argument('--path', default='disk_graph', help='directory for the graph files (default disk_graph)')
+    parser.add_argument('--budget', type=int, default=64, help='memory budget in megabytes (default 64)')
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    args = parse_args()
+    disk_net = build_disk_graph(utl.read_json('cache.json'), args.path, args.budget * MEGABYTE)
+    print(disk_net.num_vertices, disk_net.num_edges, get_avg_degree(disk_net))
+    print(bfs(disk_net, 'Dan Jurafsky', 'Ixchel Faniel'))
+    utl.print_pretty(get_degrees(disk_net, top=10))
+
+
+if __name__ == '__main__':
+    main()
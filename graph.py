@@ -1,5 +1,11 @@
+import bisect
+import hashlib
+import heapq
+import json
 import re
-from collections import deque
+import sys
+import weakref
+from collections import OrderedDict, deque
 
 import numpy as np
 from tqdm import tqdm
@@ -16,6 +22,15 @@ class Graph:
     Attributes:
         vert_list (dict): dictionary of vertices in the graph.
         num_vertices (int): total number of vertices in the graph.
+        build_index (BuildIndex): records the graph was built from, set by build_graph
+            and used by update_graph.
+        version (int): counter incremented whenever vertices or edges are added or removed,
+            used to tell whether cached results still describe the graph.
+        neighborhoods (NeighborhoodCache): recently requested ego networks.
+        results (dict): analyses computed from the graph, stored by cached_result
+            together with the version of the graph they were computed from.
+        identities (IdentityIndex): identities of the vertices of a graph keyed by integer ids,
+            set by identity.build_identity_graph and None otherwise.
     Methods:
         add_vertex: increases the number of vertices in the graph by one,
             adding the passed-in Vertex object to vert_list if it is not
@@ -32,15 +47,29 @@ class Graph:
             connect the vertices.
         get_vertices: returns a list of all the keys of vertices in the graph.
         __iter__: allows for iteration over the dictionary of vertex values.
+        remove_edge: removes the edge from vertex f to vertex t if it exists.
+        remove_vertex: removes a vertex from vert_list along with every edge
+            pointing to or from it.
+        get_neighbors: returns the vertices connected to a vertex. Functions that
+            accept either a Graph or a SubgraphView read edges through it.
+        calc_degree: determines the degree of a vertex, stores it in the vertex,
+            and returns it.
+        get_degree: returns the degree last stored for a vertex.
     """
 
     def __init__(self):
         self.vert_list = {}
         self.num_vertices = 0
+        self.build_index = None
+        self.version = 0
+        self.neighborhoods = NeighborhoodCache()
+        self.results = {}
+        self.identities = None
 
     def add_vertex(self, key, warn=False):
         if key not in self.vert_list:
             self.num_vertices = self.num_vertices + 1
+            self.version = self.version + 1
             new_vertex = Vertex(key)
             self.vert_list[key] = new_vertex
             return new_vertex
@@ -62,6 +91,7 @@ class Graph:
         if t not in self.vert_list:
             nv = self.add_vertex(t)
         self.vert_list[f].add_neighbor(self.vert_list[t], weight)
+        self.version = self.version + 1
 
     def get_vertices(self):
         return self.vert_list.keys()
@@ -69,6 +99,30 @@ class Graph:
     def __iter__(self):
         return iter(self.vert_list.values())
 
+    def remove_edge(self, f, t):
+        if f in self.vert_list and t in self.vert_list:
+            self.vert_list[f].remove_neighbor(self.vert_list[t])
+            self.version = self.version + 1
+
+    def remove_vertex(self, key):
+        if key in self.vert_list:
+            vert = self.vert_list.pop(key)
+            for nbr in list(vert.get_connections()):
+                nbr.remove_neighbor(vert)
+            self.num_vertices = self.num_vertices - 1
+            self.version = self.version + 1
+            return vert
+
+    def get_neighbors(self, vert):
+        return vert.get_connections()
+
+    def calc_degree(self, vert):
+        vert.calc_degree()
+        return vert.get_degree()
+
+    def get_degree(self, vert):
+        return vert.get_degree()
+
 
 # Vertex Class based on code from Runestone Academy
 # https://runestone.academy/ns/books/published/pythonds/Graphs/Implementation.html
@@ -80,31 +134,40 @@ class Vertex:
         id (str): identifier for vertex object (e.g. name)
         connected_to (dict): dictionary of vertices connected to vertex
             by an edge.
-        color (str): indicator used to track traversal during search.
-        dist (float | int): counter for distance traversed between vertices
-            during search.
-        pred (vertex obj): vertex traversed just before vertex during search.
         affiliation (str): affiliated institution and job position for vertex.
         affil_endow (str): size of endowment of affiliated institution.
         degree (int): number of vertices connected to vertex.
         type (str): indicates whether the vertex is a person or an institution.
+        community (int): community the vertex was assigned to by community
+            detection, None until communities are detected.
+        search_state (WeakKeyDictionary): class-level table holding the color,
+            dist, and pred search values of vertices that have been given one,
+            so vertices that are never searched do not carry them. The pred is
+            held by weak reference, and reset_graph removes a graph's entries. Attributes
+            are stored in __slots__, and type, affiliation, and affil_endow
+            values are interned so vertices share one copy of repeated strings.
+        attribute_version (int): class-level counter incremented whenever the type,
+            affiliation, or affil_endow of any vertex changes, so copies of vertices
+            such as cached ego networks can tell they are out of date.
     Methods:
         add_neighbor: updates the connected_to attribute with nbr vertex
             as key and weight as value.
             When called by the Graph() class method add_edge, it obtains
             information for the connected vertices from the graph's
             vert_list.
+        remove_neighbor: removes nbr from the connected_to attribute if present.
         __str__: defines behavior for returning a string with vertex
             information.
-        set_color: sets the color attribute of a vertex, used for tracking
-            whether the vertex has been traversed during search.
-        set_distance: sets the distance attribute of the vertex, reflecting
+        set_color: sets the color of a vertex in search_state, used for
+            tracking whether the vertex has been traversed during search.
+        set_distance: sets the distance of the vertex in search_state, reflecting
             the distance traveled from a starting vertex during a search.
-        set_pred: sets the pred attribute of a vertex, which tracks the
+        set_pred: sets the pred of a vertex in search_state, which tracks the
             vertex traversed immediately before the vertex during search.
         set_affiliation: sets the affiliation attribute of the vertex.
         set_affil_endow: sets the affil_endow attribute of the vertex.
         set_type: sets the type attribute of the vertex.
+        set_community: sets the community attribute of the vertex.
         get_connections: returns keys from the connected_to attribute,
             listing all vertices set as the vertex's neighbor.
         get_connection_ids: returns the keys for each vertex object in the
@@ -112,51 +175,67 @@ class Vertex:
         get_id: returns the vertex's key, or the name given to the vertex.
         get_weight: returns the weight of the edge between vertex and nbr
             from the connected_to dictionary.
-        get_pred: returns the pred attribute of the vertex.
-        get_distance: returns the distance attribute of the vertex.
-        get_color: returns the color attribute of the vertex.
+        get_pred: returns the pred of the vertex, None if it was never set.
+        get_distance: returns the distance of the vertex, infinity if it was never set.
+        get_color: returns the color of the vertex, 'white' if it was never set.
         get_affiliation: returns affiliation attribute of the vertex.
         get_affil_endow: returns the affil_endow attribute of the vertex.
         get_degree: returns the degree attribute of the vertex.
         calc_degree: determines the number of vertices connected to the vertex
             and assigns the value to the vertex's degree attribute.
         get_type: returns the type attribute of the vertex.
+        get_community: returns the community attribute of the vertex.
     """
 
+    __slots__ = ('id', 'connected_to', 'affiliation', 'affil_endow', 'degree', 'type', 'community', '__weakref__')
+    search_state = weakref.WeakKeyDictionary()
+    attribute_version = 0
+
     def __init__(self, key):
         self.id = key
         self.connected_to = {}
-        self.color = 'white'
-        self.dist = float('inf')
-        self.pred = None
         self.affiliation = None
         self.affil_endow = None
         self.degree = 0
         self.type = None
+        self.community = None
 
     def add_neighbor(self, nbr, weight=0):
         self.connected_to[nbr] = weight
 
+    def remove_neighbor(self, nbr):
+        self.connected_to.pop(nbr, None)
+
     def __str__(self):
         return str(self.id) + ' connected_to: ' + str([x.id for x in self.connected_to])
 
     def set_color(self, color):
-        self.color = color
+        self.search_state.setdefault(self, {})['color'] = color
 
     def set_distance(self, d):
-        self.dist = d
+        self.search_state.setdefault(self, {})['dist'] = d
 
     def set_pred(self, p):
-        self.pred = p
+        # A weak reference, so search state never keeps another vertex alive
+        self.search_state.setdefault(self, {})['pred'] = None if p is None else weakref.ref(p)
 
     def set_affiliation(self, a):
-        self.affiliation = a
+        if a != self.affiliation:
+            Vertex.attribute_version = Vertex.attribute_version + 1
+        self.affiliation = intern_attribute(a)
 
     def set_affil_endow(self, e):
-        self.affil_endow = e
+        if e != self.affil_endow:
+            Vertex.attribute_version = Vertex.attribute_version + 1
+        self.affil_endow = intern_attribute(e)
 
     def set_type(self, t):
-        self.type = t
+        if t != self.type:
+            Vertex.attribute_version = Vertex.attribute_version + 1
+        self.type = intern_attribute(t)
+
+    def set_community(self, c):
+        self.community = c
 
     def get_connections(self):
         return self.connected_to.keys()
@@ -172,13 +251,14 @@ class Vertex:
         return self.connected_to[nbr]
 
     def get_pred(self):
-        return self.pred
+        pred = self.search_state.get(self, {}).get('pred')
+        return None if pred is None else pred()
 
     def get_distance(self):
-        return self.dist
+        return self.search_state.get(self, {}).get('dist', float('inf'))
 
     def get_color(self):
-        return self.color
+        return self.search_state.get(self, {}).get('color', 'white')
 
     def get_affiliation(self):
         return self.affiliation
@@ -195,6 +275,334 @@ class Vertex:
     def get_type(self):
         return self.type
 
+    def get_community(self):
+        return self.community
+
+
+class NeighborhoodCache:
+    """
+    This class defines a least-recently-used cache of ego networks extracted from a graph.
+
+    Attributes:
+        capacity (int): maximum number of ego networks kept.
+        entries (OrderedDict): cached ego networks, ordered from least to most recently used.
+        hits (int): number of requests answered from the cache.
+        misses (int): number of requests that had to be computed.
+    Methods:
+        get: returns the cached value for key and marks it as most recently used, or None.
+        put: caches value under key, evicting the least recently used entry when full.
+        clear: empties the cache.
+    """
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits = self.hits + 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses = self.misses + 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+
+class SubgraphView:
+    """
+    This class defines a read-only view of the part of a graph whose vertices pass a vertex
+    filter and whose edges pass an edge filter. The view holds no vertices or edges of its own:
+    it refers to the Vertex objects of the parent graph and applies the filters as they are
+    read, so creating it copies nothing and it always reflects the current parent graph. bfs,
+    get_degrees, get_avg_degree, graph_to_json, and orgs_to_csv accept a view in place of a
+    Graph.
+
+    Attributes:
+        graph (Graph): parent graph.
+        vertex_filter (function | None): called with a Vertex, returns True for vertices in the
+            view. None keeps every vertex.
+        edge_filter (function | None): called with the Vertex objects at both ends of an edge,
+            returns True for edges in the view. None keeps every edge between vertices in the view.
+        identities (IdentityIndex | None): identities of the vertices of the parent graph.
+    Methods:
+        keeps: returns True if a vertex is in the view.
+        get_vertex: returns the Vertex object for a key if the vertex is in the view, or None.
+        __contains__: checks if a key names a vertex in the view.
+        get_vertices: returns the keys of the vertices in the view.
+        __iter__: iterates over the Vertex objects in the view.
+        __len__: returns the number of vertices in the view.
+        get_neighbors: returns the neighbors of a vertex over edges in the view.
+        calc_degree: returns the number of edges of a vertex in the view, without storing it
+            in the vertex, which the parent graph shares.
+        get_degree: same as calc_degree.
+    """
+
+    def __init__(self, graph, vertex_filter=None, edge_filter=None):
+        self.graph = graph
+        self.vertex_filter = vertex_filter
+        self.edge_filter = edge_filter
+        self.identities = graph.identities
+
+    def keeps(self, vert):
+        return self.vertex_filter is None or self.vertex_filter(vert)
+
+    def get_vertex(self, n):
+        vert = self.graph.get_vertex(n)
+        if vert is not None and self.keeps(vert):
+            return vert
+        return None
+
+    def __contains__(self, n):
+        return self.get_vertex(n) is not None
+
+    def get_vertices(self):
+        return [vert.get_id() for vert in self]
+
+    def __iter__(self):
+        if self.vertex_filter is None:
+            return iter(self.graph)
+        return filter(self.vertex_filter, self.graph)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def get_neighbors(self, vert):
+        nbrs = vert.connected_to
+        if self.vertex_filter is not None:
+            nbrs = filter(self.vertex_filter, nbrs)
+        if self.edge_filter is not None:
+            edge_filter = self.edge_filter
+            return [nbr for nbr in nbrs if edge_filter(vert, nbr)]
+        return list(nbrs)
+
+    def calc_degree(self, vert):
+        return len(self.get_neighbors(vert))
+
+    def get_degree(self, vert):
+        return self.calc_degree(vert)
+
+
+class ShortestPaths:
+    """
+    This class defines the directed acyclic graph of all shortest paths between two vertices,
+    found by shortest_paths with one breadth-first search. Each vertex on a shortest path keeps
+    the vertices one step closer to the start that lead to it and the number of shortest paths
+    from the start and to the end that pass through it, so paths are counted with integer
+    arithmetic and enumerated one at a time instead of being stored, however many there are.
+
+    Attributes:
+        graph (Graph | SubgraphView): graph searched, used to name the vertices on the paths.
+        start (Vertex): vertex the paths begin at.
+        end (Vertex): vertex the paths end at.
+        distance (int | None): number of edges on each shortest path, None if end cannot be
+            reached from start.
+        preds (dict): vertex on a shortest path mapped to the list of its predecessors on
+            shortest paths, in the order the search reached them.
+        from_start (dict): vertex on a shortest path mapped to the number of shortest paths from
+            start to it.
+        to_end (dict): vertex on a shortest path mapped to the number of shortest paths from it
+            to end.
+    Methods:
+        count: returns the number of shortest paths between start and end.
+        vertex_paths: yields the shortest paths one at a time, as lists of Vertex objects from
+            start to end.
+        paths: yields the shortest paths one at a time, as lists of vertex names from start to
+            end, see vertex_name.
+        count_through: returns each Vertex object between start and end mapped to the number of
+            shortest paths through it.
+        top_intermediates: returns the Vertex objects between start and end on the most shortest
+            paths, with the number and share of the paths through them.
+    """
+
+    def __init__(self, graph, start, end, distance, preds, from_start, to_end):
+        self.graph = graph
+        self.start = start
+        self.end = end
+        self.distance = distance
+        self.preds = preds
+        self.from_start = from_start
+        self.to_end = to_end
+
+    def count(self):
+        return self.from_start.get(self.end, 0)
+
+    def vertex_paths(self):
+        if self.distance is None:
+            return
+        if self.start is self.end:
+            yield [self.start]
+            return
+        # Depth-first walk back from end, holding one path and one iterator per step
+        path = [self.end]
+        stack = [iter(self.preds[self.end])]
+        while stack:
+            vert = next(stack[-1], None)
+            if vert is None:
+                stack.pop()
+                path.pop()
+            elif vert is self.start:
+                yield list(reversed(path + [vert]))
+            else:
+                path.append(vert)
+                stack.append(iter(self.preds[vert]))
+
+    def paths(self):
+        for path in self.vertex_paths():
+            yield [vertex_name(self.graph, vert.get_id()) for vert in path]
+
+    def count_through(self):
+        return {vert: self.from_start[vert] * self.to_end[vert] for vert in self.preds
+                if vert is not self.start and vert is not self.end}
+
+    def top_intermediates(self, n=10):
+        total = self.count()
+        ranked = heapq.nlargest(n, self.count_through().items(), key=lambda item: item[1])
+        return [(vert, through, through / total) for vert, through in ranked]
+
+
+def intern_attribute(value):
+    """
+    Returns the pooled copy of a string attribute value so that vertices sharing a type,
+    affiliation, or endowment reference the same string object.
+    :param value: (str | None) attribute value.
+    :return: (str | None) interned value, or value unchanged if it is not a string.
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+class BuildIndex:
+    """
+    This class defines the bookkeeping kept alongside a graph built from the cache so the
+    graph can later be updated in place by update_graph instead of being rebuilt.
+
+    Attributes:
+        fingerprints (dict): digests of the cached records, keyed by cache key and then by
+            faculty name or institution name.
+        faculty (dict): faculty name mapped to the list of its auths-coauths records.
+        institutions (dict): institution name mapped to the list of its enrich_institutions records.
+        faculty_pos (dict): faculty name mapped to the position of its first record in the cache.
+        inst_pos (dict): institution name mapped to the position of its first record with an endowment.
+        appearances (dict): co-author name mapped to the set of faculty who list them as a co-author.
+        affil_keys (dict): affiliation mapped to the set of vertex keys that have it.
+        affil_grams (dict): character trigram mapped to the set of affiliations that contain it,
+            used to find the affiliations that mention a given vertex name.
+    Methods:
+        refresh: replaces the cached records and position maps with those of new data.
+        add_affiliation: indexes the trigrams of a vertex's affiliation.
+        remove_affiliation: removes a vertex's affiliation from the trigram index.
+        affiliated_with: returns the keys of vertices whose affiliation contains entity.
+        coauthors_of: returns the co-author records listed for a faculty member.
+        rank: returns a sortable key reproducing the order in which build_graph adds a vertex.
+        base_state: returns the type, affiliation and endowment build_graph assigns a vertex
+            before people and institutions are connected.
+    """
+
+    def __init__(self, data, fingerprints):
+        self.fingerprints = fingerprints
+        self.faculty = {}
+        self.institutions = {}
+        self.faculty_pos = {}
+        self.inst_pos = {}
+        self.appearances = {}
+        self.affil_keys = {}
+        self.affil_grams = {}
+        self.refresh(data, fingerprints)
+        for name in self.faculty:
+            for person in self.coauthors_of(name):
+                self.appearances.setdefault(person.get('name'), set()).add(name)
+
+    def refresh(self, data, fingerprints):
+        self.fingerprints = fingerprints
+        self.faculty = group_records(data.get('auths-coauths'), 'name')
+        self.institutions = group_records(data.get('enrich_institutions'), 'org')
+        self.faculty_pos, self.inst_pos = first_positions(data)
+
+    def add_affiliation(self, key, affil):
+        if affil is not None:
+            if affil not in self.affil_keys:
+                self.affil_keys[affil] = set()
+                for gram in trigrams(affil):
+                    self.affil_grams.setdefault(gram, set()).add(affil)
+            self.affil_keys[affil].add(key)
+
+    def remove_affiliation(self, key, affil):
+        if affil is not None and affil in self.affil_keys:
+            self.affil_keys[affil].discard(key)
+            if not self.affil_keys[affil]:
+                del self.affil_keys[affil]
+                for gram in trigrams(affil):
+                    affils = self.affil_grams.get(gram)
+                    if affils is not None:
+                        affils.discard(affil)
+                        if not affils:
+                            del self.affil_grams[gram]
+
+    def affiliated_with(self, entity, graph):
+        grams = trigrams(entity)
+        if grams:
+            postings = sorted((self.affil_grams.get(gram, set()) for gram in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            candidates = self.affil_keys.keys()
+        matches = []
+        for affil in candidates:
+            if entity in affil:
+                matches.extend(key for key in self.affil_keys[affil] if key in graph)
+        return matches
+
+    def coauthors_of(self, name):
+        coauthors = []
+        for faculty in self.faculty.get(name, []):
+            if faculty.get('coauthors') is not None:
+                coauthors.extend(faculty.get('coauthors'))
+        return coauthors
+
+    def rank(self, key):
+        if key in self.faculty_pos:
+            return 0, self.faculty_pos[key], 0
+        if key in self.inst_pos:
+            return 1, self.inst_pos[key], 0
+        first = min(self.appearances.get(key, ()), key=lambda name: self.faculty_pos[name], default=None)
+        if first is None:
+            return 3, 0, 0
+        for pos, person in enumerate(self.coauthors_of(first)):
+            if person.get('name') == key:
+                return 2, self.faculty_pos[first], pos
+
+    def base_state(self, key):
+        is_faculty = key in self.faculty
+        is_inst = key in self.inst_pos
+        listed_by = sorted(self.appearances.get(key, ()), key=lambda name: self.faculty_pos[name])
+        if not (is_faculty or is_inst or listed_by):
+            return None
+        affil = 'University of Michigan' if is_faculty else None
+        for name in listed_by:
+            if affil is not None:
+                break
+            for person in self.coauthors_of(name):
+                if person.get('name') == key and person.get('affiliation') is not None:
+                    affil = person.get('affiliation')
+                    break
+        endow = None
+        if is_inst:
+            for org in self.institutions.get(key):
+                if org.get('endowment') is not None:
+                    endow = org.get('endowment')
+        vert_type = 'institution' if is_inst and not listed_by else 'person'
+        return vert_type, affil, endow
+
 
 def build_graph(data):
     """
@@ -240,40 +648,284 @@ def build_graph(data):
                         g.add_edge(vert, entity)
                         g.add_edge(entity, vert)
                         g.get_vertex(vert).set_affil_endow(g.get_vertex(entity).get_affil_endow())
+
+    # Record what the graph was built from so it can be updated incrementally
+    g.build_index = BuildIndex(data, fingerprint_records(data))
+    for vert in g:
+        g.build_index.add_affiliation(vert.get_id(), vert.get_affiliation())
     return g
 
 
+def trigrams(text):
+    """
+    Splits text into its overlapping three-character substrings.
+    :param text: (str) text to split.
+    :return: (set) trigrams of text, empty if text is shorter than three characters.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def group_records(records, key):
+    """
+    Groups cached records by the value of one of their fields, preserving the order in
+    which records appear in the cache.
+    :param records: (list) records from the cache.
+    :param key: (str) field used to group records (e.g. 'name' or 'org').
+    :return: (dict) field value mapped to the list of records sharing it.
+    """
+    grouped = {}
+    for record in records or []:
+        grouped.setdefault(record.get(key), []).append(record)
+    return grouped
+
+
+def fingerprint_records(data):
+    """
+    Computes a digest of every faculty record in auths-coauths and every institution record
+    in enrich_institutions so two versions of the cache can be compared record by record.
+    :param data: (dict) faculty and institution data.
+    :return: (dict) digests keyed by cache key and then by faculty or institution name.
+    """
+    fingerprints = {}
+    for cache_key, field in (('auths-coauths', 'name'), ('enrich_institutions', 'org')):
+        fingerprints[cache_key] = {}
+        for name, records in group_records(data.get(cache_key), field).items():
+            encoded = json.dumps(records, sort_keys=True, ensure_ascii=False).encode('utf-8')
+            fingerprints[cache_key][name] = hashlib.sha1(encoded).hexdigest()
+    return fingerprints
+
+
+def first_positions(data):
+    """
+    Finds the position in the cache of the first record of each faculty member and of each
+    institution with an endowment, which decides whose listing of a co-author build_graph uses
+    and the order in which it connects institutions.
+    :param data: (dict) faculty and institution data.
+    :return: (tuple) faculty name mapped to position, and institution name mapped to position.
+    """
+    faculty_pos = {}
+    for pos, faculty in enumerate(data.get('auths-coauths')):
+        faculty_pos.setdefault(faculty.get('name'), pos)
+    inst_pos = {}
+    for pos, org in enumerate(data.get('enrich_institutions')):
+        if org.get('endowment') is not None:
+            inst_pos.setdefault(org.get('org'), pos)
+    return faculty_pos, inst_pos
+
+
+def moved_names(old_pos, new_pos):
+    """
+    Finds the names whose order relative to the other names changed between two versions of the
+    cache. The names in a longest run that kept its order are left out, so moving one record
+    marks only that record and adding or removing records marks none.
+    :param old_pos: (dict) name mapped to the position of its first record in the previous build.
+    :param new_pos: (dict) name mapped to the position of its first record in the current data.
+    :return: (list) names listed in both versions that moved, in their new order.
+    """
+    common = sorted((name for name in new_pos if name in old_pos), key=new_pos.get)
+    # Longest increasing run of old positions, by patience sorting
+    tails, ends, prev = [], [], []
+    for i, name in enumerate(common):
+        j = bisect.bisect_left(tails, old_pos[name])
+        if j == len(tails):
+            tails.append(old_pos[name])
+            ends.append(i)
+        else:
+            tails[j] = old_pos[name]
+            ends[j] = i
+        prev.append(ends[j - 1] if j else None)
+    kept = set()
+    i = ends[-1] if ends else None
+    while i is not None:
+        kept.add(i)
+        i = prev[i]
+    return [name for i, name in enumerate(common) if i not in kept]
+
+
+def diff_fingerprints(old, new):
+    """
+    Compares two sets of record fingerprints.
+    :param old: (dict) fingerprints for one cache key from the previous build.
+    :param new: (dict) fingerprints for the same cache key from the current data.
+    :return: (dict) lists of added, removed, and changed names.
+    """
+    return {'added': [name for name in new if name not in old],
+            'removed': [name for name in old if name not in new],
+            'changed': [name for name in new if name in old and new[name] != old[name]]}
+
+
+def matched_entities(graph, affil):
+    """
+    Finds every vertex whose key appears in an affiliation string, the same test build_graph
+    applies to connect people and institutions, by looking up each substring of the
+    affiliation instead of scanning every vertex in the graph.
+    :param graph: object of the Graph class.
+    :param affil: (str) affiliation of a vertex.
+    :return: (set) keys of the matching vertices.
+    """
+    matches = set()
+    if affil is None:
+        return matches
+    if '' in graph:
+        matches.add('')
+    for start in range(len(affil)):
+        for end in range(start + 1, len(affil) + 1):
+            if affil[start:end] in graph:
+                matches.add(affil[start:end])
+    return matches
+
+
+def update_graph(graph, data):
+    """
+    Updates a graph made by build_graph in place so it reflects a new version of the cache.
+    Faculty and institution records are fingerprinted and diffed against the previous build,
+    and only the vertices named in changed records, their edges, and the affiliations that
+    mention them are recomputed. Records that moved relative to the others count as changed,
+    since the first listing of a co-author sets their affiliation. The result has the same
+    vertices, attributes, and edges as build_graph(data), though the iteration order of new
+    vertices may differ. A graph keyed by
+    identity is rebuilt with identity.build_identity_graph instead, since one changed record can
+    merge or split identities anywhere in the graph (a Google Scholar id listed under a name
+    resolves every record with that name); its integer ids may then change.
+    :param graph: object of the Graph class returned by build_graph, update_graph, or
+        identity.build_identity_graph.
+    :param data: (dict) faculty and institution data.
+    :return: (dict) added, removed, changed, and moved faculty and institutions plus the number
+        of vertices touched.
+    """
+    index = graph.build_index
+    fingerprints = fingerprint_records(data)
+    faculty_delta = diff_fingerprints(index.fingerprints['auths-coauths'], fingerprints['auths-coauths'])
+    inst_delta = diff_fingerprints(index.fingerprints['enrich_institutions'], fingerprints['enrich_institutions'])
+    faculty_pos, inst_pos = first_positions(data)
+    faculty_delta['moved'] = [name for name in moved_names(index.faculty_pos, faculty_pos)
+                              if name not in faculty_delta['changed']]
+    inst_delta['moved'] = [name for name in moved_names(index.inst_pos, inst_pos)
+                           if name not in inst_delta['changed']]
+    if graph.identities is not None:
+        import identity
+        rebuilt = identity.build_identity_graph(data)
+        graph.vert_list = rebuilt.vert_list
+        graph.num_vertices = rebuilt.num_vertices
+        graph.build_index = rebuilt.build_index
+        graph.identities = rebuilt.identities
+        graph.version = graph.version + 1
+        return {'auths-coauths': faculty_delta, 'enrich_institutions': inst_delta,
+                'vertices_touched': graph.num_vertices}
+    changed_faculty = [name for names in faculty_delta.values() for name in names]
+    changed_insts = [name for names in inst_delta.values() for name in names]
+
+    # Collect vertices whose own records changed, using co-author lists from both builds
+    affected = set(changed_faculty) | set(changed_insts)
+    old_coauthors = {name: [person.get('name') for person in index.coauthors_of(name)] for name in changed_faculty}
+    index.refresh(data, fingerprints)
+    for name in changed_faculty:
+        for person in old_coauthors[name]:
+            index.appearances.get(person, set()).discard(name)
+            if not index.appearances.get(person, True):
+                del index.appearances[person]
+            affected.add(person)
+        for person in index.coauthors_of(name):
+            index.appearances.setdefault(person.get('name'), set()).add(name)
+            affected.add(person.get('name'))
+
+    # Drop the edges of affected vertices and reset them to their pre-linking state
+    relink = set()
+    for key in affected:
+        vert = graph.get_vertex(key)
+        if vert is not None:
+            relink.update(nbr.get_id() for nbr in vert.get_connections()
+                          if nbr.get_affiliation() is not None and key in nbr.get_affiliation())
+            for nbr in list(vert.get_connections()):
+                graph.remove_edge(nbr.get_id(), key)
+                graph.remove_edge(key, nbr.get_id())
+            index.remove_affiliation(key, vert.get_affiliation())
+        state = index.base_state(key)
+        if state is None:
+            graph.remove_vertex(key)
+            continue
+        if vert is None:
+            vert = graph.add_vertex(key)
+        vert.set_type(state[0])
+        vert.set_affiliation(state[1])
+        vert.set_affil_endow(state[2])
+        index.add_affiliation(key, state[1])
+
+    # Reconnect affected vertices with their co-authors and affiliated entities
+    for key in affected:
+        if key not in graph:
+            continue
+        partners = set(index.appearances.get(key, ()))
+        partners.update(person.get('name') for person in index.coauthors_of(key))
+        partners.update(matched_entities(graph, graph.get_vertex(key).get_affiliation()))
+        linked_by = index.affiliated_with(key, graph)
+        partners.update(linked_by)
+        relink.update(linked_by)
+        for partner in partners:
+            graph.add_edge(key, partner)
+            graph.add_edge(partner, key)
+
+    # Recompute affiliated endowments in build order, following vertices whose endowment
+    # feeds into the endowment of a later vertex
+    pending = [(index.rank(key), key) for key in (relink | affected) if key in graph]
+    heapq.heapify(pending)
+    done = set()
+    while pending:
+        rank, key = heapq.heappop(pending)
+        if key in done:
+            continue
+        done.add(key)
+        vert = graph.get_vertex(key)
+        state = index.base_state(key)
+        endow = state[2]
+        for entity in sorted(matched_entities(graph, vert.get_affiliation()), key=index.rank):
+            if entity == key:
+                continue
+            if index.rank(entity) < rank:
+                endow = graph.get_vertex(entity).get_affil_endow()
+            else:
+                endow = index.base_state(entity)[2]
+        if endow != vert.get_affil_endow() or key in affected:
+            vert.set_affil_endow(endow)
+            for other in index.affiliated_with(key, graph):
+                if other not in done and index.rank(other) > rank:
+                    heapq.heappush(pending, (index.rank(other), other))
+    graph.version = graph.version + 1
+    return {'auths-coauths': faculty_delta, 'enrich_institutions': inst_delta, 'vertices_touched': len(done)}
+
+
 def bfs(graph, start, end):
     """
     Using breadth-first search, finds the shortest path between the start and end vertices.
-    :param graph: (graph obj) graph object containing data.
+    Visited vertices, distances, and predecessors are tracked in dictionaries local to the
+    search, so vertices do not need to be reset between searches.
+    :param graph: (graph obj) graph object containing data, or a SubgraphView of one.
     :param start: (vertex obj) vertex at which to begin the search.
     :param end: (vertex obj) vertex at which to end the search.
     :return: (tuple) integer representing distance between start and end
-        and a list of vertices traversed between start and end.
+        and a list of the names of vertices traversed between start and end.
     """
-    reset_graph(graph)
     try:
         q = deque()
         q.appendleft(start)
+        dist = {start: 0}
+        pred = {start: None}
         preds = []
         while q:
             current_vert = q.pop()
             if current_vert == end:
                 x = current_vert
-                while x.get_pred():
-                    preds.append(x.get_id())
-                    x = x.get_pred()
-                preds.append(x.get_id())
-                return current_vert.get_distance(), preds
+                while pred[x] is not None:
+                    preds.append(vertex_name(graph, x.get_id()))
+                    x = pred[x]
+                preds.append(vertex_name(graph, x.get_id()))
+                return dist[current_vert], preds
             else:
-                for nbr in current_vert.get_connections():
-                    if nbr.get_color() == 'white':
-                        nbr.set_color('gray')
-                        nbr.set_distance(current_vert.get_distance() + 1)
-                        nbr.set_pred(current_vert)
+                for nbr in graph.get_neighbors(current_vert):
+                    if nbr not in dist:
+                        dist[nbr] = dist[current_vert] + 1
+                        pred[nbr] = current_vert
                         q.appendleft(nbr)
-                current_vert.set_color('black')
     except KeyError as e:
         print(f"Entity not found: {e}")
         return None
@@ -282,30 +934,302 @@ def bfs(graph, start, end):
         return None
 
 
+def shortest_paths(graph, start, end):
+    """
+    Finds every shortest path between the start and end vertices with one breadth-first search,
+    level by level, that stops at the level holding end. Each vertex reached keeps its
+    predecessors one level closer to start and the number of shortest paths to it; walking back
+    from end then keeps only the vertices on shortest paths and counts the paths from each of
+    them to end. Memory grows with the vertices and edges searched, as in bfs, and not with
+    the number of paths, which can be exponential.
+    :param graph: (graph obj) graph object containing data, or a SubgraphView of one.
+    :param start: (vertex obj) vertex at which to begin the search.
+    :param end: (vertex obj) vertex at which to end the search.
+    :return: object of the ShortestPaths class, or None if a vertex is not found.
+    """
+    if start is None or end is None:
+        print("Entity not found: no vertex given for the " + ("start" if start is None else "end"))
+        return None
+    try:
+        # First predecessor of each vertex reached, and the other predecessors as flat lists of
+        # (vertex, predecessor) pairs with the offset at which each level starts, so that reaching
+        # a vertex does not allocate a container the garbage collector has to track
+        first = {start: None}
+        from_start = {start: 1}
+        more_verts, more_preds, offsets = [], [], [0]
+        frontier = [start]
+        while frontier and end not in first:
+            # Vertices first reached from this level, with the number of shortest paths to them
+            level = {}
+            for vert in frontier:
+                count = from_start[vert]
+                for nbr in graph.get_neighbors(vert):
+                    paths = level.get(nbr)
+                    if paths is not None:
+                        level[nbr] = paths + count
+                        more_verts.append(nbr)
+                        more_preds.append(vert)
+                    elif nbr not in first:
+                        first[nbr] = vert
+                        level[nbr] = count
+            from_start.update(level)
+            frontier = list(level)
+            offsets.append(len(more_verts))
+        if end not in first:
+            return ShortestPaths(graph, start, end, None, {}, {}, {})
+
+        # Walk back from end one level at a time, keeping the vertices on shortest paths and
+        # counting the paths from each of them to end once all of its successors are counted
+        distance = len(offsets) - 1
+        on_path = {}
+        to_end = {end: 1}
+        frontier = [end]
+        for dist in range(distance, 0, -1):
+            preds = {vert: [first[vert]] for vert in frontier}
+            lo, hi = offsets[dist - 1], offsets[dist]
+            for vert, pred in zip(more_verts[lo:hi], more_preds[lo:hi]):
+                found = preds.get(vert)
+                if found is not None:
+                    found.append(pred)
+            on_path.update(preds)
+            level = []
+            for vert, found in preds.items():
+                for pred in found:
+                    if pred not in to_end:
+                        to_end[pred] = 0
+                        level.append(pred)
+                    to_end[pred] += to_end[vert]
+            frontier = level
+        on_path[start] = []
+        return ShortestPaths(graph, start, end, distance, on_path, {vert: from_start[vert] for vert in on_path}, to_end)
+    except KeyError as e:
+        print(f"Entity not found: {e}")
+        return None
+    except AttributeError as e:
+        print(f"Entity not found: {e}")
+        return None
+
+
+def ego_network(graph, center, k=2, max_frontier=500, include_affiliations=True):
+    """
+    Extracts the subgraph of vertices within k hops of a center vertex, using a depth-limited
+    breadth-first search whose visited set is local to the query. Results are kept in the
+    graph's neighborhoods cache until the graph or the attributes of its vertices change.
+    :param graph: object of the Graph class.
+    :param center: (vertex obj) vertex at the center of the ego network.
+    :param k: (int) maximum number of hops from center.
+    :param max_frontier: (int | None) maximum number of new vertices added at each hop, which
+        keeps highly connected vertices from pulling in most of the graph. None for no limit.
+    :param include_affiliations: (bool) if True, also adds the institutions connected to people
+        on the outermost hop.
+    :return: (graph obj) new Graph containing the ego network, with the attributes of the
+        vertices copied from graph and the edges between them. It shares the identities of graph.
+    """
+    cache_key = (center.get_id(), k, max_frontier, include_affiliations, graph.version, Vertex.attribute_version)
+    cached = graph.neighborhoods.get(cache_key)
+    if cached is not None:
+        return cached
+
+    dist = {center: 0}
+    frontier = [center]
+    for depth in range(1, k + 1):
+        next_frontier = []
+        for vert in frontier:
+            for nbr in vert.get_connections():
+                if max_frontier is not None and len(next_frontier) >= max_frontier:
+                    break
+                if nbr not in dist:
+                    dist[nbr] = depth
+                    next_frontier.append(nbr)
+        frontier = next_frontier
+    if include_affiliations:
+        for vert in frontier:
+            for nbr in vert.get_connections():
+                if nbr not in dist and nbr.get_type() == 'institution':
+                    dist[nbr] = k + 1
+
+    ego = Graph()
+    ego.identities = graph.identities
+    for vert in dist:
+        # Values are already interned, and copying them through the setters would count as a
+        # change to Vertex.attribute_version and make the cache miss
+        new_vert = ego.add_vertex(vert.get_id())
+        new_vert.type = vert.type
+        new_vert.affiliation = vert.affiliation
+        new_vert.affil_endow = vert.affil_endow
+    for vert in dist:
+        for nbr in vert.get_connections():
+            if nbr in dist:
+                ego.add_edge(vert.get_id(), nbr.get_id(), vert.get_weight(nbr))
+    graph.neighborhoods.put(cache_key, ego)
+    return ego
+
+
+def edge_type(vert, nbr):
+    """
+    Names the type of an edge by the types of the vertices at its ends, in alphabetical order,
+    e.g. 'person-person' for a co-authorship or 'institution-person' for an affiliation.
+    :param vert: (vertex obj) vertex at one end of the edge.
+    :param nbr: (vertex obj) vertex at the other end of the edge.
+    :return: (str) edge type.
+    """
+    return '-'.join(sorted((str(vert.get_type()), str(nbr.get_type()))))
+
+
+def typed_view(graph, vertex_types=None, edge_types=None):
+    """
+    Creates a view of the vertices of the given types and the edges of the given types between
+    them, without copying the graph.
+    :param graph: object of the Graph class.
+    :param vertex_types: (iterable | None) vertex types kept (e.g. ['person']), None for all.
+    :param edge_types: (iterable | None) edge types kept, named as by edge_type (e.g.
+        ['person-person']), None for all.
+    :return: (SubgraphView) view of graph.
+    """
+    vertex_filter = edge_filter = None
+    if vertex_types is not None:
+        kept_types = frozenset(vertex_types)
+        vertex_filter = lambda vert: vert.type in kept_types
+    if edge_types is not None:
+        # Both orders of the end types of each kept edge type, so edges need no sorting
+        kept_ends = {tuple(ends) for kind in edge_types for ends in (kind.split('-'), kind.split('-')[::-1])}
+        edge_filter = lambda vert, nbr: (str(vert.type), str(nbr.type)) in kept_ends
+    return SubgraphView(graph, vertex_filter, edge_filter)
+
+
+def people_view(graph):
+    """
+    Creates a view of the co-authorship graph: people and the edges between them.
+    :param graph: object of the Graph class.
+    :return: (SubgraphView) view of graph.
+    """
+    return typed_view(graph, vertex_types=['person'])
+
+
+def institutions_view(graph):
+    """
+    Creates a view of the institutions and the edges between them.
+    :param graph: object of the Graph class.
+    :return: (SubgraphView) view of graph.
+    """
+    return typed_view(graph, vertex_types=['institution'])
+
+
+def faculty_view(graph, coauthors=True):
+    """
+    Creates a view of the UMSI faculty and, optionally, the people they list as co-authors,
+    with the edges between them. Faculty and co-authors are read from the records the graph
+    was built from.
+    :param graph: object of the Graph class returned by build_graph, update_graph, or
+        identity.build_identity_graph.
+    :param coauthors: (bool) if True, also keeps the co-authors of faculty.
+    :return: (SubgraphView) view of graph.
+    :raises ValueError: if the graph was not built from the cache.
+    """
+    index = graph.build_index
+    if index is None:
+        raise ValueError('faculty are only known for graphs made by build_graph')
+    if graph.identities is not None:
+        if coauthors:
+            return SubgraphView(graph, lambda vert: vert.id in graph.identities.faculty
+                                or vert.id in graph.identities.coauthors)
+        return SubgraphView(graph, lambda vert: vert.id in graph.identities.faculty)
+    if coauthors:
+        return SubgraphView(graph, lambda vert: vert.id in index.faculty or vert.id in index.appearances)
+    return SubgraphView(graph, lambda vert: vert.id in index.faculty)
+
+
+def vertex_name(graph, key):
+    """
+    Returns the display name of a vertex: its key, or for a graph keyed by integer ids, the name
+    recorded for it in graph.identities.
+    :param graph: object of the Graph class, or a SubgraphView of one.
+    :param key: key of the vertex.
+    :return: (str) name of the vertex.
+    """
+    return key if graph.identities is None else graph.identities.get_name(key)
+
+
+def faculty_keys(graph):
+    """
+    Returns the keys of the UMSI faculty vertices, read from the records the graph was built from.
+    :param graph: object of the Graph class.
+    :return: (set) keys of the faculty vertices, empty if the graph was not built from the cache.
+    """
+    if graph.identities is not None:
+        return set(graph.identities.faculty)
+    if graph.build_index is not None:
+        return set(graph.build_index.faculty)
+    return set()
+
+
+def cached_result(graph, name, compute):
+    """
+    Returns the result of an analysis of the graph, computing it with compute only if it has
+    not been computed yet or the graph has changed since it was.
+    :param graph: object of the Graph class.
+    :param name: (str | tuple) name under which the result is stored in graph.results.
+    :param compute: function taking the graph and returning the result.
+    :return: result of compute(graph).
+    """
+    version, result = graph.results.get(name, (None, None))
+    if version != graph.version:
+        result = compute(graph)
+        graph.results[name] = (graph.version, result)
+    return result
+
+
+def adjacency_arrays(graph):
+    """
+    Converts the graph into compact arrays in compressed sparse row form: the neighbors of the
+    vertex at position i are indices[indptr[i]:indptr[i + 1]], given as positions in keys.
+    Algorithms that visit every edge run much faster over these arrays than over Vertex objects.
+    :param graph: object of the Graph class.
+    :return: (tuple) list of vertex keys, indptr array, and indices array.
+    """
+    keys = list(graph.get_vertices())
+    position = {vert: i for i, vert in enumerate(graph)}
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(vert.connected_to) for vert in graph])
+    indices = np.fromiter((position[nbr] for vert in graph for nbr in vert.get_connections()),
+                          dtype=np.int64, count=indptr[-1])
+    return keys, indptr, indices
+
+
+def get_adjacency_arrays(graph):
+    """
+    Returns the compact arrays from adjacency_arrays, rebuilding them only when the graph has
+    changed since they were last built.
+    :param graph: object of the Graph class.
+    :return: (tuple) list of vertex keys, indptr array, and indices array.
+    """
+    return cached_result(graph, 'adjacency', adjacency_arrays)
+
+
 def reset_graph(graph):
     """
     This function allows for successive searches of the graph by resetting
     vertex attributes that are used to track visited vertices during search.
+    The vertices' entries are removed from Vertex.search_state rather than
+    overwritten, so they read as unvisited ('white', infinite distance, no
+    pred) and take no memory until searched again.
     :param graph: object of the Graph class.
     :return: none.
     """
     for vert in graph:
-        vert.set_color('white')
-        vert.set_distance(0)
-        vert.set_pred(None)
+        Vertex.search_state.pop(vert, None)
 
 
 def get_degrees(graph):
     """
     Assembles a list of all vertices in the graph with the total number
     of vertices connected to each vertex.
-    :param graph: object of the Graph class.
-    :return: list of tuples
+    :param graph: object of the Graph class, or a SubgraphView of one.
+    :return: list of tuples of vertex name and degree
     """
     authors = []
-    for key in graph.vert_list.keys():
-        graph.vert_list[key].calc_degree()
-        authors.append((key, graph.vert_list[key].get_degree()))
+    for vert in graph:
+        authors.append((vertex_name(graph, vert.get_id()), graph.calc_degree(vert)))
     return sorted(authors, key=lambda item: item[1], reverse=True)
 
 
@@ -313,14 +1237,13 @@ def get_avg_degree(graph):
     """
     For the entire graph, calculates the average number of connections
     each vertex has.
-    :param graph: object of the Graph class.
+    :param graph: object of the Graph class, or a SubgraphView of one.
     :return: float
     """
     degrees = []
-    for key in graph.vert_list.keys():
-        graph.vert_list[key].calc_degree()
-        degrees.append((graph.vert_list[key].get_degree()))
-    return sum(degrees) / len(graph.vert_list.keys())
+    for vert in graph:
+        degrees.append(graph.calc_degree(vert))
+    return sum(degrees) / len(degrees)
 
 
 def get_endow_summary(graph, show_all=False):
@@ -381,45 +1304,52 @@ def parse_endow(endowment):
             return clean_endow
 
 
-def graph_to_json(graph):
+def graph_to_json(graph, filepath='graph_structure.json'):
     """
     Constructs a dictionary of vertices in the graph object and exports to
     JSON format, delegating JSON serialization to the write_json function
-    in the helper module.
-    :param graph: object of the Graph class.
+    in the helper module. Vertices of a graph keyed by integer ids are written under their
+    identity, which stays the same across builds, with their name and Google Scholar id.
+    :param graph: object of the Graph class, or a SubgraphView of one.
+    :param filepath: (str) path to file.
     :return: none.
     """
     graph_json = {}
-    vertices = graph.vert_list
-    for vert in vertices:
-        graph_json.update({vertices[vert].get_id(): {
-            'connected_to': [entity.get_id() for entity in vertices[vert].get_connections()],
-            'color': vertices[vert].get_color(),
+    identities = graph.identities
+    label = (lambda vert: vert.get_id()) if identities is None else (lambda vert: identities.keys[vert.get_id()])
+    for vert in graph:
+        graph_json.update({label(vert): {
+            'connected_to': [label(entity) for entity in graph.get_neighbors(vert)],
+            'color': vert.get_color(),
             'dist': 'infinity',
-            'pred': vertices[vert].get_pred(),
-            'affiliation': vertices[vert].get_affiliation(),
-            'affil_endow': vertices[vert].get_affil_endow(),
-            'degree': vertices[vert].get_degree(),
-            'type': vertices[vert].get_type()}})
-    utl.write_json('graph_structure.json', graph_json)
-
-
-def orgs_to_csv(graph):
+            'pred': vert.get_pred(),
+            'affiliation': vert.get_affiliation(),
+            'affil_endow': vert.get_affil_endow(),
+            'degree': graph.get_degree(vert),
+            'type': vert.get_type(),
+            'community': vert.get_community()}})
+        if identities is not None:
+            graph_json[label(vert)].update({'name': identities.get_name(vert.get_id()),
+                                            'scholar_id': identities.get_scholar_id(vert.get_id())})
+    utl.write_json(filepath, graph_json)
+
+
+def orgs_to_csv(graph, filepath='institutions.csv'):
     """
     Writes a list of institutions, the size of their endowments, and the number of vertices
     each is connected to in the graph to a CSV file. It delegates creation of the CSV file
     to the write_csv function in the helper module.
-    :param graph: object of the Graph class.
+    :param graph: object of the Graph class, or a SubgraphView of one.
+    :param filepath: (str) path to file.
     :return: none.
     """
     orgs = []
     headers = ['institution', 'endowment', 'num_connections']
-    vertices = graph.vert_list
-    for vert in vertices:
-        if vertices[vert].get_type() == 'institution':
-            info = [vertices[vert].get_id(), vertices[vert].get_affil_endow(), len(vertices[vert].connected_to.keys())]
+    for vert in graph:
+        if vert.get_type() == 'institution':
+            info = [vertex_name(graph, vert.get_id()), vert.get_affil_endow(), len(graph.get_neighbors(vert))]
             orgs.append(info)
-    utl.write_csv('institutions.csv', orgs, headers=headers)
+    utl.write_csv(filepath, orgs, headers=headers)
 
 
 def main():
@@ -0,0 +1,179 @@
+import argparse
+
+import numpy as np
+
+import graph
+import helper as utl
+
+# Vertex attributes compared between snapshots
+ATTRIBUTES = ('type', 'affiliation', 'affil_endow')
+
+
+def graph_snapshot(umsi_net):
+    """
+    Reads the vertices, attributes, and edges of a graph into the form compared by diff_snapshots.
+    Vertices of a graph keyed by integer ids are labeled with their identity, as in
+    graph.graph_to_json, since the ids of one person can differ between builds.
+    :param umsi_net: object of the Graph class.
+    :return: (tuple) list of vertex keys, list of attribute tuples in ATTRIBUTES order, indptr
+        array, and indices array as in graph.adjacency_arrays.
+    """
+    keys, indptr, indices = graph.get_adjacency_arrays(umsi_net)
+    if umsi_net.identities is not None:
+        keys = [umsi_net.identities.keys[key] for key in keys]
+    attrs = [(vert.get_type(), vert.get_affiliation(), vert.get_affil_endow()) for vert in umsi_net]
+    return keys, attrs, indptr, indices
+
+
+def json_snapshot(graph_json):
+    """
+    Reads the vertices, attributes, and edges of a graph exported by graph.graph_to_json into the
+    form compared by diff_snapshots.
+    :param graph_json: (dict | str) exported graph, or path to the JSON file.
+    :return: (tuple) list of vertex keys, list of attribute tuples in ATTRIBUTES order, indptr
+        array, and indices array as in graph.adjacency_arrays.
+    """
+    if isinstance(graph_json, str):
+        graph_json = utl.read_json(graph_json)
+    keys = list(graph_json)
+    position = {key: i for i, key in enumerate(keys)}
+    values = graph_json.values()
+    attrs = [tuple(value.get(attr) for attr in ATTRIBUTES) for value in values]
+    indptr = np.zeros(len(keys) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(value['connected_to']) for value in values])
+    indices = np.fromiter((position[nbr] for value in values for nbr in value['connected_to']),
+                          dtype=np.int64, count=indptr[-1])
+    return keys, attrs, indptr, indices
+
+
+def snapshot(source):
+    """
+    Reads a graph, an exported graph, or the path to one into the form compared by
+    diff_snapshots.
+    :param source: (Graph | dict | str) graph, exported graph, or path to an exported graph.
+    :return: (tuple) see graph_snapshot.
+    """
+    if isinstance(source, graph.Graph):
+        return graph_snapshot(source)
+    return json_snapshot(source)
+
+
+def edge_codes(indptr, indices, ids, size):
+    """
+    Encodes the edges of a snapshot as sorted unique integers from numbered endpoints, so two
+    edge sets can be compared with array set operations instead of Python sets of pairs. Edges are
+    undirected and listed from both endpoints, so each is encoded once from its lower number.
+    :param indptr: (ndarray) row pointers of the snapshot.
+    :param indices: (ndarray) neighbor positions of the snapshot.
+    :param ids: (ndarray) shared number of the vertex at each position of the snapshot.
+    :param size: (int) number of shared vertex numbers.
+    :return: (ndarray) sorted codes, lower * size + higher.
+    """
+    ends = np.repeat(ids, np.diff(indptr))
+    nbrs = ids[indices]
+    codes = np.sort(np.minimum(ends, nbrs) * size + np.maximum(ends, nbrs))
+    return codes[np.concatenate(([True], codes[1:] != codes[:-1]))] if len(codes) else codes
+
+
+def missing_codes(codes, reference):
+    """
+    Finds the codes that are not in a reference array with a binary search of each code.
+    :param codes: (ndarray) sorted unique codes.
+    :param reference: (ndarray) sorted unique codes to look in.
+    :return: (ndarray) sorted codes missing from reference.
+    """
+    if not len(reference):
+        return codes
+    pos = np.minimum(np.searchsorted(reference, codes), len(reference) - 1)
+    return codes[reference[pos] != codes]
+
+
+def diff_snapshots(old, new):
+    """
+    Compares two graph snapshots and lists the vertices and edges that appeared or disappeared
+    and the vertices whose attributes changed. Vertex keys of both snapshots are numbered in one
+    shared vocabulary, and edges are compared as sorted arrays of encoded pairs.
+    :param old: (tuple) earlier snapshot from snapshot.
+    :param new: (tuple) later snapshot from snapshot.
+    :return: (dict) delta with added and removed vertices and edges (each undirected edge as one
+        [vertex, vertex] pair, ordered by first appearance in the snapshots), changed
+        attributes as key: {attribute: [old value, new value]}, and counts of each.
+    """
+    old_keys, old_attrs, old_indptr, old_indices = old
+    new_keys, new_attrs, new_indptr, new_indices = new
+    vocab = {key: i for i, key in enumerate(old_keys)}
+    for key in new_keys:
+        vocab.setdefault(key, len(vocab))
+    names = list(vocab)
+    size = len(names)
+    old_ids = np.arange(len(old_keys), dtype=np.int64)
+    new_ids = np.fromiter((vocab[key] for key in new_keys), dtype=np.int64, count=len(new_keys))
+
+    in_new = np.zeros(size, dtype=bool)
+    in_new[new_ids] = True
+    added_verts = [names[i] for i in new_ids[new_ids >= len(old_keys)].tolist()]
+    removed_verts = [old_keys[i] for i in np.flatnonzero(~in_new[:len(old_keys)]).tolist()]
+
+    old_edges = edge_codes(old_indptr, old_indices, old_ids, size)
+    new_edges = edge_codes(new_indptr, new_indices, new_ids, size)
+    added_edges = missing_codes(new_edges, old_edges)
+    removed_edges = missing_codes(old_edges, new_edges)
+
+    changed = {}
+    for key, attrs, pos in zip(new_keys, new_attrs, new_ids.tolist()):
+        if pos < len(old_keys) and old_attrs[pos] != attrs:
+            changed[key] = {attr: [before, after] for attr, before, after in zip(ATTRIBUTES, old_attrs[pos], attrs)
+                            if before != after}
+
+    def pairs(codes):
+        return [[names[lo], names[hi]] for lo, hi in zip((codes // size).tolist(), (codes % size).tolist())]
+
+    return {'vertices': {'added': added_verts, 'removed': removed_verts},
+            'edges': {'added': pairs(added_edges), 'removed': pairs(removed_edges)},
+            'changed': changed,
+            'counts': {'vertices_added': len(added_verts), 'vertices_removed': len(removed_verts),
+                       'edges_added': len(added_edges), 'edges_removed': len(removed_edges),
+                       'vertices_changed': len(changed)}}
+
+
+def diff_graphs(old, new):
+    """
+    Compares two graph builds or exported snapshots, see diff_snapshots.
+    :param old: (Graph | dict | str) earlier graph, exported graph, or path to an exported graph.
+    :param new: (Graph | dict | str) later graph, exported graph, or path to an exported graph.
+    :return: (dict) delta from diff_snapshots.
+    """
+    return diff_snapshots(snapshot(old), snapshot(new))
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options of the graph diff.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Compare two graphs exported by graph.graph_to_json.')
+    parser.add_argument('old', nargs='?', default='graph_structure.json',
+                        help='earlier export (default graph_structure.json)')
+    parser.add_argument('new', nargs='?', default=None,
+                        help='later export (default: the graph built from cache.json)')
+    parser.add_argument('--out', default='graph_delta.json', help='file the delta is written to')
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    args = parse_args()
+    new = args.new or graph.build_graph(utl.read_json('cache.json'))
+    delta = diff_graphs(args.old, new)
+    utl.write_json(args.out, delta)
+    utl.print_pretty(delta['counts'])
+
+
+if __name__ == '__main__':
+    main()
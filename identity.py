@@ -0,0 +1,241 @@
+import argparse
+
+import graph
+import helper as utl
+import lookup
+
+
+class IdentityIndex:
+    """
+    This class defines the identities of the vertices of a graph built by build_identity_graph.
+    People are identified by their Google Scholar id, or by their normalized name when they have
+    none, and institutions by their normalized name. Each identity is numbered with a dense
+    integer id, which is the key of its vertex.
+
+    Attributes:
+        keys (list): identity of the vertex with each id, 'scholar:<scholar id>' or
+            'name:<normalized name>'.
+        names (list): display name of the vertex with each id, the first one seen.
+        ids (dict): identity mapped to its id.
+        by_name (dict): normalized name mapped to the list of ids of the vertices with that name,
+            more than one for homonyms.
+        aliases (dict): id mapped to the set of other display names seen for the identity.
+        faculty (set): ids of the UMSI faculty.
+        coauthors (set): ids of the people listed as co-authors of UMSI faculty.
+    Methods:
+        add: returns the id of an identity, numbering it if it is new.
+        get_name: returns the display name of the vertex with an id.
+        get_scholar_id: returns the Google Scholar id of the vertex with an id, or None.
+        find: returns the ids of the vertices with a name.
+        __len__: returns the number of identities.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.names = []
+        self.ids = {}
+        self.by_name = {}
+        self.aliases = {}
+        self.faculty = set()
+        self.coauthors = set()
+
+    def add(self, key, name):
+        vert_id = self.ids.get(key)
+        if vert_id is None:
+            vert_id = len(self.keys)
+            self.ids[key] = vert_id
+            self.keys.append(key)
+            self.names.append(name)
+            self.by_name.setdefault(lookup.normalize_name(name), []).append(vert_id)
+        elif name != self.names[vert_id]:
+            self.aliases.setdefault(vert_id, set()).add(name)
+        return vert_id
+
+    def get_name(self, vert_id):
+        return self.names[vert_id]
+
+    def get_scholar_id(self, vert_id):
+        key = self.keys[vert_id]
+        return key[len('scholar:'):] if key.startswith('scholar:') else None
+
+    def find(self, name):
+        return list(self.by_name.get(lookup.normalize_name(name), []))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def scholar_ids_by_name(data):
+    """
+    Collects the Google Scholar ids listed in the co-author records of the cache under each
+    normalized form of the co-author's name, with and without middle initials.
+    :param data: (dict) faculty and institution data.
+    :return: (dict) normalized name mapped to the set of Google Scholar ids listed under it.
+    """
+    found = {}
+    for faculty in data.get('auths-coauths'):
+        for records in (faculty.get('coauthors') or [], [faculty]):
+            for person in records:
+                if person.get('scholar_id'):
+                    for variant in lookup.name_variants(person.get('name')):
+                        found.setdefault(variant, set()).add(person.get('scholar_id'))
+    return found
+
+
+def person_key(record, known_ids):
+    """
+    Returns the identity of the person in a faculty or co-author record: their Google Scholar id
+    if the record has one, otherwise the one Google Scholar id listed elsewhere in the cache under
+    their name, otherwise their normalized name. A name listed under several ids belongs to
+    homonyms and is not resolved.
+    :param record: (dict) faculty or co-author record.
+    :param known_ids: (dict) normalized name mapped to Google Scholar ids, from scholar_ids_by_name.
+    :return: (str) identity, 'scholar:<scholar id>' or 'name:<normalized name>'.
+    """
+    if record.get('scholar_id'):
+        return f"scholar:{record.get('scholar_id')}"
+    candidates = set()
+    for variant in lookup.name_variants(record.get('name')):
+        candidates.update(known_ids.get(variant, ()))
+    if len(candidates) == 1:
+        return f'scholar:{candidates.pop()}'
+    return f"name:{lookup.normalize_name(record.get('name'))}"
+
+
+def build_identity_graph(data):
+    """
+    Constructs a graph of UMSI faculty and their co-authors and affiliations as build_graph does,
+    but keys each vertex by the dense integer id of its identity instead of its display name, so
+    homonyms with different Google Scholar ids stay apart and the name variants of one person are
+    merged. Institutions are matched in affiliations by their display names, as in build_graph.
+    The records are kept in a BuildIndex as build_graph does, so graph.update_graph, faculty views,
+    and the other functions of graph.py that read them accept the result.
+    :param data: (dict) faculty and institution data.
+    :return: object of the Graph class, with its IdentityIndex in the identities attribute.
+    """
+    g = graph.Graph()
+    index = IdentityIndex()
+    g.identities = index
+    known_ids = scholar_ids_by_name(data)
+
+    def add(key, name):
+        vert_id = index.add(key, name)
+        g.add_vertex(vert_id)
+        return g.get_vertex(vert_id)
+
+    # Add UMSI faculty to graph
+    faculty_ids = []
+    for faculty in data.get('auths-coauths'):
+        vert = add(person_key(faculty, known_ids), faculty.get('name'))
+        vert.set_type('person')
+        vert.set_affiliation('University of Michigan')
+        faculty_ids.append(vert.get_id())
+        index.faculty.add(vert.get_id())
+
+    # Add institutions with endowment data to graph
+    for org in data.get('enrich_institutions'):
+        if org.get('endowment') is not None:
+            vert = add(f"name:{lookup.normalize_name(org.get('org'))}", org.get('org'))
+            vert.set_affil_endow(org.get('endowment'))
+            vert.set_type('institution')
+
+    # Add coauthors to graph and connect people
+    for faculty, faculty_id in zip(data.get('auths-coauths'), faculty_ids):
+        for person in faculty.get('coauthors') or []:
+            vert = add(person_key(person, known_ids), person.get('name'))
+            vert.set_type('person')
+            index.coauthors.add(vert.get_id())
+            g.add_edge(faculty_id, vert.get_id())
+            g.add_edge(vert.get_id(), faculty_id)
+            if vert.get_affiliation() is None:
+                vert.set_affiliation(person.get('affiliation'))
+
+    # Connect institutions and people, looking up each substring of an affiliation among the
+    # display names instead of testing every vertex
+    display = {}
+    for vert_id, name in enumerate(index.names):
+        display.setdefault(name, []).append(vert_id)
+    for vert_id, names in index.aliases.items():
+        for name in names:
+            display.setdefault(name, []).append(vert_id)
+    for vert in list(g):
+        affil = vert.get_affiliation()
+        if affil is None:
+            continue
+        matches = sorted({vert_id for start in range(len(affil)) for end in range(start + 1, len(affil) + 1)
+                          for vert_id in display.get(affil[start:end], ())})
+        for vert_id in matches:
+            g.add_edge(vert.get_id(), vert_id)
+            g.add_edge(vert_id, vert.get_id())
+            vert.set_affil_endow(g.get_vertex(vert_id).get_affil_endow())
+    g.build_index = graph.BuildIndex(data, graph.fingerprint_records(data))
+    return g
+
+
+def find_vertices(umsi_net, name):
+    """
+    Finds the vertices of a graph built by build_identity_graph whose name matches a name,
+    ignoring accents, case, and punctuation.
+    :param umsi_net: object of the Graph class returned by build_identity_graph.
+    :param name: (str) name of a person or institution.
+    :return: (list) matching vertices, more than one for homonyms.
+    """
+    return [umsi_net.get_vertex(vert_id) for vert_id in umsi_net.identities.find(name)]
+
+
+def summarize_identities(data, umsi_net=None):
+    """
+    Compares the vertices of a graph keyed by identity with those of one keyed by display name.
+    :param data: (dict) faculty and institution data.
+    :param umsi_net: object of the Graph class returned by build_identity_graph, built from data
+        if not given.
+    :return: (dict) numbers of vertices keyed by name and by identity, of names shared by
+        homonyms and the vertices they stand for, of identities seen under more than one name,
+        and of faculty resolved to a Google Scholar id.
+    """
+    umsi_net = umsi_net or build_identity_graph(data)
+    index = umsi_net.identities
+    known_ids = scholar_ids_by_name(data)
+    names = {faculty.get('name') for faculty in data.get('auths-coauths')}
+    names.update(org.get('org') for org in data.get('enrich_institutions') if org.get('endowment') is not None)
+    names.update(person.get('name') for faculty in data.get('auths-coauths') for person in faculty.get('coauthors') or [])
+    homonyms = [ids for ids in index.by_name.values() if len(ids) > 1]
+    return {'vertices_by_name': len(names), 'vertices_by_identity': len(index),
+            'homonym_names': len(homonyms), 'homonym_vertices': sum(len(ids) for ids in homonyms),
+            'identities_with_variants': len(index.aliases),
+            'faculty_with_scholar_id': sum(person_key(faculty, known_ids).startswith('scholar:')
+                                           for faculty in data.get('auths-coauths'))}
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options of the identity graph.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Build the graph from cache.json keyed by Google Scholar id.')
+    parser.add_argument('--out', default=None, help='export the graph to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    args = parse_args()
+    data = utl.read_json('cache.json')
+    umsi_net = build_identity_graph(data)
+    utl.print_pretty(summarize_identities(data, umsi_net))
+    for ids in umsi_net.identities.by_name.values():
+        if len(ids) > 1:
+            print([(umsi_net.identities.get_name(i), umsi_net.identities.keys[i]) for i in ids])
+    utl.print_pretty(graph.get_degrees(umsi_net)[:10])
+    if args.out:
+        graph.graph_to_json(umsi_net, args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+import bisect
+import re
+import unicodedata
+from array import array
+
+import numpy as np
+
+import graph
+
+NAME_SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv', 'phd', 'md'}
+
+
+def normalize_name(name):
+    """
+    Reduces a name to a normalized key: accents are removed, letters are lowercased, and
+    punctuation and repeated spaces are dropped (e.g. "José  M. Pérez-Ruiz" becomes
+    "jose m perez ruiz").
+    :param name: (str) name of a person or institution.
+    :return: (str) normalized key.
+    """
+    decomposed = unicodedata.normalize('NFKD', name)
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(re.sub(r'[^\w\s]|_', ' ', stripped.casefold()).split())
+
+
+def name_variants(name):
+    """
+    Lists the normalized keys a name can be found under: its normalized form and, when it has
+    middle initials or suffixes such as "Jr" or "III", the form without them, so that
+    "Michael S. Bernstein" is also found as "Michael Bernstein".
+    :param name: (str) name of a person or institution.
+    :return: (set) normalized keys.
+    """
+    key = normalize_name(name)
+    tokens = key.split()
+    short = [token for i, token in enumerate(tokens)
+             if not ((len(token) == 1 and 0 < i < len(tokens) - 1) or (token in NAME_SUFFIXES and i > 0))]
+    return {key, ' '.join(short)} - {''}
+
+
+def padded_trigrams(key):
+    """
+    Splits a normalized key into trigrams, padding it so the first and last characters appear
+    in as many trigrams as the others.
+    :param key: (str) normalized key.
+    :return: (set) trigrams of the key.
+    """
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Computes the Levenshtein distance between two strings, giving up once it exceeds limit.
+    :param a: (str) first string.
+    :param b: (str) second string.
+    :param limit: (int) largest distance of interest.
+    :return: (int) edit distance, or limit + 1 if it is larger than limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class NameIndex:
+    """
+    This class defines an index of vertex names for exact, prefix, and typo-tolerant lookups.
+
+    Attributes:
+        keys (list): sorted normalized keys of all names, where a key's position is its id.
+            Keys sharing a prefix are adjacent, so the list serves as a compact prefix tree.
+        names (dict): normalized key mapped to the list of names (vertex keys) it stands for.
+        grams (dict): trigram mapped to an array of the ids of keys containing it.
+        lengths (ndarray): length of each key, by id.
+    Methods:
+        lookup: returns the names whose normalized key matches the normalized name.
+        complete: returns names whose normalized key starts with a prefix.
+        suggest: returns names within a small edit distance of a name, closest first.
+    """
+
+    def __init__(self, names):
+        self.names = {}
+        for name in names:
+            for key in name_variants(name):
+                self.names.setdefault(key, []).append(name)
+        self.keys = sorted(self.names)
+        self.grams = {}
+        for key_id, key in enumerate(self.keys):
+            for gram in padded_trigrams(key):
+                if gram not in self.grams:
+                    self.grams[gram] = array('q')
+                self.grams[gram].append(key_id)
+        self.lengths = np.fromiter((len(key) for key in self.keys), dtype=np.int64, count=len(self.keys))
+
+    def lookup(self, name):
+        found = []
+        for key in name_variants(name):
+            found.extend(match for match in self.names.get(key, []) if match not in found)
+        return found
+
+    def complete(self, prefix, k=10):
+        prefix = normalize_name(prefix)
+        found = []
+        pos = bisect.bisect_left(self.keys, prefix)
+        while pos < len(self.keys) and self.keys[pos].startswith(prefix) and len(found) < k:
+            found.extend(match for match in self.names[self.keys[pos]] if match not in found)
+            pos = pos + 1
+        return found[:k]
+
+    def suggest(self, name, k=5, max_distance=2):
+        query = normalize_name(name)
+        query_grams = padded_trigrams(query)
+        # Keys within max_distance edits lose at most 3 trigrams per edit, so only keys sharing
+        # at least `needed` trigrams with the query and of similar length are compared.
+        needed = len(query_grams) - 3 * max_distance
+        if needed > 0:
+            postings = [np.frombuffer(self.grams[gram], dtype=np.int64) for gram in query_grams if gram in self.grams]
+            if not postings:
+                return []
+            ids, shared = np.unique(np.concatenate(postings), return_counts=True)
+            candidates = ids[shared >= needed]
+        else:
+            candidates = np.arange(len(self.keys))
+        candidates = candidates[np.abs(self.lengths[candidates] - len(query)) <= max_distance]
+        ranked = {}
+        for key_id in candidates:
+            distance = edit_distance(query, self.keys[key_id], max_distance)
+            if distance <= max_distance:
+                for match in self.names[self.keys[key_id]]:
+                    ranked[match] = min(distance, ranked.get(match, distance))
+        return sorted(ranked.items(), key=lambda item: (item[1], item[0]))[:k]
+
+
+def get_name_index(umsi_net):
+    """
+    Returns the name index for the vertices of the graph, building it only when the graph has
+    changed since it was last built. A graph keyed by integer ids is indexed by the names in its
+    identities, each listed once however many vertices share it.
+    :param umsi_net: object of the Graph class.
+    :return: (NameIndex) index of vertex names.
+    """
+    if umsi_net.identities is None:
+        return graph.cached_result(umsi_net, 'names', lambda net: NameIndex(net.get_vertices()))
+    return graph.cached_result(umsi_net, 'names', lambda net: NameIndex(dict.fromkeys(net.identities.names)))
+
+
+def find_vertex(umsi_net, name):
+    """
+    Finds the vertex for a name, falling back to the name index when there is no exact match.
+    A name that normalizes to exactly one vertex (ignoring accents, case, punctuation, and
+    middle initials) resolves to it; otherwise the closest names are printed as suggestions. In a
+    graph keyed by identity, a name shared by homonyms lists them instead, see
+    identity.find_vertices.
+    :param umsi_net: object of the Graph class.
+    :param name: (str) name of a person or institution.
+    :return: (vertex obj | None) matching vertex, or None if the name could not be resolved.
+    """
+    identities = umsi_net.identities
+    if identities is None and name in umsi_net:
+        return umsi_net.get_vertex(name)
+    index = get_name_index(umsi_net)
+    found = index.lookup(name)
+    if len(found) == 1 and identities is not None:
+        ids = identities.find(found[0])
+        if len(ids) > 1:
+            listed = ', '.join(f'{vert_id} ({identities.keys[vert_id]})' for vert_id in ids)
+            print(f'{found[0]} is the name of {len(ids)} vertices: {listed}.')
+            return None
+        if found[0] != name:
+            print(f'Showing results for {found[0]}.')
+        return umsi_net.get_vertex(ids[0])
+    if len(found) == 1:
+        print(f'Showing results for {found[0]}.')
+        return umsi_net.get_vertex(found[0])
+    suggestions = found or [match for match, distance in index.suggest(name)]
+    if suggestions:
+        print(f"I couldn't find {name}. Did you mean: {', '.join(suggestions)}?")
+    return None
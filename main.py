@@ -1,13 +1,20 @@
+import argparse
+import itertools
 import pathlib
 import sys
 
+from matplotlib.figure import Figure
 from matplotlib.pyplot import show, subplots
 import numpy as np
 import pandas as pd
 import seaborn as sns
 
+import clustering
+import communities
 import graph
 import helper as utl
+import lookup
+import pathstats
 
 
 def display_path(shortest_path, start, end):
@@ -29,10 +36,41 @@ def display_path(shortest_path, start, end):
     return display_df
 
 
+def display_shortest_paths(net, dag, limit=5, top=5):
+    """
+    Prints how many shortest paths connect two vertices, the first few of them, and the vertices
+    in between that the most paths pass through, to show whether the two are linked through one
+    bridge or many.
+    :param net: graph object.
+    :param dag: (ShortestPaths) shortest paths between the two vertices from graph.shortest_paths.
+    :param limit: (int) number of paths listed.
+    :param top: (int) number of vertices listed.
+    :return: pandas dataframe of the vertices on the most paths.
+    """
+    total = dag.count()
+    print(f"{total:,} shortest path{'s' if total != 1 else ''} of {dag.distance} degrees connect "
+          f"{graph.vertex_name(net, dag.start.get_id())} and {graph.vertex_name(net, dag.end.get_id())}.")
+    if total > 1:
+        for path in itertools.islice(dag.paths(), limit):
+            print('  ' + ' -> '.join(str(key) for key in path))
+        if total > limit:
+            print(f'  ... and {total - limit:,} more')
+    ranked = dag.top_intermediates(top)
+    display_df = pd.DataFrame({'connection': [graph.vertex_name(net, vert.get_id()) for vert, _, _ in ranked],
+                               'affiliation': [vert.get_affiliation() for vert, _, _ in ranked],
+                               'paths': [through for _, through, _ in ranked],
+                               'share': [f'{share:.1%}' for _, _, share in ranked]})
+    if not display_df.empty:
+        print('Connections on the most shortest paths (a share of 100% is a bridge every path crosses):')
+        print(display_df.to_markdown(tablefmt='grid'))
+    return display_df
+
+
 def get_links(net, start=None, end=None, rand=False):
     """
     Obtains shortest path information for two vertices from a graph and passes
-    it to display_path for further processing.
+    it to display_path for further processing, then summarizes all of the shortest
+    paths between them with display_shortest_paths.
     :param net: graph object.
     :param start: (str) name of starting vertex.
     :param end: (str) name of ending vertex.
@@ -42,32 +80,76 @@ def get_links(net, start=None, end=None, rand=False):
     if rand:
         generator = np.random.default_rng()
         authors = generator.choice(list(net.get_vertices()), 2)
-        author_links = graph.bfs(net, net.get_vertex(authors[0]), net.get_vertex(authors[1]))
+        dag = graph.shortest_paths(net, net.get_vertex(authors[0]), net.get_vertex(authors[1]))
     else:
-        author_links = graph.bfs(net, net.get_vertex(start), net.get_vertex(end))
+        start_vert, end_vert = lookup.find_vertex(net, start), lookup.find_vertex(net, end)
+        dag = graph.shortest_paths(net, start_vert, end_vert)
+    author_links = None if dag is None or dag.distance is None else (dag.distance, next(dag.vertex_paths())[::-1])
+    if author_links is not None:
+        authors = [graph.vertex_name(net, dag.start.get_id()), graph.vertex_name(net, dag.end.get_id())]
+        author_links = (author_links[0], [(graph.vertex_name(net, vert.get_id()), vert.get_affiliation(),
+                                           vert.get_affil_endow()) for vert in author_links[1]])
+    elif not rand:
         authors = [start, end]
-    for author in author_links[1]:
-        pos = author_links[1].index(author)
-        author_links[1].remove(author)
-        author_links[1].insert(pos, (author, net.get_vertex(author).get_affiliation(),
-                                     net.get_vertex(author).get_affil_endow()))
     display_path(author_links, authors[0], authors[1])
+    display_shortest_paths(net, dag)
 
 
-def display_degrees(degrees_data):
+def display_degrees(degrees_data, clustering=None):
     """
-    Using data retrieved from the graph object, displays vertices with their degree.
+    Using data retrieved from the graph object, displays vertices with their degree and,
+    optionally, how tightly knit their connections are.
     :param degrees_data: (list) degree data for vertices retrieved from graph object.
+    :param clustering: (dict) optional triangle counts and clustering coefficients of vertices
+        from clustering.get_clustering.
     :return: dataframe converted to Markdown table containing degree data.
     """
     entities = [ent[0] for ent in degrees_data]
     degrees = [ent[1] for ent in degrees_data]
     top_connects = pd.DataFrame({'Person/Institution': entities, 'Number of Connections': degrees})
+    if clustering is not None:
+        top_connects['Triangles'] = [clustering[ent][0] for ent in entities]
+        top_connects['Clustering Coefficient'] = [round(clustering[ent][1], 4) for ent in entities]
     top_connects.index += 1
     print(top_connects.to_markdown(tablefmt='grid'))
     return top_connects
 
 
+def display_communities(summary):
+    """
+    Displays communities detected in the graph object with their size, main institutions, and
+    mean endowment.
+    :param summary: (list) community summaries from communities.summarize_communities.
+    :return: dataframe converted to Markdown table containing community data.
+    """
+    clusters = pd.DataFrame({'Community': [row[0] for row in summary],
+                             'People': [row[1] for row in summary],
+                             'Institutions': [row[2] for row in summary],
+                             'Main institutions': [', '.join(row[3]) for row in summary],
+                             'Mean endowment': ['' if np.isnan(row[4]) else '${:,}'.format(round(row[4]))
+                                                for row in summary]})
+    print(clusters.to_markdown(tablefmt='grid', index=False))
+    return clusters
+
+
+def display_path_stats(stats):
+    """
+    Displays estimated path length statistics and the share of connected pairs at each distance.
+    :param stats: (dict) path length statistics from pathstats.estimate_path_stats.
+    :return: dataframe converted to Markdown table containing the distance distribution.
+    """
+    low, high = stats['avg_path_length_ci']
+    print(f"From {stats['sources']} randomly chosen starting points, two connected people or institutions are\n"
+          f"on average {stats['avg_path_length']:.2f} hops apart (95% CI {low:.2f} to {high:.2f}).")
+    low, high = stats['effective_diameter_ci']
+    print(f"90% of connected pairs are within {stats['effective_diameter']:.2f} hops (95% CI {low:.2f} to {high:.2f}),\n"
+          f"and the longest distance seen was {stats['max_distance_seen']} hops.")
+    dist = pd.DataFrame({'Hops': list(stats['distance_distribution']),
+                         'Share of pairs': ['{:.2%}'.format(share) for share in stats['distance_distribution'].values()]})
+    print(dist.to_markdown(tablefmt='grid', index=False))
+    return dist
+
+
 def visualize_endows(endowments):
     """
     Plots endowment data retrieved from graph object using a boxplot and histogram.
@@ -94,6 +176,96 @@ def visualize_endows(endowments):
     show()
 
 
+def summarize_endows(endowments, bins=70, max_fliers=1000):
+    """
+    Computes the box plot statistics and histogram counts of endowment data once with NumPy so
+    plots can be drawn from the summaries instead of from every endowment.
+    :param endowments: (list) size of endowments from institutions in graph object.
+    :param bins: (int) number of histogram bins.
+    :param max_fliers: (int) maximum number of outliers kept for the box plot, chosen evenly
+        across the sorted outliers so their range is preserved.
+    :return: (tuple) box plot statistics in the format used by Axes.bxp, histogram counts, and
+        histogram bin edges.
+    :raises ValueError: if there are no endowments.
+    """
+    endows = np.asarray(endowments, dtype=float)
+    if not len(endows):
+        raise ValueError('there are no endowments to summarize')
+    q1, median, q3 = np.percentile(endows, [25, 50, 75])
+    iqr = q3 - q1
+    whislo = endows[endows >= q1 - 1.5 * iqr].min()
+    whishi = endows[endows <= q3 + 1.5 * iqr].max()
+    fliers = np.sort(endows[(endows < whislo) | (endows > whishi)])
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).astype(int)]
+    stats = {'med': median, 'q1': q1, 'q3': q3, 'whislo': whislo, 'whishi': whishi, 'fliers': fliers}
+    counts, edges = np.histogram(endows, bins=bins)
+    return stats, counts, edges
+
+
+def render_endows(endowments, path, bins=70):
+    """
+    Plots endowment data retrieved from graph object using a boxplot and histogram drawn from
+    pre-computed summaries, and writes the figure to a file. The figure is not attached to a
+    window, so this works without a display.
+    :param endowments: (list) size of endowments from institutions in graph object.
+    :param path: (str) path of the image to write; the extension (e.g. .png or .svg) sets the format.
+    :param bins: (int) number of histogram bins.
+    :return: (str) path of the image.
+    :raises ValueError: if there are no endowments.
+    """
+    stats, counts, edges = summarize_endows(endowments, bins=bins)
+    fig = Figure(figsize=(8, 8))
+    ax1, ax2 = fig.subplots(1, 2, sharey='all')
+    ax1.bxp([stats], positions=[0], widths=0.8, patch_artist=True)
+    ax1.set_xticks([])
+    ax1.text(0, stats['med'] * 1.3, '${:,}'.format(stats['med']),
+             horizontalalignment='center', size='x-small', color='w', weight='semibold')
+    ax2.barh(edges[:-1], counts, height=np.diff(edges), align='edge')
+    fig.suptitle('Endowments of Institutions Connected to UMSI Faculty', fontsize=20)
+    ax1.set_ylabel('Size of Endowments (tens of billions USD)')
+    ax2.set_xlabel('Number of Institutions')
+    ax1.grid(visible=True, color='b', axis='y')
+    ax2.grid(visible=True, color='b', axis='y')
+    fig.savefig(path)
+    return path
+
+
+def positive_int(text):
+    """
+    Reads a command line value that must be a whole number of at least 1.
+    :param text: (str) value given on the command line.
+    :return: (int) the number.
+    :raises ArgumentTypeError: if the value is not a whole number of at least 1.
+    """
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'{text} is not a whole number of at least 1')
+    return value
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options that let the program run without the interactive menu.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='UMSI Net, a network graph of UMSI faculty and their co-authors.')
+    parser.add_argument('--render-endowments', metavar='PATH',
+                        help='write endowment plots to PATH (.png or .svg) and exit without the menu')
+    parser.add_argument('--path-stats', action='store_true',
+                        help='estimate average path length and diameter and exit without the menu')
+    parser.add_argument('--samples', type=positive_int, default=100,
+                        help='number of random starting points used to estimate path lengths (default 100)')
+    parser.add_argument('--seed', type=int, default=0, help='seed for choosing starting points (default 0)')
+    parser.add_argument('--workers', type=positive_int, default=None,
+                        help='number of processes used to estimate path lengths (default: one per CPU)')
+    return parser.parse_args(argv)
+
+
 def main():
     """
     Entry point for program.
@@ -102,7 +274,19 @@ def main():
     :return: none.
     """
     # Start
+    args = parse_args()
     umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    if args.render_endowments:
+        endowments = graph.get_endow_summary(umsi_net, show_all=True)
+        if endowments:
+            print(f'Writing endowment plots to: {render_endows(endowments, args.render_endowments)}')
+        else:
+            print('No institutions in the graph have endowment data, so there is nothing to plot.')
+        return
+    if args.path_stats:
+        display_path_stats(pathstats.estimate_path_stats(umsi_net, samples=args.samples, seed=args.seed,
+                                                         workers=args.workers))
+        return
     while True:
         print('\n***********************************************\n'
               + '#### Welcome to UMSI Net, a network graph ####\n'
@@ -117,7 +301,10 @@ def main():
                 '5. Get the average number of connections in the graph (the degree).\n'
                 '6. Export the list of UMSI faculty to a CSV file.\n'
                 '7. Export the graph structure to JSON.\n'
-                '8. Export the list of institutions to a CSV file.\n')
+                '8. Export the list of institutions to a CSV file.\n'
+                '9. Explore the network within a few hops of a person or institution.\n'
+                '10. Find communities of collaborators.\n'
+                '11. Estimate how many hops usually separate people and institutions.\n')
         usr = input('\nEnter the number of your chosen action when ready. Type "exit" to quit.\n')
         if usr == 'exit':
             sys.exit('Goodbye!')
@@ -145,13 +332,17 @@ def main():
                 else:
                     print(f"Sorry, {choice} isn't an option I recognize. Please try again.")
         if usr == '2':
-            display_degrees(graph.get_degrees(umsi_net)[:10])
+            coefficients, transitivity = clustering.get_clustering(umsi_net)
+            print(f"Triangles count connections that also know each other; the clustering coefficient is the share\n"
+                  f"of a vertex's connections that are connected to each other. Across the graph, "
+                  f"{transitivity:.2%} of connected triples close into triangles.")
+            display_degrees(graph.get_degrees(umsi_net)[:10], coefficients)
             while True:
                 x_num = input('Would you like to view more? Enter the number of results you would like to see.\n'
                               'You can also enter "exit" or "menu" to return to the main menu.\n')
                 try:
                     x_num = int(x_num)
-                    display_degrees(graph.get_degrees(umsi_net)[:x_num])
+                    display_degrees(graph.get_degrees(umsi_net)[:x_num], coefficients)
                 except ValueError:
                     if x_num == 'exit':
                         sys.exit('Goodbye!')
@@ -161,6 +352,9 @@ def main():
                         print("I'm sorry. I don't understand. Please try again.")
         if usr == '3':
             while True:
+                if not graph.get_endow_summary(umsi_net, show_all=True):
+                    print('No institutions in the graph have endowment data. Returning to main menu...')
+                    break
                 stats = graph.get_endow_summary(umsi_net)
                 print(
                     f"Average endowment of institutions connected to UMSI faculty:\n${'{:,}'.format(round(stats[0]))}\n"
@@ -181,7 +375,8 @@ def main():
             while True:
                 person = input('Who would you like to search for?\n')
                 try:
-                    print(f"{person} has {len(umsi_net.get_vertex(person).get_connections())} connections.")
+                    vert = lookup.find_vertex(umsi_net, person)
+                    print(f"{vert.get_id()} has {len(vert.get_connections())} connections.")
                 except AttributeError:
                     print(f"I'm sorry. I can't find {person}. Please check your spelling.")
                 choice = input('Would you like to search again? Enter "yes" or "no".\n')
@@ -224,7 +419,8 @@ def main():
                   f'    - affiliation: institutional affiliation of person.\n'
                   f'    - affil_endow: endowment of affiliated institution.\n'
                   f'    - degree: number of vertices connected to vertex.\n'
-                  f'    - type: used to identify vertex as "person" or "institution"\n')
+                  f'    - type: used to identify vertex as "person" or "institution"\n'
+                  f'    - community: cluster of collaborators the vertex belongs to, if detected (option 10)\n')
             graph.graph_to_json(umsi_net)
             choice = input('Choose "menu" or "exit" to continue.\n')
             if choice == 'menu':
@@ -240,6 +436,69 @@ def main():
                 continue
             if choice == 'exit':
                 sys.exit('Goodbye!')
+        if usr == '9':
+            while True:
+                person = input('Whose network would you like to explore?\n')
+                hops = input('How many hops away should I look? Press enter to use 2.\n')
+                try:
+                    hops = int(hops) if hops else 2
+                    center = lookup.find_vertex(umsi_net, person)
+                    ego = graph.ego_network(umsi_net, center, k=hops)
+                    # The center is not within hops of itself, so leave it out of its type's count
+                    people = sum(vert.get_type() == 'person' for vert in ego if vert.get_id() != center.get_id())
+                    others = ego.num_vertices - 1 - people
+                    print(f"{person} is within {hops} hops of {people} people and "
+                          f"{others} institutions.\n"
+                          f"The most connected people and institutions in this network are:")
+                    display_degrees(graph.get_degrees(ego)[:10])
+                    choice = input('Would you like to export this network? Enter "yes" or "no".\n')
+                    if choice == 'yes':
+                        path = pathlib.Path(__file__).parent.resolve()
+                        print(f'Writing files to: {path}/ego_network.json and {path}/ego_institutions.csv')
+                        graph.graph_to_json(ego, filepath=f'{path}/ego_network.json')
+                        graph.orgs_to_csv(ego, filepath=f'{path}/ego_institutions.csv')
+                except AttributeError:
+                    print(f"I'm sorry. I can't find {person}. Please check your spelling.")
+                except ValueError:
+                    print(f"I'm sorry. {hops} isn't a number of hops I understand.")
+                choice = input('Would you like to explore another network? Enter "yes" or "no".\n')
+                if choice == 'yes':
+                    continue
+                if choice == 'no':
+                    break
+                else:
+                    print("I'm sorry. I don't understand. Returning to main menu...")
+                    break
+
+        if usr == '10':
+            members = communities.detect_communities(umsi_net)
+            print(f'I found {len(members)} communities. The largest are:')
+            display_communities(communities.summarize_communities(umsi_net, members)[:10])
+            choice = input('Would you like to export the community of each person and institution to a CSV file? '
+                           'Enter "yes" or "no".\n')
+            if choice == 'yes':
+                path = f'{pathlib.Path(__file__).parent.resolve()}/communities.csv'
+                print(f'Writing file to {path}.')
+                communities.communities_to_csv(umsi_net, filepath=path)
+            choice = input('Choose "menu" or "exit" to continue.\n')
+            if choice == 'menu':
+                continue
+            if choice == 'exit':
+                sys.exit('Goodbye!')
+        if usr == '11':
+            samples = input('How many random starting points should I use? Press enter to use 100.\n')
+            try:
+                samples = int(samples) if samples else 100
+                display_path_stats(pathstats.estimate_path_stats(umsi_net, samples=samples, seed=args.seed,
+                                                                 workers=args.workers))
+            except ValueError:
+                print(f"I'm sorry. {samples} isn't a number of starting points I can use. "
+                      f"Please enter a whole number of at least 1.")
+            choice = input('Choose "menu" or "exit" to continue.\n')
+            if choice == 'menu':
+                continue
+            if choice == 'exit':
+                sys.exit('Goodbye!')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,186 @@
+import math
+from collections import deque
+
+import numpy as np
+
+import graph
+import helper as utl
+
+
+class LandmarkOracle:
+    """
+    This class defines a distance oracle answering "degrees of separation" questions from
+    breadth-first search distances precomputed from a few landmark vertices. For any landmark l,
+    |d(a, l) - d(l, b)| <= d(a, b) <= d(a, l) + d(l, b), so each query costs O(#landmarks).
+
+    Attributes:
+        landmarks (list): keys of the landmark vertices.
+        keys (list): keys of all vertices, in the row order of distances.
+        index (dict): vertex key mapped to its row in distances.
+        distances (ndarray): (vertices x landmarks) array of hop counts from each landmark,
+            -1 where a vertex cannot be reached from the landmark. Each vertex's distances are
+            stored contiguously so a query reads two rows.
+    Methods:
+        bounds: returns the lower and upper bounds on the distance between two vertices.
+        distance: returns the upper bound on the distance between two vertices, or the exact
+            distance from graph.bfs when exact is True and the bounds differ.
+    """
+
+    def __init__(self, landmarks, keys, distances):
+        self.landmarks = landmarks
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.distances = distances
+
+    def bounds(self, start, end):
+        a, b = self.index[start.get_id()], self.index[end.get_id()]
+        if a == b:
+            return 0, 0
+        dist_a, dist_b = self.distances[a], self.distances[b]
+        reach_a, reach_b = dist_a >= 0, dist_b >= 0
+        # A landmark reaching only one of the vertices shows they are not connected
+        if np.any(reach_a != reach_b):
+            return math.inf, math.inf
+        both = reach_a & reach_b
+        if not both.any():
+            return 1, math.inf
+        upper = int((dist_a[both] + dist_b[both]).min())
+        lower = max(1, int(np.abs(dist_a[both] - dist_b[both]).max()))
+        return lower, upper
+
+    def distance(self, umsi_net, start, end, exact=False):
+        lower, upper = self.bounds(start, end)
+        if not exact or lower == upper:
+            return upper
+        path = graph.bfs(umsi_net, start, end)
+        return math.inf if path is None else path[0]
+
+
+def select_landmarks(umsi_net, count=16):
+    """
+    Chooses landmark vertices for a LandmarkOracle: the most connected UMSI faculty first,
+    since most paths in the graph run through them, then the most connected other vertices.
+    :param umsi_net: object of the Graph class.
+    :param count: (int) number of landmarks.
+    :return: (list) keys of the landmark vertices.
+    """
+    faculty = graph.faculty_keys(umsi_net)
+    ranked = sorted(umsi_net, key=lambda vert: (vert.get_id() not in faculty, -len(vert.connected_to)))
+    return [vert.get_id() for vert in ranked[:count]]
+
+
+def landmark_distances(umsi_net, landmark, index):
+    """
+    Runs a breadth-first search from a landmark over the whole graph.
+    :param umsi_net: object of the Graph class.
+    :param landmark: (str) key of the landmark vertex.
+    :param index: (dict) vertex key mapped to its position in the returned array.
+    :return: (ndarray) hop count from the landmark to each vertex, -1 if unreachable.
+    """
+    dist = np.full(len(index), -1, dtype=np.int32)
+    start = umsi_net.get_vertex(landmark)
+    dist[index[landmark]] = 0
+    q = deque([start])
+    while q:
+        current_vert = q.popleft()
+        next_dist = dist[index[current_vert.get_id()]] + 1
+        for nbr in current_vert.get_connections():
+            pos = index[nbr.get_id()]
+            if dist[pos] < 0:
+                dist[pos] = next_dist
+                q.append(nbr)
+    return dist
+
+
+def build_landmark_oracle(umsi_net, count=16):
+    """
+    Precomputes breadth-first search distances from landmark vertices chosen by select_landmarks.
+    :param umsi_net: object of the Graph class.
+    :param count: (int) number of landmarks.
+    :return: (LandmarkOracle) distance oracle for the graph.
+    """
+    keys = list(umsi_net.get_vertices())
+    index = {key: i for i, key in enumerate(keys)}
+    landmarks = select_landmarks(umsi_net, count)
+    distances = np.empty((len(keys), len(landmarks)), dtype=np.int32)
+    for col, landmark in enumerate(landmarks):
+        distances[:, col] = landmark_distances(umsi_net, landmark, index)
+    return LandmarkOracle(landmarks, keys, distances)
+
+
+def get_landmark_oracle(umsi_net, count=16):
+    """
+    Returns the landmark oracle for the graph, building it only when the graph has changed
+    since it was last built.
+    :param umsi_net: object of the Graph class.
+    :param count: (int) number of landmarks.
+    :return: (LandmarkOracle) distance oracle for the graph.
+    """
+    return graph.cached_result(umsi_net, ('landmarks', count), lambda net: build_landmark_oracle(net, count))
+
+
+def save_oracle(oracle, filepath='landmarks.npz', umsi_net=None):
+    """
+    Writes a landmark oracle to a compressed NumPy archive so it can be stored with the graph.
+    Vertex keys are written with their own type. If the graph is given and keyed by integer
+    ids, its vertices are written under their identity instead, as in graph.graph_to_json, so the
+    oracle can be loaded into another build of the same data.
+    :param oracle: (LandmarkOracle) distance oracle to save.
+    :param filepath: (str) path to file.
+    :param umsi_net: object of the Graph class the oracle was built from, or None.
+    :return: none.
+    """
+    if umsi_net is not None and umsi_net.identities is not None:
+        labels = umsi_net.identities.keys
+        np.savez_compressed(filepath, identities=np.array([labels[key] for key in oracle.keys], dtype=str),
+                            landmark_identities=np.array([labels[key] for key in oracle.landmarks], dtype=str),
+                            distances=oracle.distances)
+    else:
+        np.savez_compressed(filepath, landmarks=np.array(oracle.landmarks), keys=np.array(oracle.keys),
+                            distances=oracle.distances)
+
+
+def load_oracle(umsi_net, filepath='landmarks.npz'):
+    """
+    Reads a landmark oracle written by save_oracle and stores it on the graph so
+    get_landmark_oracle returns it instead of rebuilding it. Vertices written under their identity
+    are looked up in umsi_net.identities.
+    :param umsi_net: object of the Graph class the oracle was built from.
+    :param filepath: (str) path to file.
+    :return: (LandmarkOracle) distance oracle for the graph.
+    :raises ValueError: if the oracle was built from a graph with different vertices.
+    """
+    with np.load(filepath) as archive:
+        if 'identities' in archive:
+            if umsi_net.identities is None:
+                raise ValueError(f'{filepath} was built from a graph keyed by identity')
+            ids = umsi_net.identities.ids
+            landmarks = [ids.get(label) for label in archive['landmark_identities'].tolist()]
+            keys = [ids.get(label) for label in archive['identities'].tolist()]
+        else:
+            landmarks = archive['landmarks'].tolist()
+            keys = archive['keys'].tolist()
+        distances = archive['distances']
+    if len(keys) != umsi_net.num_vertices or any(key is None or key not in umsi_net for key in keys):
+        raise ValueError(f'{filepath} was built from a different graph')
+    oracle = LandmarkOracle(landmarks, keys, distances)
+    umsi_net.results[('landmarks', len(landmarks))] = (umsi_net.version, oracle)
+    return oracle
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    oracle = get_landmark_oracle(umsi_net)
+    save_oracle(oracle, umsi_net=umsi_net)
+    start, end = umsi_net.get_vertex('Dan Jurafsky'), umsi_net.get_vertex('Ixchel Faniel')
+    utl.print_pretty((oracle.landmarks, oracle.bounds(start, end), oracle.distance(umsi_net, start, end, exact=True)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+import graph
+import helper as utl
+
+# Adjacency arrays shared read-only by the worker processes, set by init_worker
+WORKER_ADJACENCY = None
+
+
+def init_worker(indptr, indices):
+    """
+    Stores the graph's compact adjacency arrays in a worker process so every search it runs
+    reads the same copy instead of receiving the graph with each task. The arrays are kept as
+    NumPy arrays: worker processes started by fork share their pages with the parent until
+    written, which searches never do.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :return: none.
+    """
+    global WORKER_ADJACENCY
+    WORKER_ADJACENCY = (indptr, indices)
+
+
+def source_histogram(source):
+    """
+    Runs a breadth-first search from a source vertex over the worker's adjacency arrays and
+    counts the vertices found at each distance. Each level is expanded with array operations:
+    the neighbor lists of the whole frontier are gathered at once and the unseen ones kept.
+    :param source: (int) position of the source vertex.
+    :return: (ndarray) number of vertices reached at each distance, starting from distance 1.
+    """
+    ptr, nbrs = WORKER_ADJACENCY
+    seen = np.zeros(len(ptr) - 1, dtype=bool)
+    seen[source] = True
+    frontier = np.array([source], dtype=np.int64)
+    counts = []
+    while len(frontier):
+        starts, lengths = ptr[frontier], ptr[frontier + 1] - ptr[frontier]
+        # Position of every neighbor entry of the frontier in nbrs
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        found = nbrs[offsets]
+        frontier = np.unique(found[~seen[found]])
+        seen[frontier] = True
+        if len(frontier):
+            counts.append(len(frontier))
+    return np.array(counts, dtype=np.int64)
+
+
+def distance_histograms(indptr, indices, sources, workers=None):
+    """
+    Runs breadth-first searches from many source vertices across a pool of worker processes
+    that share the read-only adjacency arrays.
+    :param indptr: (ndarray) row pointers from graph.adjacency_arrays.
+    :param indices: (ndarray) neighbor positions from graph.adjacency_arrays.
+    :param sources: (list) positions of the source vertices.
+    :param workers: (int | None) number of worker processes, defaults to the number of CPUs.
+        With 1 the searches run in the current process.
+    :return: (ndarray) (sources x distances) matrix counting the vertices reached from each
+        source at distances 1, 2, and so on.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker(indptr, indices)
+        results = [source_histogram(source) for source in sources]
+    else:
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(indptr, indices)) as pool:
+            results = pool.map(source_histogram, sources, chunksize=max(1, len(sources) // (workers * 4)))
+    width = max((len(counts) for counts in results), default=0)
+    hists = np.zeros((len(sources), width), dtype=np.int64)
+    for row, counts in enumerate(results):
+        hists[row, :len(counts)] = counts
+    return hists
+
+
+def effective_diameter(hist, quantile=0.9):
+    """
+    Finds the distance within which a given share of connected pairs lie, interpolating between
+    whole distances.
+    :param hist: (ndarray) number of pairs at distances 1, 2, and so on.
+    :param quantile: (float) share of pairs.
+    :return: (float) effective diameter.
+    """
+    total = hist.sum()
+    if total == 0:
+        return 0.0
+    cumulative = np.concatenate([[0], np.cumsum(hist)]) / total
+    return float(np.interp(quantile, cumulative, np.arange(len(cumulative))))
+
+
+def summarize_distances(hists, confidence=0.95, resamples=1000, seed=0):
+    """
+    Estimates path length statistics from the distance histograms of sampled sources, with
+    confidence intervals from bootstrap resampling of the sources.
+    :param hists: (ndarray) (sources x distances) matrix from distance_histograms.
+    :param confidence: (float) confidence level of the intervals.
+    :param resamples: (int) number of bootstrap resamples.
+    :param seed: (int) seed for the random number generator.
+    :return: (dict) average path length, effective diameter (90th percentile distance), largest
+        distance seen, the distance distribution, and (low, high) confidence intervals.
+    """
+    rng = np.random.default_rng(seed)
+    distances = np.arange(1, hists.shape[1] + 1)
+    weights = rng.multinomial(len(hists), np.full(len(hists), 1 / len(hists)), size=resamples)
+    boot = weights @ hists
+    reached = boot.sum(axis=1)
+    boot_avg = np.divide(boot @ distances, reached, out=np.zeros(resamples), where=reached > 0)
+    boot_diam = np.array([effective_diameter(hist) for hist in boot])
+    tails = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+    total = hists.sum(axis=0)
+    return {'sources': len(hists),
+            'avg_path_length': float(total @ distances / total.sum()) if total.sum() else 0.0,
+            'avg_path_length_ci': tuple(np.percentile(boot_avg, tails).tolist()),
+            'effective_diameter': effective_diameter(total),
+            'effective_diameter_ci': tuple(np.percentile(boot_diam, tails).tolist()),
+            'max_distance_seen': int(np.flatnonzero(total)[-1] + 1) if total.sum() else 0,
+            'distance_distribution': {int(d): float(share) for d, share in zip(distances, total / max(total.sum(), 1))}}
+
+
+def estimate_path_stats(umsi_net, samples=100, seed=0, workers=None, confidence=0.95):
+    """
+    Estimates the average shortest path length, effective diameter, and distance distribution
+    of the graph from breadth-first searches started at randomly chosen vertices.
+    :param umsi_net: object of the Graph class.
+    :param samples: (int) number of source vertices, at least 1 and capped at the number of
+        connected vertices.
+    :param seed: (int) seed for choosing sources and for the bootstrap.
+    :param workers: (int | None) number of worker processes, at least 1, defaults to the number
+        of CPUs.
+    :param confidence: (float) confidence level of the intervals.
+    :return: (dict) path length statistics, see summarize_distances.
+    :raises ValueError: if samples or workers is less than 1 or the graph has no edges.
+    """
+    if samples < 1:
+        raise ValueError(f'at least one source vertex is needed, not {samples}')
+    if workers is not None and workers < 1:
+        raise ValueError(f'at least one worker process is needed, not {workers}')
+    keys, indptr, indices = graph.get_adjacency_arrays(umsi_net)
+    connected = np.flatnonzero(np.diff(indptr) > 0)
+    if not len(connected):
+        raise ValueError('the graph has no edges to measure paths along')
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(connected, size=min(samples, len(connected)), replace=False).tolist()
+    hists = distance_histograms(indptr, indices, sources, workers=workers)
+    return summarize_distances(hists, confidence=confidence, seed=seed)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    umsi_net = graph.build_graph(utl.read_json('cache.json'))
+    utl.print_pretty(estimate_path_stats(umsi_net, samples=200))
+
+
+if __name__ == '__main__':
+    main()
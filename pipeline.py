@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+import helper as utl
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+class Stage:
+    """
+    This class defines one step of the data pipeline. Each input item is passed to func, which
+    returns the items handed on to the next stage. Finished items are appended to a checkpoint
+    file, so a rerun after a failure emits their stored outputs instead of calling func again.
+    Items whose call raised an exception are recorded and left out of the checkpoint, so a
+    rerun retries them. Each item travels with its position, the tuple of its index among the
+    pipeline inputs and among the outputs of each item it came from, so outputs can be put back
+    in input order however the threads finish.
+
+    Attributes:
+        name (str): name of the stage, also the name of its checkpoint file.
+        func (function): called with an input item, returns a list of output items.
+        workers (int): number of threads running func, which limits concurrent calls.
+        key (function): returns the checkpoint key of an input item.
+        unique (bool): if True, inputs with a key already seen in this run are dropped.
+        checkpoint (str | None): path to the checkpoint file, None to run without one.
+        done (dict): checkpoint key mapped to the stored outputs of each finished item.
+        outputs (list): outputs of the stage in this run in input order, including those read
+            from the checkpoint, set by finish.
+        results (dict): outputs of each finished input, by key when unique and by position
+            otherwise.
+        positions (dict): earliest position at which each entry of results was received.
+        seen (set): keys of inputs received in this run.
+        errors (list): key and exception message for each input whose call failed.
+        received, resumed, emitted (int): counts of inputs, inputs answered from the checkpoint,
+            and outputs.
+        busy (float): seconds spent in func, summed over threads.
+        started, finished (float | None): times the first input arrived and the stage ended.
+        lock (Lock): guards the counters, outputs, and checkpoint file.
+    Methods:
+        load_checkpoint: reads the outputs of items finished in earlier runs.
+        process: returns the outputs for an input item, calling func only when needed.
+        finish: puts the outputs in the order of the inputs they came from.
+        report: returns throughput figures for the stage.
+    """
+
+    def __init__(self, name, func, workers=1, key=str, unique=False, checkpoint_dir=None):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.key = key
+        self.unique = unique
+        self.checkpoint = os.path.join(checkpoint_dir, f'{name}.jsonl') if checkpoint_dir else None
+        self.done = {}
+        self.outputs = []
+        self.results = {}
+        self.positions = {}
+        self.seen = set()
+        self.errors = []
+        self.received = self.resumed = self.emitted = 0
+        self.busy = 0.0
+        self.started = self.finished = None
+        self.lock = threading.Lock()
+        self.load_checkpoint()
+
+    def load_checkpoint(self):
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return
+        with open(self.checkpoint, 'r', encoding='utf-8') as file_obj:
+            for line in file_obj:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash while it was being written
+                    continue
+                self.done[entry['key']] = entry['outputs']
+
+    def process(self, item, position=(0,)):
+        key = self.key(item)
+        slot = key if self.unique else position
+        with self.lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            self.received += 1
+            self.positions[slot] = min(self.positions.get(slot, position), position)
+            if self.unique and key in self.seen:
+                return []
+            self.seen.add(key)
+            outputs = self.done.get(key)
+        if outputs is not None:
+            with self.lock:
+                self.resumed += 1
+        else:
+            start = time.perf_counter()
+            try:
+                outputs = list(self.func(item))
+            except Exception as e:
+                with self.lock:
+                    self.errors.append((key, repr(e)))
+                return []
+            with self.lock:
+                self.busy += time.perf_counter() - start
+                self.done[key] = outputs
+                if self.checkpoint is not None:
+                    with open(self.checkpoint, 'a', encoding='utf-8') as file_obj:
+                        file_obj.write(json.dumps({'key': key, 'outputs': outputs}, ensure_ascii=False) + '\n')
+        with self.lock:
+            self.results[slot] = outputs
+            self.emitted += len(outputs)
+        return outputs
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        self.outputs = [output for slot in sorted(self.results, key=self.positions.get)
+                        for output in self.results[slot]]
+
+    def report(self):
+        wall = (self.finished or time.perf_counter()) - self.started if self.started else 0.0
+        return {'stage': self.name, 'workers': self.workers, 'in': self.received, 'out': self.emitted,
+                'resumed': self.resumed, 'failed': len(self.errors), 'busy_s': round(self.busy, 3),
+                'wall_s': round(wall, 3), 'items_per_s': round(self.received / wall, 1) if wall else 0.0}
+
+
+def run_worker(stage, inbox, outbox, failures):
+    """
+    Takes items from a stage's input queue and puts their outputs on the next stage's queue until
+    the end marker arrives, which is put back for the stage's other workers. Queued items are
+    (position, item) pairs, see Stage. Exceptions raised by the stage's func are recorded by
+    Stage.process; anything else that fails (a checkpoint write, a queue) is added to failures,
+    after which the workers of every stage take their remaining items without processing them,
+    so no stage is left blocked on a full queue and the end marker always reaches the next stage.
+    :param stage: (Stage) stage to run.
+    :param inbox: (Queue) input queue of the stage.
+    :param outbox: (Queue | None) input queue of the next stage, None for the last stage.
+    :param failures: (list) exceptions that stopped a worker, shared by every worker.
+    :return: none.
+    """
+    try:
+        entry = inbox.get()
+        while entry is not DONE:
+            if not failures:
+                position, item = entry
+                for i, output in enumerate(stage.process(item, position)):
+                    if outbox is not None:
+                        outbox.put((position + (i,), output))
+            entry = inbox.get()
+    except Exception as e:
+        failures.append(e)
+        while inbox.get() is not DONE:
+            pass
+    finally:
+        inbox.put(DONE)
+
+
+def run_stages(stages, items, queue_size=64):
+    """
+    Runs stages as a streaming pipeline: each stage has its own threads and reads from a bounded
+    queue filled by the stage before it, so later stages start on the first results while
+    earlier stages are still running, and a slow stage holds back the ones feeding it instead of
+    letting their results pile up in memory.
+    :param stages: (list) Stage objects in pipeline order.
+    :param items: (iterable) inputs of the first stage.
+    :param queue_size: (int) maximum number of items waiting between two stages.
+    :return: (list) throughput report of each stage.
+    :raises Exception: the first failure that stopped a worker outside the stage's func, once
+        every thread has finished.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    failures = []
+    threads = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        threads.append([threading.Thread(target=run_worker, args=(stage, queues[i], outbox, failures), daemon=True)
+                        for _ in range(stage.workers)])
+        for thread in threads[-1]:
+            thread.start()
+    try:
+        for i, item in enumerate(items):
+            if failures:
+                break
+            queues[0].put(((i,), item))
+    finally:
+        queues[0].put(DONE)
+    for i, stage in enumerate(stages):
+        for thread in threads[i]:
+            thread.join()
+        stage.finish()
+        if i + 1 < len(stages):
+            queues[i + 1].put(DONE)
+    if failures:
+        raise failures[0]
+    return [stage.report() for stage in stages]
+
+
+def default_clients(model='gpt-3.5-turbo'):
+    """
+    Returns the functions that call external services in the pipeline: the UMSI faculty
+    directory, Google Scholar, the OpenAI API (for the affiliations the rules in affiliations.py
+    cannot resolve), and Wikipedia. Replace any of them with local functions to run the pipeline
+    without network access.
+    :param model: (str) OpenAI chat model used to extract organization names.
+    :return: (dict) client name mapped to its function.
+    """
+    import affiliations
+    import finances
+    import scholar
+    import scrape
+
+    scholar.use_proxy()
+    session = scrape.get_session()
+
+    def faculty(url):
+        return scrape.scrape_directory([url], session=session, workers=1)
+
+    # Institutions found by the previous run let most affiliations be resolved without the API
+    try:
+        classifier = affiliations.AffiliationClassifier(affiliations.known_institutions(utl.read_json('cache.json')))
+    except FileNotFoundError:
+        classifier = affiliations.AffiliationClassifier({})
+
+    def organizations(affils):
+        return affiliations.extract_organizations(model, affils, classifier, limit=1)
+
+    def endowments(org):
+        return finances.get_assets([org])
+
+    return {'faculty': faculty, 'scholar': scholar.find_author, 'affiliations': organizations,
+            'finances': endowments}
+
+
+def build_stages(clients, workers=None, checkpoint_dir='checkpoints'):
+    """
+    Builds the stages that refresh the cache: faculty names from the directory pages, their
+    Google Scholar profiles, the organizations in their co-authors' affiliations, and the
+    endowments of those organizations.
+    :param clients: (dict) functions calling external services, see default_clients.
+    :param workers: (dict) stage name mapped to its number of threads, for stages other than
+        the defaults.
+    :param checkpoint_dir: (str | None) directory for checkpoint files, None to run without them.
+    :return: (list) Stage objects in pipeline order.
+    """
+    workers = {'faculty': 4, 'scholar': 2, 'affiliations': 2, 'finances': 8, **(workers or {})}
+
+    def profile(person):
+        record = clients['scholar'](person)
+        # Retain only exact matches
+        return [record] if record.get('name', '').lower() == person.lower() else []
+
+    def organizations(record):
+        affils = [coauth.get('affiliation') for coauth in record.get('coauthors') or [] if coauth.get('affiliation')]
+        return clients['affiliations'](affils) if affils else []
+
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    return [Stage('faculty', clients['faculty'], workers['faculty'], checkpoint_dir=checkpoint_dir),
+            Stage('scholar', profile, workers['scholar'], unique=True, checkpoint_dir=checkpoint_dir),
+            Stage('affiliations', organizations, workers['affiliations'], key=lambda record: record['name'],
+                  checkpoint_dir=checkpoint_dir),
+            Stage('finances', clients['finances'], workers['finances'], unique=True, checkpoint_dir=checkpoint_dir)]
+
+
+def save_results(stages, filepath='cache.json'):
+    """
+    Writes the outputs of the pipeline stages to the cache in a single write, replacing the
+    keys they refresh and keeping the others.
+    :param stages: (list) Stage objects from build_stages after a run.
+    :param filepath: (str) path to cache.
+    :return: (dict) updated cache.
+    """
+    faculty, profiles, orgs, enriched = (stage.outputs for stage in stages)
+    try:
+        cache = utl.read_json(filepath)
+    except FileNotFoundError:
+        cache = {}
+    cache['umsi_faculty'] = list(dict.fromkeys(faculty))
+    cache['auths-coauths'] = profiles
+    cache['institutions'] = list(dict.fromkeys(orgs))
+    cache['enrich_institutions'] = enriched
+    utl.write_json(filepath, cache)
+    return cache
+
+
+def run_pipeline(urls, clients=None, workers=None, queue_size=64, checkpoint_dir='checkpoints',
+                 cache_path='cache.json'):
+    """
+    Refreshes the cache from the UMSI faculty directory pages through all pipeline stages,
+    resuming from the checkpoints of an earlier run if there are any. The cache is only written
+    when every stage finished without errors, since the outputs of a run with failed items are
+    incomplete; the finished items stay in the checkpoints, and a rerun retries the others.
+    :param urls: (list) addresses of the faculty directory pages.
+    :param clients: (dict) functions calling external services, defaults to default_clients().
+    :param workers: (dict) stage name mapped to its number of threads.
+    :param queue_size: (int) maximum number of items waiting between two stages.
+    :param checkpoint_dir: (str | None) directory for checkpoint files, None to run without them.
+    :param cache_path: (str | None) path to cache, None to leave the cache unchanged.
+    :return: (tuple) Stage objects and the throughput report of each stage.
+    :raises Exception: a failure that stopped a worker outside a stage's func, see run_stages.
+    """
+    stages = build_stages(clients or default_clients(), workers, checkpoint_dir)
+    report = run_stages(stages, urls, queue_size)
+    if cache_path and not any(stage.errors for stage in stages):
+        save_results(stages, cache_path)
+    return stages, report
+
+
+def parse_args(argv=None):
+    """
+    Reads the command line options of the pipeline.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Refresh cache.json from the UMSI directory, Google Scholar, '
+                                                 'OpenAI, and Wikipedia.')
+    parser.add_argument('--fresh', action='store_true', help='discard checkpoints and start over')
+    parser.add_argument('--checkpoints', default='checkpoints', help='checkpoint directory (default checkpoints)')
+    parser.add_argument('--workers', nargs='*', default=[], metavar='STAGE=N',
+                        help='threads for a stage, e.g. scholar=1 finances=16')
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :params: none.
+    :return: none.
+    """
+    args = parse_args()
+    if args.fresh:
+        shutil.rmtree(args.checkpoints, ignore_errors=True)
+    workers = {name: int(count) for name, count in (option.split('=') for option in args.workers)}
+    stages, report = run_pipeline(utl.read_json('cache.json')['umsi_pages'], workers=workers,
+                                  checkpoint_dir=args.checkpoints)
+    utl.print_pretty(report)
+    for stage in stages:
+        for key, error in stage.errors:
+            print(f'{stage.name} failed for {key}: {error}')
+    if any(stage.errors for stage in stages):
+        print('The cache was left unchanged because some items failed. Run again to retry them.')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,40 +5,71 @@ from tqdm import tqdm
 
 import helper as utl
 
-# Load data
-faculty = utl.read_json('cache.json')['umsi_faculty']
-
-# Set up proxy
-# NOTE: Proxy will often fail due to Google blocking
-pg = ProxyGenerator()
-print(pg.ScraperAPI(os.getenv('SCRAPERAPI_KEY')))  # returns True if successful connection
-scholarly.use_proxy(pg)
-
-# Search and cache results
-# adapting method for handling no results:
-# https://stackoverflow.com/questions/36120451/stopiteration-during-search-query-using-scholarly-module-in-python
-extract_keys = {'name', 'coauthors'}
-auths_coauths = []
-
-for person in tqdm(faculty):
-    try:
-        query = scholarly.search_author(person)
-        author = next(query, None)
-        if author is None:
-            auths_coauths.append({'name': person, 'profile': 'not found'})
-        else:
-            auth = scholarly.fill(author, sections=['coauthors'])
-            auths_coauths.append({key: value for key, value in auth.items() if key in extract_keys})
-    except Exception as e:
-        utl.update_cache('cache-test.json', auths_coauths, key='auths-coauths')
-        print(e)
-
-# Retain only exact matches and write to cache
-people = [person.lower() for person in faculty]
-remove = []
-for profile in auths_coauths:
-    if profile.get('name').lower() not in people:
-        remove.append(profile)
-for profile in remove:
-    auths_coauths.remove(profile)
-utl.update_cache('cache-test.json', auths_coauths, key='auths-coauths')
+
+def use_proxy():
+    """
+    Routes Google Scholar requests through ScraperAPI, using the key in the SCRAPERAPI_KEY
+    environment variable.
+    NOTE: Proxy will often fail due to Google blocking
+
+    :return: (bool) True if the proxy connected.
+    """
+    pg = ProxyGenerator()
+    connected = pg.ScraperAPI(os.getenv('SCRAPERAPI_KEY'))
+    scholarly.use_proxy(pg)
+    return connected
+
+
+def find_author(person):
+    """
+    Searches Google Scholar for a person and returns their profile name, Google Scholar id, and
+    co-authors.
+    Adapting method for handling no results:
+    https://stackoverflow.com/questions/36120451/stopiteration-during-search-query-using-scholarly-module-in-python
+
+    :param person: (str) name of the person.
+    :return: (dict) name, scholar_id, and co-authors of the first matching profile, or the person's name with
+        profile 'not found' if there is none.
+    """
+    extract_keys = {'name', 'scholar_id', 'coauthors'}
+    query = scholarly.search_author(person)
+    author = next(query, None)
+    if author is None:
+        return {'name': person, 'profile': 'not found'}
+    auth = scholarly.fill(author, sections=['coauthors'])
+    return {key: value for key, value in auth.items() if key in extract_keys}
+
+
+def main():
+    """
+    Entry point for program.
+
+    :parameter: none.
+    :return: none.
+    """
+    # Load data
+    faculty = utl.read_json('cache.json')['umsi_faculty']
+    print(use_proxy())  # returns True if successful connection
+
+    # Search and cache results
+    auths_coauths = []
+    for person in tqdm(faculty):
+        try:
+            auths_coauths.append(find_author(person))
+        except Exception as e:
+            utl.update_cache('cache-test.json', auths_coauths, key='auths-coauths')
+            print(e)
+
+    # Retain only exact matches and write to cache
+    people = [person.lower() for person in faculty]
+    remove = []
+    for profile in auths_coauths:
+        if profile.get('name').lower() not in people:
+            remove.append(profile)
+    for profile in remove:
+        auths_coauths.remove(profile)
+    utl.update_cache('cache-test.json', auths_coauths, key='auths-coauths')
+
+
+if __name__ == '__main__':
+    main()
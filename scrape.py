@@ -1,23 +1,133 @@
+import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.core.utils import ChromeType, OSType, os_name
+import lxml.html
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 import helper as utl
 
+# Selenium is only needed when directory pages cannot be read without a browser
+try:
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from webdriver_manager.chrome import ChromeDriverManager
+    from webdriver_manager.core.utils import ChromeType, OSType, os_name
+except ImportError:
+    webdriver = None
 
-def main():
+DIRECTORY_URL = 'https://www.si.umich.edu/people/directory/faculty'
+
+# Elements whose class attribute contains the given class name
+PROFILE_LINKS = ("//*[contains(concat(' ', normalize-space(@class), ' '), ' directory-teaser-group ')]"
+                 "//*[contains(concat(' ', normalize-space(@class), ' '), ' research-person-profile ')]//h2//a")
+PAGER_LINKS = "//*[contains(concat(' ', normalize-space(@class), ' '), ' pager ')]//li//a/@href"
+
+
+def get_session(pool_size=8, retries=3):
     """
-    Entry point for program.
+    Creates an HTTP session that keeps up to pool_size connections open for reuse across
+    threads, and retries requests that fail or are rate limited with increasing delays.
+    :param pool_size: (int) number of pooled connections.
+    :param retries: (int) number of retries for each request.
+    :return: (Session) HTTP session.
+    """
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'Mozilla/5.0 (compatible; umsi-net)'
+    return session
 
-    :parameter: none.
-    :return: none.
+
+def parse_faculty_names(html):
+    """
+    Reads the names of the faculty listed in the HTML of a UMSI faculty directory page.
+    :param html: (str) page HTML.
+    :return: (list) faculty names.
+    """
+    names = []
+    for link in lxml.html.fromstring(html).xpath(PROFILE_LINKS):
+        name = link.get('title', '').replace("'s profile", '').strip() or link.text_content().strip()
+        if name:
+            names.append(name)
+    return names
+
+
+def parse_page_urls(html, base=DIRECTORY_URL):
+    """
+    Reads the addresses of the directory pages linked from the pager of a directory page.
+    :param html: (str) page HTML.
+    :param base: (str) address of the page, used to resolve relative links.
+    :return: (list) unique page addresses in pager order.
+    """
+    return list(dict.fromkeys(urljoin(base, href) for href in lxml.html.fromstring(html).xpath(PAGER_LINKS)))
+
+
+def fetch_faculty_names(session, url, timeout=10):
+    """
+    Downloads a directory page and reads the faculty names on it.
+    :param session: (Session) HTTP session from get_session.
+    :param url: (str) address of the directory page.
+    :param timeout: (float) seconds to wait for the server.
+    :return: (list) faculty names, empty if the page could not be downloaded.
     """
-    # Configure selenium webdriver for Brave Browser
-    # from https://github.com/SergeyPirogov/webdriver_manager/issues/368
-    # https://stackoverflow.com/questions/69970256/use-selenium-with-brave-browser-pass-service-object-written-in-python
+    try:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f'{url} could not be downloaded: {e}')
+        return []
+    return parse_faculty_names(response.text)
+
+
+def scrape_directory(urls, session=None, workers=8, fallback=True):
+    """
+    Downloads directory pages concurrently over a pooled HTTP session and reads the faculty
+    names on them. Pages that fail or list no faculty (e.g. when the site serves a page that
+    needs JavaScript) are read again with the browser if fallback is True. If the browser cannot
+    be started because selenium is not installed, those pages are reported and the names found
+    on the other pages are still returned.
+    :param urls: (list) addresses of the directory pages.
+    :param session: (Session) HTTP session, defaults to a new one from get_session.
+    :param workers: (int) number of pages downloaded at a time.
+    :param fallback: (bool) if True, reads pages without results with the browser.
+    :return: (list) unique faculty names in page order.
+    """
+    session = session or get_session(workers)
+    with ThreadPoolExecutor(workers) as pool:
+        pages = list(pool.map(lambda url: fetch_faculty_names(session, url), urls))
+    missing = [i for i, names in enumerate(pages) if not names]
+    if missing and fallback:
+        try:
+            driver = get_driver()
+        except ImportError as e:
+            print(f'{len(missing)} of {len(urls)} pages listed no faculty and could not be read with the browser '
+                  f'({e}): {", ".join(urls[i] for i in missing)}')
+        else:
+            try:
+                for i in missing:
+                    pages[i] = get_faculty_names(driver, urls[i])
+            finally:
+                driver.quit()
+    return list(dict.fromkeys(name for names in pages for name in names))
+
+
+def get_driver():
+    """
+    Configures a selenium webdriver for the Brave browser.
+    From https://github.com/SergeyPirogov/webdriver_manager/issues/368 and
+    https://stackoverflow.com/questions/69970256/use-selenium-with-brave-browser-pass-service-object-written-in-python
+
+    :return: (WebDriver) browser driver.
+    :raises ImportError: if selenium is not installed.
+    """
+    if webdriver is None:
+        raise ImportError('selenium and webdriver_manager are needed to read pages with the browser')
     binary_location = {
         OSType.LINUX: "/usr/bin/brave-browser",
         OSType.MAC: "/Applications/Brave Browser.app/Contents/MacOS/Brave Browser",
@@ -25,42 +135,69 @@ def main():
     }[os_name()]
     option = webdriver.ChromeOptions()
     option.binary_location = binary_location
-    driver = webdriver.Chrome(ChromeDriverManager(chrome_type=ChromeType.BRAVE).install(), options=option)
+    return webdriver.Chrome(ChromeDriverManager(chrome_type=ChromeType.BRAVE).install(), options=option)
 
-    # Access webpage links for all UMSI faculty
-    try:
-        urls = utl.read_json('cache.json')["umsi_pages"]
-    except FileNotFoundError:
-        driver.get('https://www.si.umich.edu/people/directory/faculty')
-        nav_elements = driver.find_element(By.CLASS_NAME, 'pager')
-        pages = nav_elements.find_elements(By.TAG_NAME, 'li')
-
-        driver.find_element(By.CLASS_NAME, 'directory-teaser-group')
-        links = [page.find_elements(By.TAG_NAME, 'a') for page in pages]
-        urls = []
-        for a_tag in links:
-            for element in a_tag:
-                if element.get_attribute('href') not in urls:
-                    urls.append(element.get_attribute('href'))
-        urls = [''.join(list(obj)) for obj in urls]
-        utl.save_cache('cache.json', urls, key='umsi_pages')
-
-    # NOTE: UMSI seemed to block all attempts at automating with a loop, including when using with
-    # time.sleep() and Selenium Waits
-    # Faculty list was created with the below code by manually passing in the index for each url in urls (0-9)
-    # and caching the results
-    umsi_faculty = []
-    driver.get(urls[10])
+
+def get_faculty_names(driver, url):
+    """
+    Reads the names of the faculty listed on one page of the UMSI faculty directory.
+    :param driver: (WebDriver) browser driver.
+    :param url: (str) address of the directory page.
+    :return: (list) faculty names.
+    """
+    driver.get(url)
     directory_elements = driver.find_element(By.CLASS_NAME, 'directory-teaser-group')
     faculty_elements = directory_elements.find_elements(By.CLASS_NAME, 'research-person-profile')
 
     people = [element.find_element(By.TAG_NAME, 'h2') for element in faculty_elements]
     names = [person.find_element(By.TAG_NAME, 'a') for person in people]
+    return [name.get_attribute('title').replace("'s profile", '') for name in names]
 
-    umsi_faculty.extend(name.get_attribute('title').replace("'s profile", '') for name in names)
-    utl.update_cache('cache.json', umsi_faculty, key='umsi_faculty')
 
-    driver.quit()
+def parse_args(argv=None):
+    """
+    Reads the command line options of the scraper.
+    :param argv: (list) command line arguments, defaults to sys.argv.
+    :return: (Namespace) parsed options.
+    """
+    parser = argparse.ArgumentParser(description='Add the names in the UMSI faculty directory to cache.json.')
+    parser.add_argument('--browser', action='store_true', help='read every page with the browser')
+    parser.add_argument('--workers', type=int, default=8, help='pages downloaded at a time (default 8)')
+    return parser.parse_args(argv)
+
+
+def main():
+    """
+    Entry point for program.
+
+    :parameter: none.
+    :return: none.
+    """
+    args = parse_args()
+    cache = utl.read_json('cache.json')
+
+    # Access webpage links for all UMSI faculty
+    urls = cache.get('umsi_pages')
+    if not urls:
+        session = get_session()
+        response = session.get(DIRECTORY_URL, timeout=10)
+        response.raise_for_status()
+        urls = parse_page_urls(response.text)
+        cache['umsi_pages'] = urls
+
+    if args.browser:
+        # NOTE: UMSI seemed to block all attempts at automating the browser with a loop, including when
+        # using time.sleep() and Selenium Waits, so reading every page this way may need several runs
+        driver = get_driver()
+        try:
+            names = [name for url in urls for name in get_faculty_names(driver, url)]
+        finally:
+            driver.quit()
+    else:
+        names = scrape_directory(urls, workers=args.workers)
+    cache['umsi_faculty'] = list(dict.fromkeys(cache.get('umsi_faculty', []) + names))
+    utl.write_json('cache.json', cache)
+    print(f'Found {len(set(names))} faculty on {len(urls)} pages.')
 
 
 if __name__ == '__main__':